@@ -1,15 +1,156 @@
-﻿from fastapi import FastAPI, HTTPException, Query
+﻿from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from contextlib import asynccontextmanager
+import asyncpg
+import asyncio
+import logging
 import os
+import base64
+import csv
+import io
+import zlib
+import json
 from dotenv import load_dotenv
-from typing import Optional
+from typing import Awaitable, Callable, Optional
+
+from response_cache import ResponseCache, cache_key
 
 load_dotenv()
 NEON_DATABASE_URL = os.getenv("NEON_DATABASE_URL")
 
-app = FastAPI(title="YC Companies API", version="1.0.0")
+logger = logging.getLogger(__name__)
+
+# Connection pool settings
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_ACQUIRE_TIMEOUT = float(os.getenv("DB_ACQUIRE_TIMEOUT", "5"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT", "10"))
+DB_MAX_IDLE_SECONDS = float(os.getenv("DB_MAX_IDLE_SECONDS", "300"))
+# Hot queries run as named prepared statements cached per connection; set
+# to 0 when going through a pooler that cannot track prepared statements
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+# Response cache settings
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "512"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_AGE = int(os.getenv("CACHE_MAX_AGE", "60"))  # Cache-Control max-age for clients
+CACHE_VERSION_POLL_SECONDS = float(os.getenv("CACHE_VERSION_POLL_SECONDS", "10"))
+
+# Cached responses are valid until another scrape run completes
+DATA_VERSION_SQL = "SELECT MAX(ended_at) FROM scrape_runs"
+
+STATS_SQL = "SELECT (SELECT COUNT(*) FROM companies) as total_companies"
+# Analytics read the current-state rollup the scrapers refresh at the end
+# of each run (scraper/analytics_rollup.py), never company_snapshots
+BATCHES_SQL = "SELECT value AS batch, company_count AS count FROM analytics_rollup WHERE dimension = 'batch' ORDER BY value DESC LIMIT 20"
+STAGES_SQL = "SELECT value AS stage, company_count AS count FROM analytics_rollup WHERE dimension = 'stage' ORDER BY company_count DESC"
+LOCATIONS_SQL = "SELECT value AS location, company_count AS count FROM analytics_rollup WHERE dimension = 'location' ORDER BY company_count DESC LIMIT 15"
+
+# Keyset pagination: companies are walked in id order. The scrapers copy
+# each company's current batch, stage and location onto companies alongside
+# current_snapshot_id (scraper/current_snapshot.py), so a filtered page
+# seeks a (column, id) index on companies instead of walking every id and
+# joining snapshots. Those indexes are created by scraper/migrate.py,
+# never at startup
+COMPANIES_SELECT = """
+    SELECT c.id, c.name, c.slug, c.domain, c.is_active,
+           c.batch, c.stage, c.location
+    FROM companies c
+"""
+CURRENT_STATE_FILTERS = ("batch", "stage", "location")
+
+# Full company record: current snapshot and enrichment. Used by the
+# export and the detail endpoint
+COMPANY_RECORD_SELECT = """
+    SELECT c.id, c.yc_company_id, c.name, c.slug, c.domain, c.is_active,
+           c.first_seen_at, c.last_seen_at,
+           s.batch, s.stage, s.description, s.location, s.tags, s.employee_range,
+           s.scraped_at AS snapshot_at,
+           e.has_careers_page, e.has_blog, e.contact_email,
+           e.scraped_at AS enriched_at
+    FROM companies c
+    LEFT JOIN company_snapshots s ON s.id = c.current_snapshot_id
+    LEFT JOIN company_web_enrichment e ON e.company_id = c.id
+"""
+EXPORT_COLUMNS = [
+    "id", "yc_company_id", "name", "slug", "domain", "is_active",
+    "first_seen_at", "last_seen_at", "batch", "stage", "description", "location",
+    "tags", "employee_range", "snapshot_at", "has_careers_page", "has_blog",
+    "contact_email", "enriched_at",
+]
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "1000"))
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(json.loads(base64.urlsafe_b64decode(padded))["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def company_filter_clauses(filters: dict, args: list) -> list:
+    """WHERE clauses for the list filters; their values are appended to args."""
+    where = []
+    for column in CURRENT_STATE_FILTERS:
+        value = filters.get(column)
+        if value is None:
+            continue
+        args.append(value)
+        where.append(f"c.{column} = ${len(args)}")
+    
+    if filters.get("is_active") is not None:
+        args.append(filters["is_active"])
+        where.append(f"c.is_active = ${len(args)}")
+    
+    if filters.get("search"):
+        args.append(f"%{filters['search']}%")
+        where.append(f"(c.name ILIKE ${len(args)} OR c.domain ILIKE ${len(args)})")
+    return where
+
+def build_companies_query(filters: dict, after_id: int, limit: int, offset: int = 0):
+    """Return (sql, args) for one page of companies matching filters."""
+    args = [after_id]
+    where = ["c.id > $1"] + company_filter_clauses(filters, args)
+    
+    args.append(limit + 1)
+    sql = f"{COMPANIES_SELECT} WHERE {' AND '.join(where)} ORDER BY c.id LIMIT ${len(args)}"
+    if offset:
+        args.append(offset)
+        sql += f" OFFSET ${len(args)}"
+    return sql, args
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.pool = await asyncpg.create_pool(
+        NEON_DATABASE_URL,
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        command_timeout=DB_COMMAND_TIMEOUT,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+        max_inactive_connection_lifetime=DB_MAX_IDLE_SECONDS,
+    )
+    app.state.cache = ResponseCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+    poller = asyncio.create_task(watch_scrape_runs(app))
+    yield
+    poller.cancel()
+    await app.state.pool.close()
+
+async def watch_scrape_runs(app: FastAPI):
+    """Invalidate the response cache whenever a scrape run finishes."""
+    while True:
+        try:
+            async with app.state.pool.acquire() as conn:
+                version = await conn.fetchval(DATA_VERSION_SQL)
+            if app.state.cache.set_version(version):
+                logger.info(f"Response cache at data version {version}")
+        except (asyncpg.PostgresError, OSError, asyncio.TimeoutError) as e:
+            logger.warning(f"Could not check scrape_runs for cache invalidation: {e}")
+        await asyncio.sleep(CACHE_VERSION_POLL_SECONDS)
+
+app = FastAPI(title="YC Companies API", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -20,48 +161,213 @@ app.add_middleware(
 )
 
 def get_db():
-    return psycopg2.connect(NEON_DATABASE_URL, cursor_factory=RealDictCursor)
+    try:
+        return app.state.pool.acquire(timeout=DB_ACQUIRE_TIMEOUT)
+    except AttributeError:
+        raise HTTPException(status_code=503, detail="Database pool not ready")
+
+async def cached_json(request: Request, key, build: Callable[[], Awaitable]) -> Response:
+    """
+    Serve key from the response cache, building and storing it on a miss.
+    Answers 304 when the client's If-None-Match matches the entry's ETag.
+    """
+    cache = request.app.state.cache
+    entry = cache.get(key)
+    if entry is None:
+        payload = await build()
+        entry = cache.put(key, json.dumps(payload, default=str).encode())
+    
+    headers = {"ETag": entry.etag, "Cache-Control": f"public, max-age={CACHE_MAX_AGE}"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if entry.etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+        cache.stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+    return Response(entry.body, media_type="application/json", headers=headers)
 
 @app.get("/")
 def root():
     return {"message": "YC API Running", "status": "ok"}
 
 @app.get("/api/stats")
-def get_stats():
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT (SELECT COUNT(*) FROM companies) as total_companies")
-    stats = cur.fetchone()
-    cur.close()
-    conn.close()
-    return stats
+async def get_stats(request: Request):
+    async def build():
+        async with get_db() as conn:
+            stats = await conn.fetchrow(STATS_SQL)
+        return dict(stats)
+    
+    return await cached_json(request, cache_key("stats"), build)
 
 @app.get("/api/companies")
-def get_companies(page: int = 1, limit: int = 20):
-    conn = get_db()
-    cur = conn.cursor()
-    offset = (page - 1) * limit
-    cur.execute("SELECT id, name, slug, domain FROM companies ORDER BY id LIMIT %s OFFSET %s", (limit, offset))
-    companies = cur.fetchall()
-    cur.close()
-    conn.close()
-    return {"data": companies}
+async def get_companies(
+    request: Request,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    page: int = Query(1, ge=1),
+    batch: Optional[str] = None,
+    stage: Optional[str] = None,
+    location: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    search: Optional[str] = None,
+):
+    """
+    List companies in id order. Pass the returned next_cursor to get the
+    following page; page is still accepted for old clients but costs an
+    OFFSET scan.
+    """
+    filters = {"batch": batch, "stage": stage, "location": location,
+               "is_active": is_active, "search": search}
+    after_id = decode_cursor(cursor) if cursor else 0
+    offset = 0 if cursor else (page - 1) * limit
+    
+    async def build():
+        sql, args = build_companies_query(filters, after_id, limit, offset)
+        async with get_db() as conn:
+            rows = await conn.fetch(sql, *args)
+        
+        companies = [dict(r) for r in rows[:limit]]
+        next_cursor = encode_cursor(companies[-1]["id"]) if len(rows) > limit else None
+        return {"data": companies, "next_cursor": next_cursor}
+    
+    key = cache_key("companies", limit=limit, after_id=after_id, offset=offset, **filters)
+    return await cached_json(request, key, build)
 
-@app.get("/api/analytics")
-def get_analytics():
-    conn = get_db()
-    cur = conn.cursor()
+def accepts_gzip(accept_encoding: str) -> bool:
+    """
+    Whether an Accept-Encoding header allows gzip. A coding listed with
+    q=0 is refused; gzip not listed at all falls back to the * entry.
+    """
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [item.strip() for item in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[coding.lower()] = q
+    
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+def export_rows_csv(rows) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\n")
+    for row in rows:
+        writer.writerow(["" if row[col] is None else row[col] for col in EXPORT_COLUMNS])
+    return buf.getvalue().encode()
+
+def export_rows_ndjson(rows) -> bytes:
+    lines = []
+    for row in rows:
+        record = dict(row)
+        # jsonb arrives as text; emit it as a real array
+        if record["tags"] is not None:
+            record["tags"] = json.loads(record["tags"])
+        lines.append(json.dumps(record, default=str))
+    return ("\n".join(lines) + "\n").encode()
+
+@app.get("/api/export")
+async def export_companies(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    batch: Optional[str] = None,
+    stage: Optional[str] = None,
+    location: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    search: Optional[str] = None,
+):
+    """
+    Stream every matching company as CSV or NDJSON. Rows come from a
+    server-side cursor EXPORT_CHUNK_SIZE at a time, so memory stays flat
+    however large the table is; the stream is gzipped when the client
+    accepts it.
+    """
+    filters = {"batch": batch, "stage": stage, "location": location,
+               "is_active": is_active, "search": search}
+    args = []
+    where = company_filter_clauses(filters, args)
+    sql = COMPANY_RECORD_SELECT + (f" WHERE {' AND '.join(where)}" if where else "") + " ORDER BY c.id"
     
-    cur.execute("SELECT batch, COUNT(DISTINCT company_id) as count FROM company_snapshots WHERE batch IS NOT NULL GROUP BY batch ORDER BY batch DESC LIMIT 20")
-    batches = cur.fetchall()
+    encode = export_rows_csv if format == "csv" else export_rows_ndjson
+    gzip = accepts_gzip(request.headers.get("accept-encoding", ""))
     
-    cur.execute("SELECT stage, COUNT(*) as count FROM company_snapshots WHERE stage IS NOT NULL GROUP BY stage ORDER BY count DESC")
-    stages = cur.fetchall()
+    async def stream():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+        emit = compressor.compress if compressor else (lambda data: data)
+        
+        if format == "csv":
+            yield emit((",".join(EXPORT_COLUMNS) + "\n").encode())
+        
+        async with get_db() as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(sql, *args)
+                while True:
+                    rows = await cursor.fetch(EXPORT_CHUNK_SIZE)
+                    if not rows:
+                        break
+                    chunk = emit(encode(rows))
+                    if chunk:
+                        yield chunk
+        
+        if compressor:
+            yield compressor.flush()
     
-    cur.execute("SELECT location, COUNT(*) as count FROM company_snapshots WHERE location IS NOT NULL AND location != '' GROUP BY location ORDER BY count DESC LIMIT 15")
-    locations = cur.fetchall()
+    filename = f"yc-companies.{format}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"',
+               "Cache-Control": "no-store"}
+    if gzip:
+        headers["Content-Encoding"] = "gzip"
+        headers["Vary"] = "Accept-Encoding"
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type, headers=headers)
+
+@app.get("/api/companies/{company_id}")
+async def get_company(request: Request, company_id: int):
+    async def build():
+        async with get_db() as conn:
+            row = await conn.fetchrow(COMPANY_RECORD_SELECT + " WHERE c.id = $1", company_id)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Company not found")
+        company = dict(row)
+        if company["tags"] is not None:
+            company["tags"] = json.loads(company["tags"])
+        return company
     
-    cur.close()
-    conn.close()
+    return await cached_json(request, cache_key("company", id=company_id), build)
+
+@app.get("/api/analytics")
+async def get_analytics(request: Request):
+    async def build():
+        async with get_db() as conn:
+            batches = await conn.fetch(BATCHES_SQL)
+            stages = await conn.fetch(STAGES_SQL)
+            locations = await conn.fetch(LOCATIONS_SQL)
+        
+        return {
+            "batches": [dict(r) for r in batches],
+            "stages": [dict(r) for r in stages],
+            "locations": [dict(r) for r in locations],
+        }
     
-    return {"batches": batches, "stages": stages, "locations": locations}
+    return await cached_json(request, cache_key("analytics"), build)
+
+@app.get("/api/pool")
+def get_pool_stats():
+    pool = app.state.pool
+    return {
+        "size": pool.get_size(),
+        "idle": pool.get_idle_size(),
+        "min_size": pool.get_min_size(),
+        "max_size": pool.get_max_size(),
+    }
+
+@app.get("/api/cache")
+def get_cache_stats():
+    return app.state.cache.get_stats()
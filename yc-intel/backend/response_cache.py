@@ -0,0 +1,79 @@
+"""
+In-process response cache for the read endpoints
+
+The data behind the API only changes when a scrape run finishes, so
+serialized responses are kept in an LRU with a TTL, keyed by endpoint and
+its parsed query parameters. Everything is dropped when the cache's data
+version (the latest completed scrape run) moves on. Each entry carries a
+strong ETag so clients can revalidate with If-None-Match and get a 304.
+"""
+
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+class CacheEntry:
+    __slots__ = ("body", "etag", "expires_at")
+
+    def __init__(self, body: bytes, ttl: float):
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.expires_at = time.monotonic() + ttl
+
+
+def cache_key(endpoint: str, **params) -> Tuple:
+    """Normalize parsed parameters so equivalent requests share an entry."""
+    return (endpoint,) + tuple(sorted((k, v) for k, v in params.items() if v is not None))
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 512, ttl: float = 300):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        self.version: Optional[Any] = None
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0,
+                      "evictions": 0, "invalidations": 0}
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        entry = self.entries.get(key)
+        if entry is None or entry.expires_at < time.monotonic():
+            if entry is not None:
+                del self.entries[key]
+            self.stats["misses"] += 1
+            return None
+        self.entries.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry
+
+    def put(self, key: Hashable, body: bytes) -> CacheEntry:
+        entry = CacheEntry(body, self.ttl)
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats["evictions"] += 1
+        return entry
+
+    def set_version(self, version: Any) -> bool:
+        """Record the current data version; clears the cache if it changed."""
+        if version == self.version:
+            return False
+        if self.version is not None:
+            self.entries.clear()
+            self.stats["invalidations"] += 1
+        self.version = version
+        return True
+
+    def get_stats(self) -> Dict:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hit_rate": round(self.stats["hits"] / lookups, 3) if lookups else 0.0,
+            "version": str(self.version) if self.version is not None else None,
+        }
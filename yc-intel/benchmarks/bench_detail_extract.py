@@ -0,0 +1,84 @@
+"""
+Micro-benchmark: detail page extraction
+
+Times the original html.parser DOM walk against the data-page JSON
+extractor (and its HTML fallback) on the saved fixture pages, and checks
+that every extractor returns the same snapshot fields.
+
+Usage:
+    python benchmarks/bench_detail_extract.py [iterations]
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scraper"))
+
+from detail_extract import (  # noqa: E402
+    FALLBACK_PARSER,
+    extract_company_detail,
+    extract_from_html,
+)
+
+FIXTURES = Path(__file__).parent / "fixtures"
+FIELDS = ["batch", "stage", "description", "location", "tags", "employee_range"]
+
+
+def legacy_extract(page: bytes) -> dict:
+    return extract_from_html(page, "html.parser")
+
+
+def time_per_page(extract, pages, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for page in pages:
+            extract(page)
+    return (time.perf_counter() - start) * 1000 / (iterations * len(pages))
+
+
+def compare(name: str, legacy: dict, fast: dict) -> list:
+    mismatches = []
+    for field in FIELDS:
+        if legacy[field] != fast[field]:
+            mismatches.append(f"{name}: {field} {legacy[field]!r} != {fast[field]!r}")
+    return mismatches
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    pages = {path.name: path.read_bytes() for path in sorted(FIXTURES.glob("company_*.html"))}
+    if not pages:
+        sys.exit(f"No fixture pages found in {FIXTURES}")
+
+    mismatches = []
+    for name, page in pages.items():
+        legacy = legacy_extract(page)
+        mismatches += compare(name, legacy, extract_company_detail(page))
+        mismatches += compare(f"{name} (fallback)", legacy, extract_from_html(page))
+
+    legacy_ms = time_per_page(legacy_extract, list(pages.values()), iterations)
+    fast_ms = time_per_page(extract_company_detail, list(pages.values()), iterations)
+    fallback_ms = time_per_page(extract_from_html, list(pages.values()), iterations)
+
+    print("=" * 70)
+    print(f"DETAIL EXTRACTION BENCHMARK ({len(pages)} pages x {iterations} iterations)")
+    print("=" * 70)
+    print(f"html.parser DOM walk (current): {legacy_ms:8.3f} ms/page")
+    print(f"data-page JSON extractor:       {fast_ms:8.3f} ms/page "
+          f"({legacy_ms / fast_ms:.1f}x)")
+    print(f"{FALLBACK_PARSER} fallback:{' ' * (22 - len(FALLBACK_PARSER))}"
+          f"{fallback_ms:8.3f} ms/page ({legacy_ms / fallback_ms:.1f}x)")
+    print("=" * 70)
+
+    if mismatches:
+        print("FIELD MISMATCHES:")
+        for mismatch in mismatches:
+            print(f"  {mismatch}")
+        sys.exit(1)
+    print("✓ All extractors agree on batch, stage, description, location, tags, employee_range")
+
+
+if __name__ == "__main__":
+    main()
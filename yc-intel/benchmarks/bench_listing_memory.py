@@ -0,0 +1,177 @@
+"""
+Memory benchmark: Algolia listing
+
+Serves a synthetic YC directory from a local stand-in for Algolia's
+/queries endpoint (full-size hits with highlight metadata, ignoring
+attributesToRetrieve so only client-side trimming helps) and measures the
+peak Python heap of two ways of consuming AlgoliaLister:
+
+- collect: whole hits gathered into one list before anything is written,
+  as scrape_list used to do
+- stream:  trimmed pages handed to a consumer one at a time, as the
+  pipeline does now
+
+The stream peak should stay flat as the directory grows.
+
+Usage:
+    python benchmarks/bench_listing_memory.py [sizes...]
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import socket
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scraper"))
+
+from algolia_listing import LISTING_FIELDS, AlgoliaLister  # noqa: E402
+
+BATCH_SIZE = 400
+# The stream peak may grow this much from the smallest to the largest
+# directory (the de-duplication set still scales with company count)
+FLAT_TOLERANCE = 2.0
+
+
+def make_hit(i: int) -> dict:
+    name = f"Company {i}"
+    description = f"{name} builds developer tools for teams of every size. " * 8
+    return {
+        "id": i,
+        "objectID": str(i),
+        "name": name,
+        "slug": f"company-{i}",
+        "website": f"https://company-{i}.example.com",
+        "batch": f"B{i // BATCH_SIZE:03d}",
+        "stage": "Early",
+        "short_description": description[:120],
+        "long_description": description * 4,
+        "location": "San Francisco, CA, USA",
+        "tags": ["Developer Tools", "SaaS", "B2B"],
+        "industries": ["B2B", "Engineering, Product and Design"],
+        "employee_size": 12,
+        "small_logo_thumb_url": f"https://cdn.example.com/logos/{i}/thumb.png",
+        "_highlightResult": {
+            field: {"value": value, "matchLevel": "none", "matchedWords": []}
+            for field, value in (
+                ("name", name),
+                ("short_description", description[:120]),
+                ("long_description", description * 4),
+                ("location", "San Francisco, CA, USA"),
+            )
+        },
+    }
+
+
+def serve(port: int, size: int):
+    from aiohttp import web
+
+    batches = {}
+    for i in range(size):
+        batches.setdefault(f"B{i // BATCH_SIZE:03d}", []).append(i)
+
+    async def queries(request):
+        payload = await request.json()
+        results = []
+        for query in payload["requests"]:
+            if query.get("hitsPerPage") == 0:
+                results.append({
+                    "nbHits": size,
+                    "facets": {"batch": {b: len(ids) for b, ids in batches.items()}},
+                })
+                continue
+            batch = re.search(r'batch:"([^"]+)"', query.get("filters", "")).group(1)
+            per_page = query["hitsPerPage"]
+            ids = batches[batch][query["page"] * per_page:(query["page"] + 1) * per_page]
+            results.append({"hits": [make_hit(i) for i in ids]})
+        return web.Response(body=json.dumps({"results": results}),
+                            content_type="application/json")
+
+    app = web.Application(client_max_size=1024 ** 2)
+    app.router.add_post("/1/indexes/*/queries", queries)
+    web.run_app(app, host="127.0.0.1", port=port, print=None)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def collect(lister: AlgoliaLister) -> int:
+    companies = await lister.list_all()
+    return len(companies)
+
+
+async def stream(lister: AlgoliaLister) -> int:
+    count = 0
+    async for page in lister.iter_pages():
+        # Stand-in for the writer: touch every row, keep nothing
+        count += sum(1 for company in page if company["id"] is not None)
+    return count
+
+
+def measure(url: str, mode, fields) -> tuple:
+    lister = AlgoliaLister(url, {}, fields=fields, concurrency=4)
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = asyncio.run(mode(lister))
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return count, peak / 1024 ** 2, elapsed
+
+
+def wait_for(port: int):
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    sys.exit("Fake Algolia server did not start")
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [2000, 8000, 32000]
+
+    print("=" * 70)
+    print("ALGOLIA LISTING MEMORY BENCHMARK (peak traced heap)")
+    print("=" * 70)
+    print(f"{'Companies':>10}{'collect raw':>16}{'stream trimmed':>18}{'ratio':>10}")
+
+    stream_peaks = []
+    for size in sizes:
+        port = free_port()
+        server = multiprocessing.Process(target=serve, args=(port, size), daemon=True)
+        server.start()
+        try:
+            wait_for(port)
+            url = f"http://127.0.0.1:{port}/1/indexes/*/queries"
+            raw_count, raw_peak, raw_s = measure(url, collect, None)
+            trimmed_count, trimmed_peak, trimmed_s = measure(url, stream, LISTING_FIELDS)
+        finally:
+            server.terminate()
+            server.join()
+
+        if raw_count != size or trimmed_count != size:
+            sys.exit(f"Expected {size} companies, got {raw_count} / {trimmed_count}")
+        stream_peaks.append(trimmed_peak)
+        print(f"{size:>10}{raw_peak:>13.1f} MB{trimmed_peak:>15.1f} MB"
+              f"{raw_peak / trimmed_peak:>9.1f}x   ({raw_s:.1f}s / {trimmed_s:.1f}s)")
+
+    print("=" * 70)
+    growth = stream_peaks[-1] / stream_peaks[0]
+    if len(sizes) > 1 and growth > FLAT_TOLERANCE:
+        print(f"Stream peak grew {growth:.1f}x from {sizes[0]} to {sizes[-1]} companies")
+        sys.exit(1)
+    print(f"✓ Stream peak grew {growth:.2f}x over a {sizes[-1] // sizes[0]}x larger directory")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+"""
+End-to-end throughput benchmark: list, detail and enrichment runs
+
+Drives YCScraper, DetailScraper and website_enrichment against the local
+stand-ins in standins.py (Algolia, YC detail pages, company homepages)
+and a throwaway schema in a local Postgres, at several directory sizes.
+Each run reports companies per second and the p50/p95 of every profiler
+span, and is checked against benchmarks/baselines.json. Each size ends
+by removing a few companies and checking that the incrementally refreshed
+analytics rollup matches a full recount.
+
+Every run happens in a fresh child process: the scrapers read their
+configuration from the environment at import time, and a new process
+keeps one run's pools, logs and HTTP cache away from the next. Child
+output goes to <workdir>/<scenario>@<size>.log.
+
+All stand-in homepages live on one host, so domain backoff is switched
+off (DOMAIN_BACKOFF_BASE_HOURS=0); otherwise the first failing homepage
+would put every other company on cooldown.
+
+Usage:
+    BENCH_DATABASE_URL=postgresql://localhost/postgres \\
+        python benchmarks/bench_pipeline.py [--sizes 250 1000 4000]
+            [--profile profile.json] [--tolerance 0.25] [--update-baselines]
+            [--allow-missing-baselines]
+
+A run with no comparable baseline fails the benchmark unless
+--allow-missing-baselines is given, so a new size or profile cannot pass
+without anything having been checked.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import tempfile
+import time
+import traceback
+from datetime import date
+from pathlib import Path
+
+import psycopg2
+from psycopg2.extensions import make_dsn, parse_dsn
+
+import standins
+
+SCRAPER_DIR = str(Path(__file__).resolve().parent.parent / "scraper")
+BASELINES = Path(__file__).parent / "baselines.json"
+
+BENCH_SCHEMA = "yc_bench"
+LOCAL_HOSTS = {"", "localhost", "127.0.0.1", "::1"}
+SCENARIOS = ("list", "detail", "enrichment")
+RUN_TIMEOUT = 1800  # seconds per scenario
+
+# Spans too fast or too rare for their p95 to be stable are not compared
+MIN_BASELINE_P95_MS = 1.0
+MIN_SPAN_COUNT = 20
+
+# Scraper settings that would otherwise make the benchmark measure
+# politeness instead of the pipeline; any of them can be overridden from
+# the environment
+TUNABLE_DEFAULTS = {
+    "YC_RATE_LIMIT": "1000",
+    "YC_RATE_BURST": "1000",
+    "ENRICH_DEADLINE": "2",
+}
+
+BASE_SCHEMA = """
+CREATE TABLE companies (
+    id SERIAL PRIMARY KEY,
+    yc_company_id TEXT UNIQUE,
+    name TEXT,
+    slug TEXT,
+    domain TEXT,
+    first_seen_at TIMESTAMP,
+    last_seen_at TIMESTAMP,
+    is_active BOOLEAN DEFAULT TRUE
+);
+CREATE TABLE company_snapshots (
+    id SERIAL PRIMARY KEY,
+    company_id INTEGER REFERENCES companies(id) ON DELETE CASCADE,
+    batch TEXT,
+    stage TEXT,
+    description TEXT,
+    location TEXT,
+    tags JSONB,
+    employee_range TEXT,
+    data_hash TEXT,
+    scraped_at TIMESTAMP DEFAULT NOW()
+);
+CREATE TABLE company_web_enrichment (
+    company_id INTEGER PRIMARY KEY REFERENCES companies(id) ON DELETE CASCADE,
+    has_careers_page BOOLEAN,
+    has_blog BOOLEAN,
+    contact_email TEXT,
+    scraped_at TIMESTAMP DEFAULT NOW()
+);
+CREATE TABLE scrape_runs (
+    id SERIAL PRIMARY KEY,
+    started_at TIMESTAMP,
+    ended_at TIMESTAMP,
+    total_companies INTEGER,
+    new_companies INTEGER,
+    updated_companies INTEGER,
+    unchanged_companies INTEGER,
+    failed_companies INTEGER,
+    avg_time_per_company_ms NUMERIC,
+    slowest_company_name TEXT,
+    slowest_company_time_ms NUMERIC
+);
+"""
+
+
+# ------------------------------------------------------------------
+# Database
+# ------------------------------------------------------------------
+
+def bench_dsn() -> str:
+    dsn = os.getenv("BENCH_DATABASE_URL")
+    if not dsn:
+        sys.exit("BENCH_DATABASE_URL is not set (a local Postgres the benchmark may write to)")
+    host = parse_dsn(dsn).get("host", "")
+    if host not in LOCAL_HOSTS and not host.startswith("/"):
+        sys.exit(f"Refusing to benchmark against non-local database host {host!r}")
+    # Scrapers only ever see the benchmark schema
+    return make_dsn(dsn, options=f"-c search_path={BENCH_SCHEMA}")
+
+
+def reset_schema(dsn: str):
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    cur.execute(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {BENCH_SCHEMA}")
+    cur.execute(BASE_SCHEMA)
+    conn.commit()
+    cur.close()
+
+    # The columns and indexes the scrapers expect, added the way a deploy adds them
+    sys.path.insert(0, SCRAPER_DIR)
+    from migrate import migrate
+    migrate(conn)
+    conn.close()
+
+
+def prepare_detail(dsn: str):
+    # The list scraper leaves slugs to the Algolia upsert in scraper.py
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    cur.execute("UPDATE companies SET slug = 'company-' || yc_company_id WHERE slug IS NULL")
+    conn.commit()
+    conn.close()
+
+
+def check_run(dsn: str, scenario: str, size: int, companies: int):
+    """Raise if a scraper swallowed a failure instead of finishing its run."""
+    if companies != size:
+        raise RuntimeError(f"processed {companies} of {size} companies")
+    if scenario == "enrichment":
+        return
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT ended_at FROM scrape_runs WHERE scraper = %s ORDER BY id DESC LIMIT 1",
+        (scenario,),
+    )
+    row = cur.fetchone()
+    conn.close()
+    if not row or row[0] is None:
+        raise RuntimeError("scrape run was left unfinished")
+
+
+def check_rollup(dsn: str):
+    """
+    Remove a few companies the three ways they stop counting, refresh the
+    analytics rollup incrementally and raise if it disagrees with a recount.
+    """
+    sys.path.insert(0, SCRAPER_DIR)
+    from analytics_rollup import refresh_rollup, rollup_drift
+
+    conn = psycopg2.connect(dsn)
+    cur = conn.cursor()
+    cur.execute("SELECT id FROM companies WHERE current_snapshot_id IS NOT NULL ORDER BY id LIMIT 6")
+    ids = [row[0] for row in cur.fetchall()]
+    cur.execute("UPDATE companies SET is_active = FALSE WHERE id = ANY(%s)", (ids[0:2],))
+    cur.execute("UPDATE companies SET current_snapshot_id = NULL WHERE id = ANY(%s)", (ids[2:4],))
+    cur.execute("DELETE FROM companies WHERE id = ANY(%s)", (ids[4:6],))
+    conn.commit()
+    cur.close()
+    try:
+        refresh_rollup(conn)
+        drift = rollup_drift(conn)
+    finally:
+        conn.close()
+    if drift:
+        raise RuntimeError(f"analytics rollup differs from a recount after removals: {drift[:5]}")
+
+
+# ------------------------------------------------------------------
+# Runs
+# ------------------------------------------------------------------
+
+def run_scenario(scenario: str, env: dict, workdir: str, log_path: str, results):
+    """Child process: run one scraper and report its throughput and spans."""
+    try:
+        os.environ.update(env)
+        os.chdir(workdir)
+        log = open(log_path, "w", encoding="utf-8")
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        sys.path.insert(0, SCRAPER_DIR)
+
+        start = time.perf_counter()
+        if scenario == "list":
+            from main_scraper import YCScraper
+            scraper = YCScraper()
+            scraper.run()
+            companies, profiler = scraper.metrics["total"], scraper.profiler
+        elif scenario == "detail":
+            from detail_scraper import DetailScraper
+            scraper = DetailScraper()
+            scraper.run()
+            companies, profiler = scraper.stats["total_processed"], scraper.profiler
+        else:
+            import asyncio
+            from website_enrichment import enrich_all_websites
+            profiler = asyncio.run(enrich_all_websites(incremental=False, max_count=None))
+            companies = profiler.histogram("company").count
+        elapsed = time.perf_counter() - start
+
+        results.put({"companies": companies, "seconds": elapsed, "spans": profiler.summary()})
+    except BaseException:
+        results.put({"error": traceback.format_exc()})
+
+
+def run_child(ctx, scenario: str, env: dict, workdir: str, size: int) -> dict:
+    log_path = os.path.join(workdir, f"{scenario}@{size}.log")
+    results = ctx.Queue()
+    child = ctx.Process(target=run_scenario, args=(scenario, env, workdir, log_path, results))
+    child.start()
+    deadline = time.monotonic() + RUN_TIMEOUT
+    result = None
+    while result is None:
+        try:
+            result = results.get(timeout=1)
+        except queue.Empty:
+            if not child.is_alive():
+                result = {"error": f"child exited with code {child.exitcode} and no result"}
+            elif time.monotonic() > deadline:
+                result = {"error": f"no result within {RUN_TIMEOUT}s"}
+    child.join(10)
+    if child.is_alive():
+        child.terminate()
+    result["log"] = log_path
+    return result
+
+
+def run_size(ctx, dsn: str, size: int, profile: dict, workroot: str) -> dict:
+    """Run list, detail and enrichment on a fresh schema; {scenario: result}."""
+    workdir = os.path.join(workroot, str(size))
+    os.makedirs(workdir)
+    reset_schema(dsn)
+
+    port = standins.free_port()
+    server = multiprocessing.Process(target=standins.serve, args=(port, size, profile), daemon=True)
+    server.start()
+    urls = standins.urls(port)
+    env = {
+        "DATABASE_URL": dsn,
+        "NEON_DATABASE_URL": dsn,
+        "ALGOLIA_URL": urls["algolia"],
+        "YC_BASE_URL": urls["yc"],
+        "DOMAIN_BACKOFF_BASE_HOURS": "0",
+        "HTTP_CACHE_PATH": os.path.join(workdir, "http_cache.sqlite3"),
+        "PROFILE_DIR": os.path.join(workdir, "metrics"),
+        **{key: os.getenv(key, value) for key, value in TUNABLE_DEFAULTS.items()},
+    }
+
+    results = {}
+    try:
+        standins.wait_for(port)
+        for scenario in SCENARIOS:
+            if scenario == "detail":
+                prepare_detail(dsn)
+            result = run_child(ctx, scenario, env, workdir, size)
+            if "error" not in result:
+                try:
+                    check_run(dsn, scenario, size, result["companies"])
+                except RuntimeError as e:
+                    result["error"] = str(e)
+            results[scenario] = result
+            if "error" in result:
+                # Later scenarios need the rows this one should have written
+                break
+        else:
+            # Last, since it removes companies the scenarios count on
+            try:
+                check_rollup(dsn)
+            except RuntimeError as e:
+                results["detail"]["error"] = str(e)
+    finally:
+        server.terminate()
+        server.join()
+    return results
+
+
+# ------------------------------------------------------------------
+# Baselines
+# ------------------------------------------------------------------
+
+def load_baselines() -> dict:
+    if not BASELINES.exists():
+        return {}
+    return json.loads(BASELINES.read_text())
+
+
+def save_baselines(baselines: dict):
+    BASELINES.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+
+
+def baseline_entry(result: dict, profile: dict) -> dict:
+    return {
+        "companies_per_sec": round(result["companies"] / result["seconds"], 2),
+        "p95_ms": {path: round(row["p95"], 3) for path, row in result["spans"].items()},
+        "profile": profile,
+        "recorded": date.today().isoformat(),
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list:
+    """Regressions past tolerance, as printable lines."""
+    problems = []
+    rate = result["companies"] / result["seconds"]
+    floor = baseline["companies_per_sec"] * (1 - tolerance)
+    if rate < floor:
+        problems.append(f"throughput {rate:.1f}/s < {floor:.1f}/s "
+                        f"(baseline {baseline['companies_per_sec']:.1f}/s)")
+    for path, base_p95 in sorted(baseline["p95_ms"].items()):
+        row = result["spans"].get(path)
+        if base_p95 < MIN_BASELINE_P95_MS or not row or row["count"] < MIN_SPAN_COUNT:
+            continue
+        ceiling = base_p95 * (1 + tolerance)
+        if row["p95"] > ceiling:
+            problems.append(f"{path} p95 {row['p95']:.1f}ms > {ceiling:.1f}ms "
+                            f"(baseline {base_p95:.1f}ms)")
+    return problems
+
+
+# ------------------------------------------------------------------
+# Reporting
+# ------------------------------------------------------------------
+
+def print_result(key: str, result: dict):
+    if "error" in result:
+        print(f"{key:<20} FAILED (log: {result['log']})")
+        print("    " + result["error"].strip().replace("\n", "\n    "))
+        return
+    rate = result["companies"] / result["seconds"]
+    print(f"{key:<20}{result['companies']:>7} companies{result['seconds']:>9.1f}s"
+          f"{rate:>10.1f} companies/s")
+    for path, row in result["spans"].items():
+        print(f"    {path:<28}{row['count']:>8}{row['p50']:>10.1f}ms p50{row['p95']:>10.1f}ms p95")
+
+
+def load_profile(path: str) -> dict:
+    profile = standins.DEFAULT_PROFILE.to_dict()
+    if path:
+        for section, values in json.loads(Path(path).read_text()).items():
+            if isinstance(values, dict):
+                profile[section].update(values)
+            else:
+                profile[section] = values
+    # Round-trip so a typo in the file fails here rather than in the server
+    return standins.Profile.from_dict(profile).to_dict()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end scraper benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[250, 1000, 4000])
+    parser.add_argument("--profile", help="JSON overrides for the stand-in latency "
+                                          "and failure profile (see standins.Profile)")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed fractional drop in throughput / growth in span p95")
+    parser.add_argument("--update-baselines", action="store_true",
+                        help="record this run's results as the new baselines")
+    parser.add_argument("--allow-missing-baselines", action="store_true",
+                        help="pass runs that have no comparable baseline instead of failing")
+    args = parser.parse_args()
+
+    dsn = bench_dsn()
+    profile = load_profile(args.profile)
+    ctx = multiprocessing.get_context("spawn")
+    workroot = tempfile.mkdtemp(prefix="yc_bench_")
+
+    print("=" * 70)
+    print(f"END-TO-END PIPELINE BENCHMARK (schema {BENCH_SCHEMA}, logs in {workroot})")
+    print("=" * 70)
+
+    results = {}
+    for size in args.sizes:
+        for scenario, result in run_size(ctx, dsn, size, profile, workroot).items():
+            key = f"{scenario}@{size}"
+            results[key] = result
+            print_result(key, result)
+
+    print("=" * 70)
+    failed = [key for key, result in results.items() if "error" in result]
+    baselines = load_baselines()
+
+    if args.update_baselines:
+        for key, result in results.items():
+            if "error" not in result:
+                baselines[key] = baseline_entry(result, profile)
+        save_baselines(baselines)
+        print(f"Baselines for {len(results) - len(failed)} runs written to {BASELINES}")
+        sys.exit(1 if failed else 0)
+
+    regressions = []
+    missing = []
+    for key, result in results.items():
+        if "error" in result:
+            continue
+        baseline = baselines.get(key)
+        if not baseline:
+            missing.append(key)
+            print(f"  {key}: no baseline (record one with --update-baselines)")
+            continue
+        if baseline.get("profile") != profile:
+            missing.append(key)
+            print(f"  {key}: baseline was recorded with a different stand-in profile")
+            continue
+        problems = compare(result, baseline, args.tolerance)
+        if problems:
+            regressions.append(key)
+            for problem in problems:
+                print(f"  {key}: {problem}")
+        else:
+            print(f"✓ {key} within {args.tolerance:.0%} of its baseline")
+
+    if args.allow_missing_baselines:
+        missing = []
+    if failed or regressions or missing:
+        print(f"{len(failed)} runs failed, {len(regressions)} regressed past baseline, "
+              f"{len(missing)} had no baseline")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Memory benchmark: per-company records and timing stats
+
+Measures, with tracemalloc, the bytes each company costs in two places:
+
+- in flight: the listing hit and normalized detail passed between stages,
+  as dicts (before) and as slotted records (after)
+- retained for the whole run: one timing float plus one performance-log
+  dict per company (before) against the fixed-size LatencyHistogram and
+  SlowestK heap (after)
+
+Usage:
+    python benchmarks/bench_record_memory.py [companies]
+"""
+
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "scraper"))
+
+from algolia_listing import trim_hit  # noqa: E402
+from latency import LatencyHistogram, SlowestK  # noqa: E402
+from records import CompanyDetail, CompanyTiming, ListingHit  # noqa: E402
+
+
+def raw_hit(i: int) -> dict:
+    return {
+        "id": i,
+        "name": f"Company {i}",
+        "slug": f"company-{i}",
+        "website": f"https://company-{i}.example.com",
+        "batch": "W24",
+        "stage": "Early",
+        "short_description": f"Company {i} builds developer tools",
+        "location": "San Francisco, CA, USA",
+        "tags": ["Developer Tools", "SaaS"],
+        "employee_size": 12,
+    }
+
+
+def dict_records(hits):
+    rows = []
+    for hit in hits:
+        company = trim_hit(hit)
+        rows.append((company, {
+            "batch": company.get("batch"),
+            "stage": company.get("stage", "Active"),
+            "description": company.get("short_description"),
+            "location": company.get("location"),
+            "tags": json.dumps(company.get("tags", [])),
+            "employee_range": company.get("employee_size"),
+            "website": company["website"].replace("https://", ""),
+        }))
+    return rows
+
+
+def slotted_records(hits):
+    rows = []
+    for hit in hits:
+        company = ListingHit.from_hit(hit)
+        rows.append((company, CompanyDetail(
+            batch=company.batch,
+            stage=company.stage,
+            description=company.short_description,
+            location=company.location,
+            tags=company.tags,
+            employee_range=company.employee_size,
+            website=company.website.replace("https://", ""),
+        )))
+    return rows
+
+
+def list_timings(n: int):
+    timings, logs = [], []
+    for i in range(n):
+        total = 100.0 + (i * 7919) % 900
+        timings.append(total / 1000)
+        logs.append({
+            "company": f"Company {i}", "slug": f"company-{i}",
+            "index_fetch_time": total * 0.4, "html_parse_time": total * 0.1,
+            "db_write_time": total * 0.2, "enrichment_time": total * 0.3,
+            "total_time": total,
+        })
+    return timings, logs
+
+
+def streaming_timings(n: int):
+    latency, slowest = LatencyHistogram(), SlowestK(5)
+    for i in range(n):
+        total = 100.0 + (i * 7919) % 900
+        latency.record(total)
+        slowest.add(total, CompanyTiming(
+            f"Company {i}", f"company-{i}", total,
+            total * 0.4, total * 0.1, total * 0.2, total * 0.3,
+        ))
+    return latency, slowest
+
+
+def retained_bytes(build, *args) -> int:
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    result = build(*args)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return after - before
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    # Inputs are built up front so only the records themselves are counted
+    hits = [raw_hit(i) for i in range(n)]
+
+    in_flight_before = retained_bytes(dict_records, hits) / n
+    in_flight_after = retained_bytes(slotted_records, hits) / n
+    run_before = retained_bytes(list_timings, n) / n
+    run_after = retained_bytes(streaming_timings, n) / n
+
+    print("=" * 70)
+    print(f"PER-COMPANY MEMORY ({n} companies)")
+    print("=" * 70)
+    print(f"{'':32}{'before':>12}{'after':>12}{'saved':>10}")
+    print(f"{'Listing hit + detail (in flight)':32}{in_flight_before:>10.0f} B"
+          f"{in_flight_after:>10.0f} B{1 - in_flight_after / in_flight_before:>9.0%}")
+    print(f"{'Timing stats (kept all run)':32}{run_before:>10.0f} B"
+          f"{run_after:>10.1f} B{1 - run_after / run_before:>9.0%}")
+    print("=" * 70)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Local stand-ins for the services the scrapers talk to
+
+One aiohttp process serves all three on 127.0.0.1:
+
+- Algolia /queries: a synthetic directory of `size` companies, sharded by
+  batch facet like the real index
+- YC detail pages: /companies/<slug> answers with one of the saved
+  fixtures in benchmarks/fixtures
+- company homepages: /s/<id>, with lognormal latency and a share of
+  HTTP errors, hangs and connection resets
+
+Every delay and failure is drawn from a generator seeded with the company
+id, so repeated runs at the same size see the same traffic. Homepages
+close the connection after every response, as a fresh host would.
+
+Used by bench_pipeline.py; run it alone to poke at the servers:
+
+Usage:
+    python benchmarks/standins.py [size]
+"""
+
+import asyncio
+import json
+import math
+import random
+import re
+import socket
+import sys
+import time
+import zlib
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+FIXTURES = Path(__file__).parent / "fixtures"
+BATCH_SIZE = 200
+
+
+@dataclass
+class Latency:
+    """Lognormal delay: half of all requests take less than median_ms."""
+    median_ms: float
+    sigma: float = 0.5
+
+    def draw(self, rng: random.Random) -> float:
+        return rng.lognormvariate(math.log(self.median_ms), self.sigma) / 1000
+
+
+@dataclass
+class Failures:
+    error_rate: float = 0.0    # HTTP 5xx/404
+    timeout_rate: float = 0.0  # headers never arrive
+    reset_rate: float = 0.0    # connection dropped before the response
+
+    def draw(self, rng: random.Random):
+        roll = rng.random()
+        for kind, rate in (("error", self.error_rate), ("timeout", self.timeout_rate),
+                           ("reset", self.reset_rate)):
+            if roll < rate:
+                return kind
+            roll -= rate
+        return None
+
+
+@dataclass
+class Profile:
+    algolia: Latency
+    detail: Latency
+    detail_failures: Failures
+    homepage: Latency
+    homepage_failures: Failures
+    homepage_kb: int = 40
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Profile":
+        return cls(
+            algolia=Latency(**data["algolia"]),
+            detail=Latency(**data["detail"]),
+            detail_failures=Failures(**data["detail_failures"]),
+            homepage=Latency(**data["homepage"]),
+            homepage_failures=Failures(**data["homepage_failures"]),
+            homepage_kb=data.get("homepage_kb", 40),
+        )
+
+
+DEFAULT_PROFILE = Profile(
+    algolia=Latency(median_ms=40, sigma=0.3),
+    detail=Latency(median_ms=60, sigma=0.5),
+    detail_failures=Failures(),
+    homepage=Latency(median_ms=120, sigma=0.8),
+    homepage_failures=Failures(error_rate=0.04, timeout_rate=0.01, reset_rate=0.02),
+)
+
+
+def rng_for(kind: str, key) -> random.Random:
+    return random.Random(zlib.crc32(f"{kind}:{key}".encode()))
+
+
+def make_hit(i: int, homepage_base: str) -> dict:
+    return {
+        "id": i,
+        "objectID": str(i),
+        "name": f"Company {i}",
+        "slug": f"company-{i}",
+        # Homepages keep their scheme: they are plain http on a local port
+        "website": f"{homepage_base}/s/{i}",
+        "batch": f"B{i // BATCH_SIZE:03d}",
+        "stage": "Early",
+        "short_description": f"Company {i} builds developer tools",
+        "location": "San Francisco, CA, USA",
+        "tags": ["Developer Tools", "SaaS"],
+        "employee_size": 10 + i % 40,
+        "_highlightResult": {
+            "name": {"value": f"Company {i}", "matchLevel": "none", "matchedWords": []},
+        },
+    }
+
+
+def make_homepage(i: int, rng: random.Random, size_kb: int) -> bytes:
+    links = ['<a href="/pricing">Pricing</a>', '<a href="/docs">Docs</a>']
+    if rng.random() < 0.6:
+        links.append('<a href="/careers">Careers</a>')
+    if rng.random() < 0.5:
+        links.append('<a href="/blog">Blog</a>')
+    filler = f"<p>Company {i} helps teams ship software faster.</p>\n"
+    # Signals sit near the end, so scanners read most of the page
+    body = filler * max(1, size_kb * 1024 // len(filler))
+    footer = f'<footer>{"".join(links)}'
+    if rng.random() < 0.7:
+        footer += f'<a href="mailto:hello@company-{i}.com">hello@company-{i}.com</a>'
+    footer += "</footer>"
+    return (f"<!DOCTYPE html><html><head><title>Company {i}</title></head>"
+            f"<body><nav>Company {i}</nav>{body}{footer}</body></html>").encode()
+
+
+def build_app(size: int, profile: Profile, homepage_base: str):
+    from aiohttp import web
+
+    fixtures = [path.read_bytes() for path in sorted(FIXTURES.glob("company_*.html"))]
+    if not fixtures:
+        raise SystemExit(f"No fixture pages found in {FIXTURES}")
+
+    batches = {}
+    for i in range(size):
+        batches.setdefault(f"B{i // BATCH_SIZE:03d}", []).append(i)
+    requests_seen = {"algolia": 0}
+
+    async def queries(request):
+        payload = await request.json()
+        requests_seen["algolia"] += 1
+        await asyncio.sleep(profile.algolia.draw(rng_for("algolia", requests_seen["algolia"])))
+        results = []
+        for query in payload["requests"]:
+            if query.get("hitsPerPage") == 0:
+                results.append({
+                    "nbHits": size,
+                    "facets": {"batch": {b: len(ids) for b, ids in batches.items()}},
+                })
+                continue
+            batch = re.search(r'batch:"([^"]+)"', query.get("filters", "")).group(1)
+            per_page = query["hitsPerPage"]
+            ids = batches.get(batch, [])[query["page"] * per_page:(query["page"] + 1) * per_page]
+            results.append({"hits": [make_hit(i, homepage_base) for i in ids]})
+        return web.json_response({"results": results})
+
+    async def detail(request):
+        slug = request.match_info["slug"]
+        rng = rng_for("detail", slug)
+        await asyncio.sleep(profile.detail.draw(rng))
+        failure = profile.detail_failures.draw(rng)
+        if failure:
+            return await fail(request, failure)
+        page = fixtures[zlib.crc32(slug.encode()) % len(fixtures)]
+        return web.Response(body=page, content_type="text/html", charset="utf-8")
+
+    async def homepage(request):
+        i = int(request.match_info["id"])
+        rng = rng_for("homepage", i)
+        await asyncio.sleep(profile.homepage.draw(rng))
+        failure = profile.homepage_failures.draw(rng)
+        if failure:
+            return await fail(request, failure)
+        resp = web.Response(body=make_homepage(i, rng, profile.homepage_kb),
+                            content_type="text/html", charset="utf-8")
+        resp.force_close()
+        return resp
+
+    async def fail(request, kind: str):
+        if kind == "timeout":
+            # Hold the request until the client gives up and disconnects
+            await asyncio.sleep(3600)
+        if kind == "reset":
+            if request.transport:
+                request.transport.abort()
+            raise asyncio.CancelledError()
+        resp = web.Response(status=503 if zlib.crc32(request.path.encode()) % 2 else 404)
+        resp.force_close()
+        return resp
+
+    app = web.Application(client_max_size=1024 ** 2)
+    app.router.add_post("/1/indexes/*/queries", queries)
+    app.router.add_get("/companies/{slug}", detail)
+    app.router.add_get("/s/{id:\\d+}", homepage)
+    return app
+
+
+def serve(port: int, size: int, profile: dict):
+    """Process target: serve every stand-in on 127.0.0.1:port until terminated."""
+    from aiohttp import web
+
+    base = f"http://127.0.0.1:{port}"
+    app = build_app(size, Profile.from_dict(profile), base)
+    # Hanging homepages would otherwise hold shutdown for the full grace period
+    web.run_app(app, host="127.0.0.1", port=port, print=None,
+                access_log=None, shutdown_timeout=0.5)
+
+
+def urls(port: int) -> dict:
+    base = f"http://127.0.0.1:{port}"
+    return {
+        "algolia": f"{base}/1/indexes/*/queries",
+        "yc": base,
+        "homepage": base,
+    }
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port: int, timeout: float = 10):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    sys.exit("Stand-in server did not start")
+
+
+if __name__ == "__main__":
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    port = free_port()
+    print(json.dumps({"size": size, **urls(port)}, indent=2))
+    serve(port, size, DEFAULT_PROFILE.to_dict())
@@ -50,24 +50,10 @@ export default function Analytics() {
   });
 
   const exportToCSV = () => {
-    const headers = ['Company', 'Domain', 'Batch', 'Tags', 'Contact'];
-    const rows = companies.map(c => [
-      c.name,
-      c.domain || '',
-      'Summer 2013',
-      'Marketplace, E-commerce',
-      '-'
-    ]);
-    
-    const csvContent = [
-      headers.join(','),
-      ...rows.map(row => row.join(','))
-    ].join('\n');
-    
-    const blob = new Blob([csvContent], { type: 'text/csv' });
-    const url = window.URL.createObjectURL(blob);
+    // The API streams the full dataset (latest snapshot + enrichment), not
+    // just the rows loaded on this page
     const a = document.createElement('a');
-    a.href = url;
+    a.href = 'https://yc-companies-api.onrender.com/api/export?format=csv';
     a.download = `yc-companies-${new Date().toISOString().split('T')[0]}.csv`;
     a.click();
   };
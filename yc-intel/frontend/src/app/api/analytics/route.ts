@@ -1,20 +1,39 @@
-﻿import { NextResponse } from "next/server";
+﻿import { NextRequest, NextResponse } from "next/server";
 
 const API_BASE_URL = "http://localhost:8000/api";
 
-export async function GET() {
+function cacheHeaders(response: Response) {
+  const headers: Record<string, string> = {};
+  for (const key of ["etag", "cache-control"]) {
+    const value = response.headers.get(key);
+    if (value) headers[key] = value;
+  }
+  return headers;
+}
+
+export async function GET(request: NextRequest) {
   try {
     const url = `${API_BASE_URL}/analytics`;
+    // The API answers with an ETag; let the browser revalidate through us
+    const ifNoneMatch = request.headers.get("if-none-match");
     const response = await fetch(url, {
-      cache: "no-store"
+      cache: "no-store",
+      headers: ifNoneMatch ? { "If-None-Match": ifNoneMatch } : {}
     });
     
+    const headers = cacheHeaders(response);
+    if (response.status === 304) {
+      return new NextResponse(null, { status: 304, headers });
+    }
     if (!response.ok) {
       throw new Error("Failed to fetch analytics");
     }
     
-    const data = await response.json();
-    return NextResponse.json(data);
+    // Pass the body through untouched so the strong ETag still matches it
+    const body = await response.text();
+    return new NextResponse(body, {
+      headers: { ...headers, "content-type": "application/json" }
+    });
   } catch (error) {
     return NextResponse.json({ error: "Failed to fetch analytics" }, { status: 500 });
   }
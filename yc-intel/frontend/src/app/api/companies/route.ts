@@ -2,6 +2,15 @@
 
 const API_BASE_URL = "http://localhost:8000/api";
 
+function cacheHeaders(response: Response) {
+  const headers: Record<string, string> = {};
+  for (const key of ["etag", "cache-control"]) {
+    const value = response.headers.get(key);
+    if (value) headers[key] = value;
+  }
+  return headers;
+}
+
 export async function GET(request: NextRequest) {
   try {
     const searchParams = request.nextUrl.searchParams;
@@ -11,18 +20,33 @@ export async function GET(request: NextRequest) {
     
     const params = new URLSearchParams({ page, limit });
     if (search) params.append("search", search);
+    // Keyset cursor and filters pass straight through to the API
+    for (const key of ["cursor", "batch", "stage", "location", "is_active"]) {
+      const value = searchParams.get(key);
+      if (value) params.append(key, value);
+    }
     
     const url = `${API_BASE_URL}/companies?${params}`;
+    // The API answers with an ETag; let the browser revalidate through us
+    const ifNoneMatch = request.headers.get("if-none-match");
     const response = await fetch(url, {
-      cache: "no-store"
+      cache: "no-store",
+      headers: ifNoneMatch ? { "If-None-Match": ifNoneMatch } : {}
     });
     
+    const headers = cacheHeaders(response);
+    if (response.status === 304) {
+      return new NextResponse(null, { status: 304, headers });
+    }
     if (!response.ok) {
       throw new Error("Failed to fetch companies");
     }
     
-    const data = await response.json();
-    return NextResponse.json(data);
+    // Pass the body through untouched so the strong ETag still matches it
+    const body = await response.text();
+    return new NextResponse(body, {
+      headers: { ...headers, "content-type": "application/json" }
+    });
   } catch (error) {
     return NextResponse.json({ error: "Failed to fetch companies" }, { status: 500 });
   }
@@ -0,0 +1,256 @@
+"""
+Async, facet-sharded Algolia listing
+
+- Splits the index into shards by a facet (batch by default) so no single
+  query runs into Algolia's pagination cap
+- Packs several page requests into each multi-query POST to /queries
+- Fetches shards concurrently under a semaphore, retrying failed POSTs and
+  raising ListingError once a request runs out of retries
+- Drops duplicate hits by company id
+- Streams result pages to the caller as they arrive
+- Trims every hit to the fields the scrapers read, asking Algolia to leave
+  out highlight and snippet metadata in the first place
+"""
+
+import asyncio
+import itertools
+import logging
+import math
+from typing import AsyncIterator, Dict, List, Optional, Sequence
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Algolia refuses to page past this many hits for a single query
+ALGOLIA_PAGINATION_LIMIT = 1000
+
+# Hit attributes read downstream. A full hit also carries _highlightResult,
+# long descriptions, logos and more, several times the size of these
+LISTING_FIELDS = (
+    "id",
+    "name",
+    "slug",
+    "website",
+    "batch",
+    "stage",
+    "short_description",
+    "location",
+    "tags",
+    "employee_size",
+)
+
+
+class ListingError(RuntimeError):
+    """The listing could not be fetched completely."""
+
+
+def trim_hit(hit: Dict, fields: Sequence[str] = LISTING_FIELDS) -> Dict:
+    return {field: hit[field] for field in fields if field in hit}
+
+
+class AlgoliaLister:
+    def __init__(
+        self,
+        url: str,
+        headers: Dict,
+        index_name: str = "YCCompany_production",
+        filters: str = "",
+        facet: str = "batch",
+        hits_per_page: int = 100,
+        pages_per_request: int = 8,
+        concurrency: int = 6,
+        retries: int = 3,
+        timeout: float = 15,
+        fields: Optional[Sequence[str]] = LISTING_FIELDS,
+    ):
+        self.url = url
+        self.headers = headers
+        self.index_name = index_name
+        self.filters = filters
+        self.facet = facet
+        self.hits_per_page = hits_per_page
+        self.pages_per_request = pages_per_request
+        self.concurrency = concurrency
+        self.retries = retries
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        # None keeps whole hits
+        self.fields = fields
+
+        self.stats = {
+            "shards": 0,
+            "requests": 0,
+            "failed_requests": 0,
+            "hits": 0,
+            "duplicates": 0,
+        }
+
+    # --------------------------------------------------------------
+    # Query building
+    # --------------------------------------------------------------
+
+    def _filters_for(self, value: Optional[str]) -> str:
+        if value is None:
+            return self.filters
+        facet_filter = f'{self.facet}:"{value}"'
+        if not self.filters:
+            return facet_filter
+        return f"{self.filters} AND {facet_filter}"
+
+    def _page_request(self, filters: str, page: int) -> Dict:
+        request = {
+            "indexName": self.index_name,
+            "query": "",
+            "page": page,
+            "hitsPerPage": self.hits_per_page,
+        }
+        if filters:
+            request["filters"] = filters
+        if self.fields is not None:
+            request["attributesToRetrieve"] = list(self.fields)
+            request["attributesToHighlight"] = []
+            request["attributesToSnippet"] = []
+        return request
+
+    # --------------------------------------------------------------
+    # HTTP
+    # --------------------------------------------------------------
+
+    async def _post(self, session: aiohttp.ClientSession, requests: List[Dict]) -> List[Dict]:
+        payload = {"requests": requests}
+
+        for attempt in range(1, self.retries + 1):
+            try:
+                self.stats["requests"] += 1
+                async with session.post(
+                    self.url, json=payload, headers=self.headers, timeout=self.timeout
+                ) as resp:
+                    resp.raise_for_status()
+                    data = await resp.json(content_type=None)
+                    return data["results"]
+
+            except Exception as e:
+                if attempt == self.retries:
+                    # A missing chunk would drop whole shards from the listing
+                    # without anyone noticing, so the listing fails instead
+                    self.stats["failed_requests"] += 1
+                    raise ListingError(
+                        f"Algolia multi-query failed after {attempt} attempts: {e}"
+                    ) from e
+                await asyncio.sleep(0.5 * 2 ** (attempt - 1))
+
+    async def fetch_shards(self, session: aiohttp.ClientSession) -> List[Dict]:
+        """Return one {"filters", "count"} entry per facet value."""
+        request = {
+            "indexName": self.index_name,
+            "query": "",
+            "hitsPerPage": 0,
+            "facets": [self.facet],
+            "maxValuesPerFacet": 1000,
+        }
+        if self.filters:
+            request["filters"] = self.filters
+
+        results = await self._post(session, [request])
+        if not results:
+            raise ListingError("Could not load Algolia facet counts")
+
+        result = results[0]
+        counts = result.get("facets", {}).get(self.facet, {})
+        total = result.get("nbHits", 0)
+
+        shards = [
+            {"filters": self._filters_for(value), "count": count}
+            for value, count in counts.items()
+        ]
+
+        for value, count in counts.items():
+            if count > ALGOLIA_PAGINATION_LIMIT:
+                logger.warning(
+                    f"Shard {self.facet}={value} has {count} hits; only the first "
+                    f"{ALGOLIA_PAGINATION_LIMIT} are reachable"
+                )
+
+        # Hits without a facet value fall outside every shard; pick them up
+        # with an unsharded query and let de-duplication sort out the overlap
+        covered = sum(counts.values())
+        if covered < total:
+            logger.info(
+                f"{total - covered} hits not covered by {self.facet} facets, "
+                f"adding unsharded query"
+            )
+            shards.append({"filters": self._filters_for(None), "count": total})
+
+        return shards
+
+    # --------------------------------------------------------------
+    # Listing
+    # --------------------------------------------------------------
+
+    async def iter_pages(self) -> AsyncIterator[List[Dict]]:
+        """
+        Yield de-duplicated, trimmed hits one result page at a time.
+
+        At most `concurrency` multi-query POSTs are in flight, and new ones
+        are only sent once the consumer has taken what arrived, so a slow
+        consumer holds the listing back instead of letting pages pile up.
+        """
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            shards = await self.fetch_shards(session)
+            self.stats["shards"] = len(shards)
+
+            page_requests = []
+            for shard in shards:
+                reachable = min(shard["count"], ALGOLIA_PAGINATION_LIMIT)
+                pages = math.ceil(reachable / self.hits_per_page)
+                page_requests.extend(
+                    self._page_request(shard["filters"], page) for page in range(pages)
+                )
+
+            chunks = iter([
+                page_requests[i:i + self.pages_per_request]
+                for i in range(0, len(page_requests), self.pages_per_request)
+            ])
+            logger.info(
+                f"Listing {len(shards)} shards with {len(page_requests)} pages "
+                f"in {math.ceil(len(page_requests) / self.pages_per_request)} "
+                f"multi-query requests"
+            )
+
+            seen = set()
+            pending = set()
+            try:
+                while True:
+                    for chunk in itertools.islice(chunks, self.concurrency - len(pending)):
+                        pending.add(asyncio.create_task(self._post(session, chunk)))
+                    if not pending:
+                        break
+
+                    done, pending = await asyncio.wait(
+                        pending, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    for task in done:
+                        for result in task.result():
+                            page = []
+                            for hit in result.get("hits", []):
+                                self.stats["hits"] += 1
+                                key = hit.get("id", hit.get("objectID"))
+                                if key in seen:
+                                    self.stats["duplicates"] += 1
+                                    continue
+                                seen.add(key)
+                                page.append(
+                                    hit if self.fields is None else trim_hit(hit, self.fields)
+                                )
+                            if page:
+                                yield page
+            finally:
+                for task in pending:
+                    task.cancel()
+
+    async def list_all(self) -> List[Dict]:
+        companies = []
+        async for page in self.iter_pages():
+            companies.extend(page)
+        return companies
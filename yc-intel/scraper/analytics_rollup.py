@@ -0,0 +1,215 @@
+"""
+Current-state analytics rollup
+
+/api/analytics used to GROUP BY over every historical snapshot, so it got
+slower with each run and counted a company once per snapshot. This keeps
+per-(dimension, value) company counts taken from each active company's
+latest snapshot, and refreshes them incrementally: only companies whose
+current_snapshot_id moved since the last refresh, or that stopped counting
+(deactivated, deleted, or left without a current snapshot), are re-read,
+their old contribution is subtracted and the new one added.
+`python analytics_rollup.py --verify` compares the counts with a full
+recount; `--rebuild` recomputes everything from scratch.
+"""
+
+import logging
+from typing import List, Tuple
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ("batch", "stage", "location")
+
+# What each company should count for: its current snapshot, if it is active
+COUNTED_SQL = """
+    SELECT c.id AS company_id, s.id AS snapshot_id,
+           s.batch, s.stage, NULLIF(s.location, '') AS location, s.scraped_at
+    FROM companies c
+    JOIN company_snapshots s ON s.id = c.current_snapshot_id
+    WHERE c.is_active
+"""
+
+# Companies whose current snapshot is not the one they are counted under.
+# The full join also finds state rows for companies that no longer count;
+# they come through with a NULL snapshot_id and only get subtracted.
+# Writers set current_snapshot_id in the snapshot's own transaction, so a
+# writer that commits late is picked up on the next refresh; a scraped_at
+# watermark would skip it, since NOW() is its transaction's start time
+CHANGES_SQL = f"""
+    CREATE TEMP TABLE rollup_changes ON COMMIT DROP AS
+    SELECT COALESCE(ct.company_id, st.company_id) AS company_id, ct.snapshot_id,
+           ct.batch, ct.stage, ct.location, ct.scraped_at
+    FROM ({COUNTED_SQL}) ct
+    FULL JOIN analytics_rollup_state st ON st.company_id = ct.company_id
+    WHERE ct.company_id IS NULL OR st.snapshot_id IS DISTINCT FROM ct.snapshot_id
+"""
+
+# Every (dimension, value) where the rollup disagrees with a recount
+RECOUNT_SQL = "\n        UNION ALL\n        ".join(
+    f"SELECT '{dim}' AS dimension, {dim} AS value, COUNT(*) AS n "
+    f"FROM counted WHERE {dim} IS NOT NULL GROUP BY {dim}"
+    for dim in DIMENSIONS
+)
+DRIFT_SQL = f"""
+    WITH counted AS ({COUNTED_SQL}),
+    recount AS (
+        {RECOUNT_SQL}
+    )
+    SELECT COALESCE(r.dimension, rc.dimension), COALESCE(r.value, rc.value),
+           COALESCE(r.company_count, 0), COALESCE(rc.n, 0)
+    FROM analytics_rollup r
+    FULL JOIN recount rc ON rc.dimension = r.dimension AND rc.value = r.value
+    WHERE COALESCE(r.company_count, 0) <> COALESCE(rc.n, 0)
+    ORDER BY 1, 2
+"""
+
+
+# Applied by migrate.py, never at scraper startup
+def ensure_rollup_tables(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_rollup (
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            company_count INTEGER NOT NULL,
+            refreshed_at TIMESTAMP NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (dimension, value)
+        )
+    """)
+    # What each company currently contributes to the rollup
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS analytics_rollup_state (
+            company_id INTEGER PRIMARY KEY,
+            batch TEXT,
+            stage TEXT,
+            location TEXT,
+            snapshot_id INTEGER,
+            snapshot_at TIMESTAMP NOT NULL
+        )
+    """)
+
+
+# Applied by migrate.py to state tables created before snapshot_id; their
+# rows are all re-read once by the next refresh
+def ensure_rollup_snapshot_column(cur):
+    cur.execute("""
+        ALTER TABLE analytics_rollup_state
+        ADD COLUMN IF NOT EXISTS snapshot_id INTEGER
+    """)
+
+
+def refresh_rollup(conn) -> int:
+    """
+    Fold companies whose current snapshot changed into analytics_rollup.
+
+    Runs in one transaction under an exclusive lock so the list and detail
+    scrapers finishing together cannot double count. Returns the number of
+    companies whose contribution changed.
+    """
+    cur = conn.cursor()
+    try:
+        cur.execute("LOCK TABLE analytics_rollup_state IN EXCLUSIVE MODE")
+        cur.execute(CHANGES_SQL)
+        cur.execute("SELECT COUNT(*) FROM rollup_changes")
+        changed = cur.fetchone()[0]
+
+        if changed:
+            for dim in DIMENSIONS:
+                # Take back what the changed companies counted for before...
+                cur.execute(f"""
+                    UPDATE analytics_rollup r
+                    SET company_count = r.company_count - old.n, refreshed_at = NOW()
+                    FROM (
+                        SELECT st.{dim} AS value, COUNT(*) AS n
+                        FROM analytics_rollup_state st
+                        JOIN rollup_changes ch USING (company_id)
+                        WHERE st.{dim} IS NOT NULL
+                        GROUP BY st.{dim}
+                    ) old
+                    WHERE r.dimension = %s AND r.value = old.value
+                """, (dim,))
+                # ...and add what they count for now
+                cur.execute(f"""
+                    INSERT INTO analytics_rollup (dimension, value, company_count)
+                    SELECT %s, {dim}, COUNT(*)
+                    FROM rollup_changes
+                    WHERE {dim} IS NOT NULL
+                    GROUP BY {dim}
+                    ON CONFLICT (dimension, value) DO UPDATE SET
+                        company_count = analytics_rollup.company_count + EXCLUDED.company_count,
+                        refreshed_at = NOW()
+                """, (dim,))
+
+            cur.execute("DELETE FROM analytics_rollup WHERE company_count <= 0")
+            cur.execute("""
+                DELETE FROM analytics_rollup_state st
+                USING rollup_changes ch
+                WHERE st.company_id = ch.company_id AND ch.snapshot_id IS NULL
+            """)
+            cur.execute("""
+                INSERT INTO analytics_rollup_state
+                (company_id, batch, stage, location, snapshot_id, snapshot_at)
+                SELECT company_id, batch, stage, location, snapshot_id, scraped_at
+                FROM rollup_changes
+                WHERE snapshot_id IS NOT NULL
+                ON CONFLICT (company_id) DO UPDATE SET
+                    batch = EXCLUDED.batch,
+                    stage = EXCLUDED.stage,
+                    location = EXCLUDED.location,
+                    snapshot_id = EXCLUDED.snapshot_id,
+                    snapshot_at = EXCLUDED.snapshot_at
+            """)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    logger.info(f"Analytics rollup refreshed ({changed} companies changed)")
+    return changed
+
+
+def rollup_drift(conn) -> List[Tuple[str, str, int, int]]:
+    """(dimension, value, rolled up, recounted) wherever the rollup is off."""
+    cur = conn.cursor()
+    try:
+        cur.execute(DRIFT_SQL)
+        return cur.fetchall()
+    finally:
+        conn.rollback()
+        cur.close()
+
+
+def rebuild_rollup(conn) -> int:
+    """Drop all rollup state and recompute it from company_snapshots."""
+    cur = conn.cursor()
+    cur.execute("TRUNCATE analytics_rollup, analytics_rollup_state")
+    conn.commit()
+    cur.close()
+    return refresh_rollup(conn)
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+    from dotenv import load_dotenv
+    from db_pool import get_pool
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Refresh the analytics rollup")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="recompute from scratch instead of incrementally")
+    parser.add_argument("--verify", action="store_true",
+                        help="compare the counts with a full recount and change nothing")
+    args = parser.parse_args()
+
+    dsn = os.getenv("DATABASE_URL") or os.getenv("NEON_DATABASE_URL")
+    with get_pool(dsn).connection() as conn:
+        if args.verify:
+            drift = rollup_drift(conn)
+            for dimension, value, rolled_up, recounted in drift:
+                print(f"{dimension}={value!r}: rollup {rolled_up}, recount {recounted}")
+            raise SystemExit(1 if drift else 0)
+        (rebuild_rollup if args.rebuild else refresh_rollup)(conn)
@@ -0,0 +1,105 @@
+"""
+Materialized current state: companies.current_snapshot_id
+
+Every writer that inserts a company_snapshots row points the company's
+current_snapshot_id at it in the same transaction, so "latest snapshot"
+becomes one indexed join instead of an ORDER BY scraped_at DESC LIMIT 1
+per company. The same statement copies the snapshot's batch, stage and
+location onto the company, so the API's filtered keyset walk can use a
+(batch, id)-style index on companies alone. The columns are added by
+migrate.py; run this module once after it to backfill companies scraped
+before the columns existed:
+
+    python current_snapshot.py [--batch-size 5000]
+"""
+
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "5000"))
+
+
+def ensure_current_snapshot_column(cur):
+    cur.execute("""
+        ALTER TABLE companies
+        ADD COLUMN IF NOT EXISTS current_snapshot_id INTEGER
+            REFERENCES company_snapshots(id) ON DELETE SET NULL
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_companies_current_snapshot
+        ON companies (current_snapshot_id)
+    """)
+
+
+# Applied by migrate.py; written alongside current_snapshot_id
+def ensure_current_state_columns(cur):
+    cur.execute("""
+        ALTER TABLE companies
+        ADD COLUMN IF NOT EXISTS batch TEXT,
+        ADD COLUMN IF NOT EXISTS stage TEXT,
+        ADD COLUMN IF NOT EXISTS location TEXT
+    """)
+
+
+def backfill_current_snapshots(conn, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    Point every company at its newest snapshot and copy its batch, stage
+    and location, walking company ids in
+    ranges of batch_size and committing after each range so the backfill
+    never holds long locks. Safe to re-run; returns rows changed.
+    """
+    cur = conn.cursor()
+    cur.execute("SELECT COALESCE(MIN(id), 0), COALESCE(MAX(id), -1) FROM companies")
+    low, high = cur.fetchone()
+
+    updated = 0
+    start = time.time()
+    for first in range(low, high + 1, batch_size):
+        cur.execute(
+            """
+            UPDATE companies c
+            SET current_snapshot_id = l.id, batch = l.batch, stage = l.stage,
+                location = l.location
+            FROM (
+                SELECT DISTINCT ON (company_id) company_id, id, batch, stage, location
+                FROM company_snapshots
+                WHERE company_id BETWEEN %s AND %s
+                ORDER BY company_id, scraped_at DESC, id DESC
+            ) l
+            WHERE c.id = l.company_id
+              AND (c.current_snapshot_id IS DISTINCT FROM l.id
+                   OR c.batch IS DISTINCT FROM l.batch
+                   OR c.stage IS DISTINCT FROM l.stage
+                   OR c.location IS DISTINCT FROM l.location)
+            """,
+            (first, first + batch_size - 1),
+        )
+        updated += cur.rowcount
+        conn.commit()
+        logger.info(f"Backfilled companies {first}-{min(first + batch_size - 1, high)}: "
+                    f"{updated} updated so far")
+
+    cur.close()
+    logger.info(f"Backfill done: {updated} companies updated in {time.time() - start:.1f}s")
+    return updated
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from db_pool import get_pool
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(
+        description="Backfill companies.current_snapshot_id, batch, stage and location")
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    args = parser.parse_args()
+
+    dsn = os.getenv("DATABASE_URL") or os.getenv("NEON_DATABASE_URL")
+    with get_pool(dsn).connection() as conn:
+        backfill_current_snapshots(conn, args.batch_size)
@@ -0,0 +1,175 @@
+"""
+Shared psycopg2 connection pool
+
+- One pool per DSN, shared by every scraper stage in the process
+- TCP keepalives so idle Neon connections are not dropped mid-run
+- Health check (SELECT 1) on connections that sat idle, replacing dead ones
+- Blocks instead of raising when every connection is checked out
+- Pool statistics for the end-of-run summary
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+import psycopg2
+from psycopg2 import pool
+
+logger = logging.getLogger(__name__)
+
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "20"))
+# Connections idle for longer than this are pinged before being handed out
+DB_POOL_HEALTH_CHECK_AFTER = float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER", "30"))
+
+KEEPALIVE_KWARGS = {
+    "keepalives": 1,
+    "keepalives_idle": 30,
+    "keepalives_interval": 10,
+    "keepalives_count": 5,
+}
+
+
+class _CountingPool(pool.ThreadedConnectionPool):
+    def __init__(self, *args, **kwargs):
+        self.connections_created = 0
+        super().__init__(*args, **kwargs)
+
+    def _connect(self, key=None):
+        self.connections_created += 1
+        return super()._connect(key)
+
+
+class DatabasePool:
+    def __init__(self, dsn: str, minconn: int = DB_POOL_MIN, maxconn: int = DB_POOL_MAX,
+                 health_check_after: float = DB_POOL_HEALTH_CHECK_AFTER):
+        self.dsn = dsn
+        self.maxconn = maxconn
+        self.health_check_after = health_check_after
+        self._pool = _CountingPool(minconn, maxconn, dsn, **KEEPALIVE_KWARGS)
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._last_used: Dict[int, float] = {}
+        self._in_use = 0
+
+        self.stats = {
+            "checkouts": 0,
+            "wait_time_ms": 0.0,
+            "peak_in_use": 0,
+            "health_checks": 0,
+            "health_check_failures": 0,
+        }
+
+    def _healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+
+        last_used = self._last_used.get(id(conn))
+        if last_used is not None and time.monotonic() - last_used < self.health_check_after:
+            return True
+
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            healthy = True
+        except psycopg2.Error:
+            healthy = False
+
+        with self._lock:
+            self.stats["health_checks"] += 1
+            if not healthy:
+                self.stats["health_check_failures"] += 1
+        return healthy
+
+    def getconn(self):
+        wait_start = time.monotonic()
+        self._slots.acquire()
+
+        try:
+            conn = self._pool.getconn()
+            while not self._healthy(conn):
+                logger.warning("Discarding unhealthy pooled connection")
+                self._last_used.pop(id(conn), None)
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._lock:
+            self.stats["checkouts"] += 1
+            self.stats["wait_time_ms"] += (time.monotonic() - wait_start) * 1000
+            self._in_use += 1
+            self.stats["peak_in_use"] = max(self.stats["peak_in_use"], self._in_use)
+        return conn
+
+    def putconn(self, conn, close: bool = False):
+        with self._lock:
+            self._in_use -= 1
+        if close or conn.closed:
+            self._last_used.pop(id(conn), None)
+        else:
+            self._last_used[id(conn)] = time.monotonic()
+        self._pool.putconn(conn, close=close or bool(conn.closed))
+        self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection; roll back and return it to the pool on exit."""
+        conn = self.getconn()
+        broken = False
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                broken = True
+            raise
+        finally:
+            self.putconn(conn, close=broken)
+
+    def get_stats(self) -> Dict:
+        return {
+            **self.stats,
+            "connections_created": self._pool.connections_created,
+            "in_use": self._in_use,
+            "max_size": self.maxconn,
+        }
+
+    def log_stats(self):
+        stats = self.get_stats()
+        avg_wait = stats["wait_time_ms"] / stats["checkouts"] if stats["checkouts"] else 0
+        logger.info(
+            f"DB pool: {stats['checkouts']} checkouts over "
+            f"{stats['connections_created']} connections "
+            f"(peak {stats['peak_in_use']}/{stats['max_size']} in use, "
+            f"avg wait {avg_wait:.1f}ms, {stats['health_checks']} health checks, "
+            f"{stats['health_check_failures']} failed)"
+        )
+
+    def close(self):
+        self._pool.closeall()
+
+
+_pools: Dict[str, DatabasePool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(dsn: str, **kwargs) -> DatabasePool:
+    """Return the process-wide pool for a DSN, creating it on first use."""
+    with _pools_lock:
+        if dsn not in _pools:
+            _pools[dsn] = DatabasePool(dsn, **kwargs)
+        return _pools[dsn]
+
+
+def close_all():
+    with _pools_lock:
+        for db_pool in _pools.values():
+            db_pool.close()
+        _pools.clear()
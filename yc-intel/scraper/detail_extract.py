@@ -0,0 +1,181 @@
+"""
+Company detail page extraction
+
+YC detail pages embed the company record as HTML-escaped JSON in a
+data-page attribute. extract_company_detail pulls that attribute out with a
+plain byte scan and decodes it, and only falls back to walking the DOM when
+the JSON is missing or unusable.
+"""
+
+import html as html_lib
+import re
+from typing import Dict, Optional, Union
+
+from bs4 import BeautifulSoup
+
+try:
+    import orjson
+
+    def _loads(data):
+        return orjson.loads(data)
+except ImportError:
+    import json
+
+    def _loads(data):
+        return json.loads(data)
+
+try:
+    import lxml  # noqa: F401
+    FALLBACK_PARSER = "lxml"
+except ImportError:
+    FALLBACK_PARSER = "html.parser"
+
+DATA_PAGE_MARKER = b'data-page="'
+EMPLOYEE_RANGE_RE = re.compile(r'^\s*(\d+)\s*-\s*(\d+)\s*$')
+
+SEASON_CODES = {"winter": "W", "summer": "S", "spring": "X", "fall": "F"}
+
+EMPLOYEE_PATTERNS = [
+    re.compile(r'(\d+-\d+)\s*employees', re.IGNORECASE),
+    re.compile(r'(\d+\s*-\s*\d+)\s*people', re.IGNORECASE),
+    re.compile(r'Team size:\s*(\d+-\d+)', re.IGNORECASE),
+]
+
+
+def _normalize_batch(batch: Optional[str]) -> Optional[str]:
+    """Map "Winter 2021" / "W21" style batch names to the short code."""
+    if not batch:
+        return None
+    match = re.search(r'\b([WSXF]\d{2})\b', batch)
+    if match:
+        return match.group(1)
+    match = re.match(r'(\w+)\s+\d{2}(\d{2})', batch.strip())
+    if match and match.group(1).lower() in SEASON_CODES:
+        return SEASON_CODES[match.group(1).lower()] + match.group(2)
+    return batch
+
+
+def _normalize_stage(status: Optional[str]) -> str:
+    if status in ("Acquired", "Public"):
+        return status
+    return "Active"
+
+
+def _employee_range(team_size) -> Optional[str]:
+    """
+    Keep team_size only when it is a range, the one form the DOM walk has
+    ever stored; a bare head count like 42 would change every snapshot.
+    """
+    match = EMPLOYEE_RANGE_RE.match(str(team_size or ""))
+    return f"{match.group(1)}-{match.group(2)}" if match else None
+
+
+def find_page_json(page: bytes) -> Optional[Dict]:
+    """Return the decoded data-page JSON, or None if the page has none."""
+    start = page.find(DATA_PAGE_MARKER)
+    if start == -1:
+        return None
+    start += len(DATA_PAGE_MARKER)
+    # The attribute value is HTML-escaped, so the first raw quote closes it
+    end = page.find(b'"', start)
+    if end == -1:
+        return None
+
+    raw = page[start:end]
+    if b'&' in raw:
+        raw = html_lib.unescape(raw.decode('utf-8', errors='replace')).encode('utf-8')
+    try:
+        return _loads(raw)
+    except ValueError:
+        return None
+
+
+def extract_from_page_json(data: Dict) -> Optional[Dict]:
+    company = data.get("props", {}).get("company")
+    if not isinstance(company, dict):
+        return None
+
+    tags = company.get("industries") or company.get("tags") or []
+    tags = list(dict.fromkeys(t for t in tags if t))
+
+    return {
+        "batch": _normalize_batch(company.get("batch_name") or company.get("batch")),
+        "stage": _normalize_stage(company.get("status")),
+        "description": (company.get("long_description") or company.get("one_liner") or "").strip(),
+        "location": company.get("location") or company.get("all_locations") or "",
+        "tags": tags,
+        "employee_range": _employee_range(company.get("team_size")),
+    }
+
+
+def extract_from_html(page: Union[str, bytes], parser: str = FALLBACK_PARSER) -> Dict:
+    """DOM walk over the rendered page; used when there is no data-page JSON."""
+    soup = BeautifulSoup(page, parser)
+    text = soup.get_text()
+
+    # Extract batch (e.g., W21, S22)
+    batch = None
+    batch_elem = soup.find(string=re.compile(r'[WS]\d{2}'))
+    if batch_elem:
+        match = re.search(r'([WS]\d{2})', batch_elem)
+        if match:
+            batch = match.group(1)
+
+    # Extract stage (Active, Acquired, Public)
+    stage = "Active"
+    stage_indicators = text.lower()
+    if "acquired" in stage_indicators:
+        stage = "Acquired"
+    elif "public" in stage_indicators or "ipo" in stage_indicators:
+        stage = "Public"
+
+    # Extract description
+    description = ""
+    desc_elem = soup.find("p", class_="whitespace-pre-line")
+    if not desc_elem:
+        desc_elem = soup.find("div", class_="prose")
+    if desc_elem:
+        description = desc_elem.get_text(strip=True)
+
+    # Extract location
+    location = ""
+    location_elem = soup.find(string=re.compile(r'\w+,\s*\w+'))
+    if location_elem:
+        location = location_elem.strip()
+
+    # Extract tags/industries
+    tags = []
+    for tag_elem in soup.find_all("a", href=re.compile(r'/companies\?industry=')):
+        tag_text = tag_elem.get_text(strip=True)
+        if tag_text and tag_text not in tags:
+            tags.append(tag_text)
+
+    # Extract employee range
+    employee_range = None
+    for pattern in EMPLOYEE_PATTERNS:
+        match = pattern.search(text)
+        if match:
+            employee_range = match.group(1).replace(' ', '')
+            break
+
+    return {
+        "batch": batch,
+        "stage": stage,
+        "description": description,
+        "location": location,
+        "tags": tags,
+        "employee_range": employee_range,
+    }
+
+
+def extract_company_detail(page: Union[str, bytes]) -> Dict:
+    """Extract snapshot fields, preferring the embedded JSON."""
+    raw = page.encode('utf-8') if isinstance(page, str) else page
+
+    data = find_page_json(raw)
+    if data:
+        detail = extract_from_page_json(data)
+        if detail:
+            return detail
+
+    return extract_from_html(raw)
@@ -0,0 +1,57 @@
+"""
+detail_extract must return the same snapshot fields as the DOM walk the
+detail scraper used before it, or every company would get a new snapshot.
+
+Run from scraper/:  python -m pytest detail_extract_test.py
+"""
+
+from pathlib import Path
+
+import pytest
+
+from detail_extract import (
+    extract_company_detail,
+    extract_from_html,
+    extract_from_page_json,
+    find_page_json,
+)
+
+ROOT = Path(__file__).resolve().parent.parent
+PAGES = [ROOT / "yc_companies_page.html",
+         *sorted((ROOT / "benchmarks" / "fixtures").glob("company_*.html"))]
+FIELDS = ["batch", "stage", "description", "location", "tags", "employee_range"]
+
+
+@pytest.mark.parametrize("path", PAGES, ids=lambda path: path.name)
+def test_matches_legacy_fields(path):
+    page = path.read_bytes()
+    legacy = extract_from_html(page, "html.parser")
+    detail = extract_company_detail(page)
+    for field in FIELDS:
+        assert detail[field] == legacy[field], field
+
+
+def test_json_and_html_pages_agree():
+    fixtures = ROOT / "benchmarks" / "fixtures"
+    with_json = (fixtures / "company_ledgerly.html").read_bytes()
+    without_json = (fixtures / "company_ledgerly_no_json.html").read_bytes()
+    assert find_page_json(with_json) is not None
+    assert find_page_json(without_json) is None
+    assert extract_company_detail(with_json) == extract_company_detail(without_json)
+
+
+def test_index_page_has_no_company_record():
+    page = (ROOT / "yc_companies_page.html").read_bytes()
+    assert extract_from_page_json(find_page_json(page)) is None
+
+
+@pytest.mark.parametrize("team_size, expected", [
+    (42, None),
+    ("42", None),
+    ("11-50", "11-50"),
+    ("11 - 50", "11-50"),
+    (None, None),
+])
+def test_employee_range_keeps_legacy_format(team_size, expected):
+    data = {"props": {"company": {"name": "Acme", "team_size": team_size}}}
+    assert extract_from_page_json(data)["employee_range"] == expected
@@ -0,0 +1,198 @@
+"""
+A detail run stopped partway through and resumed with --resume must write
+every company exactly once and end with the counters of an uninterrupted
+run. The YC detail pages and homepages are served locally; the database
+is an in-memory stand-in that answers the statements the run issues.
+
+Run from scraper/:  python -m pytest detail_resume_test.py
+"""
+
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+import pytest
+from aiohttp import web
+
+import detail_scraper
+from detail_scraper import DetailScraper
+
+FIXTURE = (Path(__file__).resolve().parent.parent / "benchmarks" / "fixtures"
+           / "company_ledgerly.html").read_bytes()
+HOMEPAGE = b'<html><a href="/careers">Careers</a> hello@acme.io</html>'
+COMPANIES = 12
+STOP_AT = 5
+
+
+class Interrupted(Exception):
+    pass
+
+
+class FakeDatabase:
+    """Just enough of db_pool.DatabasePool for a detail run."""
+
+    def __init__(self, homepage_base: str):
+        self.companies = [(i, f"yc-{i}", f"company-{i}", f"Company {i}", f"{homepage_base}/s/{i}")
+                          for i in range(1, COMPANIES + 1)]
+        self.runs = {}
+        self.snapshots = []
+        self.enrichments = []
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def connection(self):
+        yield FakeConnection(self)
+
+    def log_stats(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db: FakeDatabase):
+        self.db = db
+
+    def cursor(self, name=None):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, db: FakeDatabase):
+        self.db = db
+        self.rows = []
+
+    def execute(self, sql, params=()):
+        db, self.rows = self.db, []
+        with db.lock:
+            if "FROM scrape_runs" in sql and "ended_at IS NULL" in sql:
+                open_runs = [run for run in db.runs.values()
+                             if run["scraper"] == params[0] and run["ended_at"] is None]
+                self.rows = [(run["id"], run["started_at"], run["checkpoint"])
+                             for run in sorted(open_runs, key=lambda run: -run["id"])[:1]]
+            elif "INSERT INTO scrape_runs" in sql:
+                run_id = len(db.runs) + 1
+                db.runs[run_id] = {"id": run_id, "started_at": params[0], "scraper": "detail",
+                                   "checkpoint": None, "ended_at": None}
+                self.rows = [(run_id,)]
+            elif "SET checkpoint" in sql:
+                db.runs[params[1]]["checkpoint"] = params[0]
+            elif "SET ended_at" in sql:
+                db.runs[params[-1]]["ended_at"] = params[0]
+            elif "FROM companies" in sql:
+                self.rows = list(db.companies)
+            elif "INSERT INTO company_snapshots" in sql:
+                db.snapshots.append((params[0], params[-1]))
+                self.rows = [(len(db.snapshots),)]
+            elif "INSERT INTO company_web_enrichment" in sql:
+                db.enrichments.append(params[0])
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+def new_scraper(db: FakeDatabase, monkeypatch) -> DetailScraper:
+    monkeypatch.setattr(detail_scraper, "get_pool", lambda dsn, **kwargs: db)
+    scraper = DetailScraper(workers=1)
+
+    def load_snapshots(conn):
+        for company_id, data_hash in db.snapshots:
+            scraper.snapshots.record(company_id, data_hash)
+
+    monkeypatch.setattr(scraper.snapshots, "load", load_snapshots)
+    monkeypatch.setattr(scraper.domain_health, "load", lambda conn: None)
+    monkeypatch.setattr(scraper.domain_health, "flush", lambda conn: None)
+    return scraper
+
+
+def stop_at(scraper: DetailScraper, monkeypatch, index: int):
+    """Interrupt the run as it picks up its index-th company."""
+    process_company = scraper.process_company
+
+    async def interrupting(session, company, i, count):
+        if i == index:
+            raise Interrupted()
+        return await process_company(session, company, i, count)
+
+    monkeypatch.setattr(scraper, "process_company", interrupting)
+
+
+@pytest.fixture
+def yc_base(tmp_path, monkeypatch):
+    async def detail(request):
+        return web.Response(body=FIXTURE, content_type="text/html")
+
+    async def homepage(request):
+        return web.Response(body=HOMEPAGE, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/companies/{slug}", detail)
+    app.router.add_get("/s/{id}", homepage)
+
+    loop = asyncio.new_event_loop()
+    runner = web.AppRunner(app)
+    loop.run_until_complete(runner.setup())
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    loop.run_until_complete(site.start())
+    port = site._server.sockets[0].getsockname()[1]
+
+    # The server answers from its own thread while each run drives its own loop
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    base = f"http://127.0.0.1:{port}"
+    monkeypatch.setattr(detail_scraper, "YC_BASE_URL", base)
+    monkeypatch.setattr(detail_scraper, "refresh_rollup", lambda conn: None)
+    monkeypatch.setattr(detail_scraper.logger, "disabled", True)
+    # HTTP cache and span exports land in the working directory
+    monkeypatch.chdir(tmp_path)
+    try:
+        yield base
+    finally:
+        asyncio.run_coroutine_threadsafe(runner.cleanup(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+
+def test_resumed_run_writes_each_company_once(yc_base, monkeypatch):
+    db = FakeDatabase(yc_base)
+
+    first = new_scraper(db, monkeypatch)
+    stop_at(first, monkeypatch, STOP_AT)
+    with pytest.raises(Interrupted):
+        first.run()
+    # A stopped process would release its HTTP cache with it
+    first.http_cache.close()
+
+    (run,) = db.runs.values()
+    assert run["ended_at"] is None
+    checkpoint = json.loads(run["checkpoint"])
+    assert checkpoint["stats"]["total_processed"] == STOP_AT - 1
+    assert checkpoint["cursor"]["done"] == STOP_AT - 1
+    assert checkpoint["cursor"]["total"] == COMPANIES
+
+    second = new_scraper(db, monkeypatch)
+    second.run(resume=True)
+
+    assert list(db.runs) == [run["id"]]
+    assert run["ended_at"] is not None
+    assert sorted(company_id for company_id, _ in db.snapshots) == list(range(1, COMPANIES + 1))
+    assert sorted(db.enrichments) == list(range(1, COMPANIES + 1))
+
+    stats = second.checkpoint_state()
+    assert stats["stats"]["total_processed"] == COMPANIES
+    assert stats["stats"]["new_companies"] == COMPANIES
+    assert stats["stats"]["updated_companies"] == 0
+    assert stats["stats"]["unchanged_companies"] == 0
+    assert stats["stats"]["failed_companies"] == 0
+    assert stats["cursor"]["done"] == stats["cursor"]["total"] == COMPANIES
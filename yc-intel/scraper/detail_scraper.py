@@ -1,15 +1,33 @@
 import os
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import aiohttp
+import threading
 from dotenv import load_dotenv
-import psycopg2
 from datetime import datetime
 import hashlib
 import json
 import time
-import re
 import logging
-from urllib.parse import urljoin
+from urllib.parse import urljoin, urlsplit
+
+from analytics_rollup import refresh_rollup
+from db_pool import DB_POOL_MAX, get_pool
+from detail_extract import extract_company_detail
+from domain_health import DomainHealth, classify_failure
+from http_cache import HttpCache
+from latency import SlowestK
+from profiler import SpanProfiler, save_profile
+from rate_limit import HostRateLimiter
+from run_checkpoint import (
+    CHECKPOINT_INTERVAL,
+    ProgressWatermark,
+    find_unfinished_run,
+    remaining,
+    save_checkpoint,
+)
+from records import CompanyDetail, CompanyTiming, EnrichmentResult
+from snapshot_index import SnapshotHashIndex
+from web_fetch import SignalScanner, enrichment_result, fetch_homepage, homepage_url
 
 # Setup logging
 logging.basicConfig(
@@ -26,27 +44,20 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 NEON_DATABASE_URL = os.getenv("NEON_DATABASE_URL")
 
+# Concurrency and politeness settings for the async pipeline
+DETAIL_WORKERS = int(os.getenv("DETAIL_WORKERS", "16"))
+YC_BASE_URL = os.getenv("YC_BASE_URL", "https://www.ycombinator.com")
+YC_HOST = urlsplit(YC_BASE_URL).hostname
+YC_RATE_LIMIT = float(os.getenv("YC_RATE_LIMIT", "5"))  # requests / second
+YC_RATE_BURST = float(os.getenv("YC_RATE_BURST", "10"))
 
-class PerformanceTracker:
-    """Track performance metrics per company"""
-    def __init__(self):
-        self.metrics = {}
-    
-    def start(self, metric_name):
-        self.metrics[metric_name] = time.time()
-    
-    def end(self, metric_name):
-        if metric_name in self.metrics:
-            elapsed = (time.time() - self.metrics[metric_name]) * 1000  # ms
-            return elapsed
-        return 0
-    
-    def get_summary(self):
-        return {k: v for k, v in self.metrics.items() if isinstance(v, (int, float))}
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
 
 
 class DetailScraper:
-    def __init__(self):
+    def __init__(self, workers: int = DETAIL_WORKERS):
         self.stats = {
             'total_processed': 0,
             'new_companies': 0,
@@ -54,210 +65,170 @@ class DetailScraper:
             'unchanged_companies': 0,
             'failed_companies': 0,
             'start_time': datetime.now(),
-            'slowest_company': {'name': '', 'time': 0},
-            'performance_logs': []
         }
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+        # Span timings for every stage, plus the stage breakdown of the
+        # slowest few companies; both stay the same size however long the run is
+        self.profiler = SpanProfiler()
+        self.slowest = SlowestK(5)
+        self.run_id = None
+        self.cursor = None
+        self.progress = ProgressWatermark([])
+        self.workers = workers
+        self.rate_limiter = HostRateLimiter({YC_HOST: (YC_RATE_LIMIT, YC_RATE_BURST)})
+        # Snapshot and enrichment writes run on worker threads
+        self.stats_lock = threading.Lock()
+        self.snapshots = SnapshotHashIndex()
+        self.http_cache = HttpCache()
+        self.domain_health = DomainHealth()
+        self.db = get_pool(NEON_DATABASE_URL, maxconn=max(DB_POOL_MAX, workers * 2))
         self.ensure_tables()
     
     def ensure_tables(self):
         """Create missing tables if they don't exist"""
         logger.info("Ensuring database tables exist...")
-        conn = psycopg2.connect(NEON_DATABASE_URL)
-        cur = conn.cursor()
-        
-        # Create company_web_enrichment table
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS company_web_enrichment (
-                company_id INTEGER PRIMARY KEY REFERENCES companies(id) ON DELETE CASCADE,
-                has_careers_page BOOLEAN,
-                has_blog BOOLEAN,
-                contact_email TEXT,
-                scraped_at TIMESTAMP DEFAULT NOW()
-            )
-        """)
-        
-        # Create scrape_runs table
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS scrape_runs (
-                id SERIAL PRIMARY KEY,
-                started_at TIMESTAMP,
-                ended_at TIMESTAMP,
-                total_companies INTEGER,
-                new_companies INTEGER,
-                updated_companies INTEGER,
-                unchanged_companies INTEGER,
-                failed_companies INTEGER,
-                avg_time_per_company_ms NUMERIC,
-                slowest_company_name TEXT,
-                slowest_company_time_ms NUMERIC
-            )
-        """)
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+        
+            # Create company_web_enrichment table
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS company_web_enrichment (
+                    company_id INTEGER PRIMARY KEY REFERENCES companies(id) ON DELETE CASCADE,
+                    has_careers_page BOOLEAN,
+                    has_blog BOOLEAN,
+                    contact_email TEXT,
+                    scraped_at TIMESTAMP DEFAULT NOW()
+                )
+            """)
+        
+            # Create scrape_runs table
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS scrape_runs (
+                    id SERIAL PRIMARY KEY,
+                    started_at TIMESTAMP,
+                    ended_at TIMESTAMP,
+                    total_companies INTEGER,
+                    new_companies INTEGER,
+                    updated_companies INTEGER,
+                    unchanged_companies INTEGER,
+                    failed_companies INTEGER,
+                    avg_time_per_company_ms NUMERIC,
+                    slowest_company_name TEXT,
+                    slowest_company_time_ms NUMERIC
+                )
+            """)
         
-        conn.commit()
-        cur.close()
-        conn.close()
+            conn.commit()
+            cur.close()
         logger.info("✓ Database tables ready")
     
     def get_companies_from_db(self):
         """Get all active companies for detail scraping."""
-        conn = psycopg2.connect(NEON_DATABASE_URL)
-        cur = conn.cursor()
-        cur.execute("SELECT id, yc_company_id, slug, name FROM companies WHERE is_active = TRUE ORDER BY id")
-        companies = [
-            {"db_id": row[0], "yc_id": row[1], "slug": row[2], "name": row[3]} 
-            for row in cur.fetchall()
-        ]
-        cur.close()
-        conn.close()
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+            cur.execute("SELECT id, yc_company_id, slug, name, domain FROM companies WHERE is_active = TRUE ORDER BY id")
+            companies = [
+                {"db_id": row[0], "yc_id": row[1], "slug": row[2], "name": row[3], "domain": row[4]} 
+                for row in cur.fetchall()
+            ]
+            cur.close()
         return companies
 
-    def scrape_company_detail(self, slug: str, perf: PerformanceTracker) -> dict:
-        """Scrape detail page with performance tracking."""
-        url = f"https://www.ycombinator.com/companies/{slug}"
+    async def scrape_company_detail(self, session: aiohttp.ClientSession, slug: str,
+                                    use_cache: bool = True) -> CompanyDetail:
+        """
+        Scrape detail page with performance tracking.
+        
+        With use_cache, a 304 or a byte-identical body comes back with
+        not_modified set and nothing parsed. A fresh page carries a
+        cache_entry that the caller stores once the snapshot is saved.
+        """
+        url = f"{YC_BASE_URL}/companies/{slug}"
+        cached = self.http_cache.get(url) if use_cache else None
         
         try:
-            # Track index page fetch time
-            perf.start('index_fetch')
-            resp = self.session.get(url, timeout=10)
-            index_fetch_time = perf.end('index_fetch')
+            # Wait for a ycombinator.com token before hitting the site
+            with self.profiler.span('rate_limit'):
+                await self.rate_limiter.acquire(url)
             
-            if resp.status_code != 200:
-                logger.warning(f"Failed to fetch {slug}: HTTP {resp.status_code}")
-                return None
+            # Track index page fetch time; dns/connect/ttfb are recorded
+            # under it by the session's trace config
+            not_modified = False
+            with self.profiler.span('fetch') as fetch:
+                async with session.get(url, timeout=aiohttp.ClientTimeout(total=10),
+                                       headers=self.http_cache.conditional_headers(cached)) as resp:
+                    if resp.status == 304 and cached:
+                        self.http_cache.record_not_modified(cached)
+                        not_modified = True
+                    elif resp.status != 200:
+                        logger.warning(f"Failed to fetch {slug}: HTTP {resp.status}")
+                        return None
+                    else:
+                        with self.profiler.span('body'):
+                            body = await resp.read()
+                        etag = resp.headers.get('ETag')
+                        last_modified = resp.headers.get('Last-Modified')
+            index_fetch_time = fetch.elapsed_ms
+            if not_modified:
+                return CompanyDetail(not_modified=True, index_fetch_time=index_fetch_time)
             
-            # Track HTML parsing time
-            perf.start('html_parse')
-            soup = BeautifulSoup(resp.text, "html.parser")
-            html_parse_time = perf.end('html_parse')
-            
-            # Extract batch (e.g., W21, S22)
-            batch = None
-            batch_elem = soup.find(text=re.compile(r'[WS]\d{2}'))
-            if batch_elem:
-                match = re.search(r'([WS]\d{2})', batch_elem)
-                if match:
-                    batch = match.group(1)
-            
-            # Extract stage (Active, Acquired, Public)
-            stage = "Active"
-            stage_indicators = soup.get_text().lower()
-            if "acquired" in stage_indicators:
-                stage = "Acquired"
-            elif "public" in stage_indicators or "ipo" in stage_indicators:
-                stage = "Public"
-            
-            # Extract description
-            description = ""
-            desc_elem = soup.find("p", class_="whitespace-pre-line")
-            if not desc_elem:
-                desc_elem = soup.find("div", class_="prose")
-            if desc_elem:
-                description = desc_elem.get_text(strip=True)
-            
-            # Extract location
-            location = ""
-            location_elem = soup.find(text=re.compile(r'\w+,\s*\w+'))
-            if location_elem:
-                location = location_elem.strip()
+            digest = self.http_cache.digest(body)
+            identical = bool(cached) and cached["digest"] == digest
+            self.http_cache.record_download(len(body), identical)
+            if identical:
+                self.http_cache.store(url, etag, last_modified, digest, len(body))
+                return CompanyDetail(not_modified=True, index_fetch_time=index_fetch_time)
             
-            # Extract tags/industries
-            tags = []
-            tag_elements = soup.find_all("a", href=re.compile(r'/companies\?industry='))
-            for tag_elem in tag_elements:
-                tag_text = tag_elem.get_text(strip=True)
-                if tag_text and tag_text not in tags:
-                    tags.append(tag_text)
-            
-            # Extract employee range
-            employee_range = None
-            emp_text = soup.get_text()
-            emp_patterns = [
-                r'(\d+-\d+)\s*employees',
-                r'(\d+\s*-\s*\d+)\s*people',
-                r'Team size:\s*(\d+-\d+)'
-            ]
-            for pattern in emp_patterns:
-                match = re.search(pattern, emp_text, re.IGNORECASE)
-                if match:
-                    employee_range = match.group(1).replace(' ', '')
-                    break
+            # Track HTML parsing time
+            with self.profiler.span('parse') as parse:
+                fields = self.parse_company_detail(body)
             
-            return {
-                "batch": batch,
-                "stage": stage,
-                "description": description,
-                "location": location,
-                "tags": tags,
-                "employee_range": employee_range,
-                "index_fetch_time": index_fetch_time,
-                "html_parse_time": html_parse_time
-            }
+            return CompanyDetail.from_extract(
+                fields,
+                index_fetch_time=index_fetch_time,
+                html_parse_time=parse.elapsed_ms,
+                cache_entry=(url, etag, last_modified, digest, len(body)),
+            )
         
         except Exception as e:
             logger.error(f"Error scraping {slug}: {e}")
             return None
 
-    def enrich_from_website(self, domain: str, perf: PerformanceTracker) -> dict:
-        """Website enrichment with 3-second timeout."""
+    def parse_company_detail(self, page) -> dict:
+        """Extract snapshot fields from a company detail page."""
+        return extract_company_detail(page)
+
+    async def enrich_from_website(self, session: aiohttp.ClientSession,
+                                  domain: str) -> EnrichmentResult:
+        """Website enrichment bounded by ENRICH_DEADLINE and ENRICH_MAX_BYTES."""
         if not domain or domain == '':
-            return {
-                "has_careers_page": False,
-                "has_blog": False,
-                "contact_email": None,
-                "enrichment_time": 0
-            }
+            return EnrichmentResult()
         
-        perf.start('enrichment')
+        # Dead or slow domains sit out their backoff window
+        if self.domain_health.skip(domain):
+            return EnrichmentResult(skipped=True)
         
-        # Normalize domain
-        if not domain.startswith('http'):
-            domain = f"https://{domain}"
+        url = homepage_url(domain)
         
-        enrichment_data = {
-            "has_careers_page": False,
-            "has_blog": False,
-            "contact_email": None,
-            "enrichment_time": 0
-        }
+        # The scanner applies the shared careers/blog/email checks chunk by
+        # chunk as the body streams in
+        scanner = SignalScanner()
         
-        try:
-            # Fetch homepage with 3-second timeout
-            resp = self.session.get(domain, timeout=3, allow_redirects=True)
-            if resp.status_code != 200:
-                enrichment_data['enrichment_time'] = perf.end('enrichment')
-                return enrichment_data
-            
-            html = resp.text.lower()
-            
-            # Check for careers/jobs page
-            careers_patterns = ['/careers', '/jobs', '/join', '/hiring', '/work-with-us']
-            enrichment_data['has_careers_page'] = any(pattern in html for pattern in careers_patterns)
-            
-            # Check for blog
-            blog_patterns = ['/blog', '/news', '/articles', '/insights']
-            enrichment_data['has_blog'] = any(pattern in html for pattern in blog_patterns)
-            
-            # Extract contact email
-            email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-            emails = re.findall(email_pattern, resp.text)
-            if emails:
-                # Filter out common non-contact emails
-                valid_emails = [e for e in emails if not any(
-                    x in e.lower() for x in ['noreply', 'no-reply', 'example', 'test']
-                )]
-                if valid_emails:
-                    enrichment_data['contact_email'] = valid_emails[0]
-            
-        except requests.Timeout:
-            logger.warning(f"Timeout enriching {domain}")
-        except Exception as e:
-            logger.warning(f"Error enriching {domain}: {e}")
+        with self.profiler.span('enrich') as span:
+            try:
+                # Fetch homepage under a hard deadline and byte cap
+                fetch = await fetch_homepage(session, url, scanner=scanner)
+                if fetch['timed_out']:
+                    logger.warning(f"Timeout enriching {domain} "
+                                   f"({len(fetch['body'])} bytes in {fetch['elapsed_ms']:.0f}ms)")
+                
+                enrichment_data = enrichment_result(fetch, scanner)
+                
+            except Exception as e:
+                logger.warning(f"Error enriching {domain}: {e}")
+                enrichment_data = EnrichmentResult(failure=classify_failure(e))
         
-        enrichment_data['enrichment_time'] = perf.end('enrichment')
+        self.domain_health.record(domain, enrichment_data.failure)
+        enrichment_data.elapsed_ms = span.elapsed_ms
         return enrichment_data
 
     def compute_hash(self, data: dict) -> str:
@@ -265,41 +236,41 @@ class DetailScraper:
         payload = json.dumps(data, sort_keys=True)
         return hashlib.sha256(payload.encode()).hexdigest()[:32]
 
-    def save_snapshot(self, db_company_id: int, detail_data: dict, perf: PerformanceTracker):
-        """Save to company_snapshots if data changed."""
-        perf.start('db_write')
-        
-        conn = psycopg2.connect(NEON_DATABASE_URL)
-        cur = conn.cursor()
-        
+    def save_snapshot(self, db_company_id: int, detail_data: CompanyDetail):
+        """Save to company_snapshots if data changed; returns (outcome, ms taken)."""
+        with self.profiler.span('db_write') as span:
+            outcome = self.write_snapshot(db_company_id, detail_data)
+        return outcome, span.elapsed_ms
+
+    def write_snapshot(self, db_company_id: int, detail_data: CompanyDetail) -> str:
+        """Write a snapshot if the data changed; returns 'new', 'updated' or 'unchanged'."""
         data = {
-            "batch": detail_data.get("batch"),
-            "stage": detail_data.get("stage"),
-            "description": detail_data.get("description"),
-            "location": detail_data.get("location"),
-            "tags": detail_data.get("tags", [])
+            "batch": detail_data.batch,
+            "stage": detail_data.stage,
+            "description": detail_data.description,
+            "location": detail_data.location,
+            "tags": list(detail_data.tags)
         }
         
         data_hash = self.compute_hash(data)
         
-        # Check if latest snapshot has same hash
-        cur.execute("""
-            SELECT data_hash FROM company_snapshots 
-            WHERE company_id = %s 
-            ORDER BY scraped_at DESC LIMIT 1
-        """, (db_company_id,))
-        latest_hash = cur.fetchone()
-        
-        changed = False
-        if latest_hash and latest_hash[0] == data_hash:
+        # Compare against the preloaded latest hash; unchanged companies
+        # never touch the database
+        if self.snapshots.is_unchanged(db_company_id, data_hash):
             logger.info("  ➜ No change detected")
-            self.stats['unchanged_companies'] += 1
-        else:
+            return 'unchanged'
+        
+        had_snapshot = self.snapshots.has_snapshot(db_company_id)
+        
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+        
             # Insert new snapshot
             cur.execute("""
                 INSERT INTO company_snapshots 
                 (company_id, batch, stage, description, location, tags, employee_range, scraped_at, data_hash)
                 VALUES (%s, %s, %s, %s, %s, %s::jsonb, %s, NOW(), %s)
+                RETURNING id
             """, (
                 db_company_id, 
                 data["batch"], 
@@ -307,59 +278,111 @@ class DetailScraper:
                 data["description"], 
                 data["location"], 
                 json.dumps(data["tags"]),
-                detail_data.get("employee_range"),
+                detail_data.employee_range,
                 data_hash
             ))
-            
+            cur.execute("""
+                UPDATE companies
+                SET current_snapshot_id = %s, batch = %s, stage = %s, location = %s
+                WHERE id = %s
+            """, (cur.fetchone()[0], data["batch"], data["stage"], data["location"], db_company_id))
+        
             conn.commit()
+            self.snapshots.record(db_company_id, data_hash)
             logger.info("  ✓ New snapshot saved")
+        
+            cur.close()
+        
+        return 'updated' if had_snapshot else 'new'
+
+    def save_web_enrichment(self, db_company_id: int, enrichment_data: EnrichmentResult):
+        """Save website enrichment data."""
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+        
+            cur.execute("""
+                INSERT INTO company_web_enrichment 
+                (company_id, has_careers_page, has_blog, contact_email, scraped_at)
+                VALUES (%s, %s, %s, %s, NOW())
+                ON CONFLICT (company_id) DO UPDATE SET
+                    has_careers_page = EXCLUDED.has_careers_page,
+                    has_blog = EXCLUDED.has_blog,
+                    contact_email = EXCLUDED.contact_email,
+                    scraped_at = NOW()
+            """, (
+                db_company_id,
+                enrichment_data.has_careers_page,
+                enrichment_data.has_blog,
+                enrichment_data.contact_email
+            ))
+        
+            conn.commit()
+            cur.close()
+
+    def start_run(self, resume: bool = False):
+        """Open this run's scrape_runs row, or reopen the last unfinished one."""
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+            run = find_unfinished_run(cur, 'detail') if resume else None
             
-            if latest_hash:
-                self.stats['updated_companies'] += 1
+            if run:
+                self.run_id = run['id']
+                self.cursor = run['checkpoint'].get('cursor')
+                stats = run['checkpoint'].get('stats', {})
+                self.stats.update({key: value for key, value in stats.items()
+                                   if key in self.stats and key != 'start_time'})
+                self.profiler = SpanProfiler.from_state(stats.get('profile'))
+                for total_time, timing in stats.get('slowest', []):
+                    self.slowest.add(total_time, CompanyTiming(**timing))
+                logger.info(f"Resuming detail run #{self.run_id} (started {run['started_at']}), "
+                            f"{self.stats['total_processed']} companies already done")
             else:
-                self.stats['new_companies'] += 1
+                if resume:
+                    logger.info("No unfinished detail run to resume, starting a new one")
+                cur.execute("""
+                    INSERT INTO scrape_runs (started_at, scraper)
+                    VALUES (%s, 'detail')
+                    RETURNING id
+                """, (self.stats['start_time'],))
+                self.run_id = cur.fetchone()[0]
             
-            changed = True
-        
-        db_write_time = perf.end('db_write')
-        
-        cur.close()
-        conn.close()
+            conn.commit()
+            cur.close()
+
+    def checkpoint_state(self) -> dict:
+        """Snapshot of progress and metrics that --resume can restore."""
+        with self.stats_lock:
+            stats = {
+                key: self.stats[key]
+                for key in ('total_processed', 'new_companies', 'updated_companies',
+                            'unchanged_companies', 'failed_companies')
+            }
+            stats['profile'] = self.profiler.state()
+            stats['slowest'] = [(total_time, timing.to_dict())
+                                for total_time, timing in self.slowest.items()]
+            # Read under the same lock so the cursor and counters agree
+            cursor = self.progress.state()
         
-        return changed, db_write_time
+        return {
+            'stage': 'detail',
+            'cursor': cursor,
+            'stages': {'detail': {'done': stats['total_processed']}},
+            'stats': stats
+        }
 
-    def save_web_enrichment(self, db_company_id: int, enrichment_data: dict):
-        """Save website enrichment data."""
-        conn = psycopg2.connect(NEON_DATABASE_URL)
-        cur = conn.cursor()
-        
-        cur.execute("""
-            INSERT INTO company_web_enrichment 
-            (company_id, has_careers_page, has_blog, contact_email, scraped_at)
-            VALUES (%s, %s, %s, %s, NOW())
-            ON CONFLICT (company_id) DO UPDATE SET
-                has_careers_page = EXCLUDED.has_careers_page,
-                has_blog = EXCLUDED.has_blog,
-                contact_email = EXCLUDED.contact_email,
-                scraped_at = NOW()
-        """, (
-            db_company_id,
-            enrichment_data['has_careers_page'],
-            enrichment_data['has_blog'],
-            enrichment_data['contact_email']
-        ))
-        
-        conn.commit()
-        cur.close()
-        conn.close()
+    def write_checkpoint(self, state: dict):
+        with self.db.connection() as conn:
+            cur = conn.cursor()
+            save_checkpoint(cur, self.run_id, state)
+            conn.commit()
+            cur.close()
 
     def log_scrape_run(self):
         """Log scraping metrics to database."""
         duration = (datetime.now() - self.stats['start_time']).total_seconds()
-        avg_time = (
-            sum(p['total_time'] for p in self.stats['performance_logs']) / 
-            len(self.stats['performance_logs'])
-        ) if self.stats['performance_logs'] else 0
+        latency = self.profiler.histogram('company').summary()
+        slowest_time, slowest = self.slowest.top()
+        slowest_name = slowest.company if slowest else ''
         
         # Print summary
         print("\n" + "="*70)
@@ -370,159 +393,247 @@ class DetailScraper:
         print(f"Updated Companies:            {self.stats['updated_companies']}")
         print(f"Unchanged Companies:          {self.stats['unchanged_companies']}")
         print(f"Failed Companies:             {self.stats['failed_companies']}")
-        print(f"Average Time per Company:     {avg_time:.2f}ms")
-        print(f"Slowest Company:              {self.stats['slowest_company']['name']}")
-        print(f"Slowest Company Time:         {self.stats['slowest_company']['time']:.2f}ms")
+        print(f"Average Time per Company:     {latency['mean']:.2f}ms")
+        print(f"p50 / p95 / p99:              {latency['p50']:.0f}ms / "
+              f"{latency['p95']:.0f}ms / {latency['p99']:.0f}ms")
+        print(f"Slowest Company:              {slowest_name}")
+        print(f"Slowest Company Time:         {slowest_time:.2f}ms")
+        print(f"HTTP Cache Hit Rate:          {self.http_cache.hit_rate() * 100:.1f}% "
+              f"({self.http_cache.stats['not_modified']} not modified, "
+              f"{self.http_cache.stats['identical']} identical)")
+        print(f"HTTP Bytes Saved:             {self.http_cache.stats['bytes_saved'] / 1024:.0f} KB")
+        print(f"Domains Skipped (backoff):    {self.domain_health.stats['skipped']}")
         print(f"Total Runtime:                {duration:.2f}s")
+        print("-"*70)
+        self.profiler.report(print)
         print("="*70 + "\n")
         
         logger.info(f"Scraping completed in {duration:.2f}s")
         
+        exported = self.profiler.export('detail')
+        if exported:
+            logger.info(f"Span metrics written to {exported}")
+        
         # Save to database
         try:
-            conn = psycopg2.connect(NEON_DATABASE_URL)
-            cur = conn.cursor()
+            with self.db.connection() as conn:
+                cur = conn.cursor()
             
-            cur.execute("""
-                INSERT INTO scrape_runs 
-                (started_at, ended_at, total_companies, new_companies, updated_companies, 
-                 unchanged_companies, failed_companies, avg_time_per_company_ms,
-                 slowest_company_name, slowest_company_time_ms)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            """, (
-                self.stats['start_time'],
-                datetime.now(),
-                self.stats['total_processed'],
-                self.stats['new_companies'],
-                self.stats['updated_companies'],
-                self.stats['unchanged_companies'],
-                self.stats['failed_companies'],
-                avg_time,
-                self.stats['slowest_company']['name'],
-                self.stats['slowest_company']['time']
-            ))
+                cur.execute("""
+                    UPDATE scrape_runs
+                    SET ended_at = %s, total_companies = %s, new_companies = %s,
+                        updated_companies = %s, unchanged_companies = %s,
+                        failed_companies = %s, avg_time_per_company_ms = %s,
+                        slowest_company_name = %s, slowest_company_time_ms = %s
+                    WHERE id = %s
+                """, (
+                    datetime.now(),
+                    self.stats['total_processed'],
+                    self.stats['new_companies'],
+                    self.stats['updated_companies'],
+                    self.stats['unchanged_companies'],
+                    self.stats['failed_companies'],
+                    latency['mean'],
+                    slowest_name,
+                    slowest_time,
+                    self.run_id
+                ))
+                save_profile(cur, self.run_id, self.profiler)
             
-            conn.commit()
-            cur.close()
-            conn.close()
+                conn.commit()
+                cur.close()
             logger.info("✓ Metrics saved to scrape_runs table")
         except Exception as e:
             logger.error(f"Failed to save scrape run metrics: {e}")
 
-    def run(self, limit=None):
+    async def process_company(self, session: aiohttp.ClientSession, company: dict,
+                              index: int, count: int):
+        """
+        Scrape, save and enrich a single company; returns 'new', 'updated',
+        'unchanged' or 'failed'. Nothing is counted here: the caller counts
+        the outcome when it marks the company done, so a company cut off
+        mid-flight is neither counted nor skipped on resume.
+        """
+        company_start_time = time.perf_counter()
+        
+        logger.info(f"[{index}/{count}] Scraping company: {company['slug']}")
+        
+        try:
+            # Step 1: Scrape company detail page. Trust the HTTP cache only
+            # when we already hold a snapshot for this company
+            detail = await self.scrape_company_detail(
+                session, company['slug'],
+                use_cache=self.snapshots.has_snapshot(company['db_id'])
+            )
+            
+            if not detail:
+                logger.error(f"  ❌ Failed to scrape {company['slug']}")
+                return 'failed'
+            
+            if detail.not_modified:
+                # Page unchanged since the last run: no parse, no snapshot write
+                outcome, db_write_time = 'unchanged', 0
+                enrichment = await self.enrich_from_website(session, company['domain'])
+            else:
+                # Step 2 + 3: Save snapshot (with data hash comparison) on a
+                # worker thread while the website enrichment fetch is in flight
+                (outcome, db_write_time), enrichment = await asyncio.gather(
+                    asyncio.to_thread(self.save_snapshot, company['db_id'], detail),
+                    self.enrich_from_website(session, company['domain'])
+                )
+                self.http_cache.store(*detail.cache_entry)
+            # Keep the last good enrichment for skipped or failing domains
+            if not enrichment.skipped and not enrichment.failure:
+                with self.profiler.span('enrich_write'):
+                    await asyncio.to_thread(self.save_web_enrichment, company['db_id'], enrichment)
+            
+            # Calculate total time for this company
+            company_total_time = (time.perf_counter() - company_start_time) * 1000  # ms
+            
+            # Track performance
+            self.profiler.record('company', company_total_time)
+            self.slowest.add(company_total_time, CompanyTiming(
+                company=company['name'],
+                slug=company['slug'],
+                total_time=company_total_time,
+                index_fetch_time=detail.index_fetch_time,
+                html_parse_time=detail.html_parse_time,
+                db_write_time=db_write_time,
+                enrichment_time=enrichment.elapsed_ms,
+            ))
+            
+            # Log detailed performance for this company
+            logger.info(f"  {company['slug']} Performance: Index={detail.index_fetch_time:.0f}ms, "
+                       f"Parse={detail.html_parse_time:.0f}ms, "
+                       f"DB={db_write_time:.0f}ms, "
+                       f"Enrich={enrichment.elapsed_ms:.0f}ms, "
+                       f"Total={company_total_time:.0f}ms")
+            return outcome
+            
+        except Exception as e:
+            logger.error(f"  ❌ Error processing {company['slug']}: {e}")
+            return 'failed'
+
+    def finish_company(self, db_company_id: int, outcome: str):
+        """Count a finished company and move the resume cursor past it, as one step."""
+        with self.stats_lock:
+            self.stats['total_processed'] += 1
+            self.stats[f'{outcome}_companies'] += 1
+            self.progress.mark_done(db_company_id)
+
+    async def run_async(self, companies: list):
+        """Process companies with a fixed pool of workers sharing one HTTP session."""
+        queue = asyncio.Queue()
+        for i, company in enumerate(companies, 1):
+            queue.put_nowait((i, company))
+        
+        checkpoint_lock = asyncio.Lock()
+        last_checkpoint = time.monotonic()
+        
+        async def maybe_checkpoint():
+            nonlocal last_checkpoint
+            if checkpoint_lock.locked() or time.monotonic() - last_checkpoint < CHECKPOINT_INTERVAL:
+                return
+            async with checkpoint_lock:
+                last_checkpoint = time.monotonic()
+                await asyncio.to_thread(self.write_checkpoint, self.checkpoint_state())
+        
+        connector = aiohttp.TCPConnector(limit=self.workers * 2)
+        async with aiohttp.ClientSession(connector=connector, headers=HEADERS,
+                                         trace_configs=[self.profiler.trace_config()]) as session:
+            async def worker():
+                while True:
+                    try:
+                        i, company = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    outcome = await self.process_company(session, company, i, len(companies))
+                    self.finish_company(company['db_id'], outcome)
+                    await maybe_checkpoint()
+                    
+                    if i % 100 == 0:
+                        print(f"[{i}/{len(companies)}] companies processed")
+            
+            await asyncio.gather(*(worker() for _ in range(self.workers)))
+
+    def run(self, limit=None, resume=False):
         """Run the detail scraper with full performance tracking."""
         print("\n" + "="*70)
         print("YC COMPANIES DETAIL SCRAPER - Production Mode")
         print("="*70 + "\n")
         
+        self.start_run(resume)
         companies = self.get_companies_from_db()
         total = len(companies)
         
+        with self.db.connection() as conn:
+            self.snapshots.load(conn)
+            self.domain_health.load(conn)
+        
         if limit:
             companies = companies[:limit]
             logger.info(f"Found {total} companies, processing first {limit}")
         else:
             logger.info(f"Found {total} companies to scrape")
         
+        todo = remaining(companies, 'db_id', self.cursor)
+        if len(todo) < len(companies):
+            logger.info(f"Skipping {len(companies) - len(todo)} companies done before the interruption")
+        cursor = self.cursor or {}
+        self.progress = ProgressWatermark([c['db_id'] for c in todo],
+                                          cursor.get('watermark'), cursor.get('done_ahead', []),
+                                          done_before=len(companies) - len(todo))
+        
+        logger.info(f"Running with {self.workers} workers, "
+                    f"{YC_RATE_LIMIT:g} req/s to {YC_HOST}")
         print()
         
-        for i, company in enumerate(companies, 1):
-            perf = PerformanceTracker()
-            company_start_time = time.time()
-            
-            print(f"[{i}/{len(companies)}] Processing: {company['name'][:40]}...")
-            logger.info(f"Scraping company {i}/{len(companies)}: {company['slug']}")
-            
-            self.stats['total_processed'] += 1
-            
-            try:
-                # Step 1: Scrape company detail page
-                detail = self.scrape_company_detail(company['slug'], perf)
-                
-                if not detail:
-                    logger.error(f"  ❌ Failed to scrape {company['slug']}")
-                    self.stats['failed_companies'] += 1
-                    continue
-                
-                # Step 2: Save snapshot (with data hash comparison)
-                changed, db_write_time = self.save_snapshot(company['db_id'], detail, perf)
-                
-                # Step 3: Get domain for enrichment
-                conn = psycopg2.connect(NEON_DATABASE_URL)
-                cur = conn.cursor()
-                cur.execute("SELECT domain FROM companies WHERE id = %s", (company['db_id'],))
-                domain_row = cur.fetchone()
-                domain = domain_row[0] if domain_row else None
-                cur.close()
-                conn.close()
-                
-                # Step 4: Website enrichment
-                enrichment = self.enrich_from_website(domain, perf)
-                self.save_web_enrichment(company['db_id'], enrichment)
-                
-                # Calculate total time for this company
-                company_total_time = (time.time() - company_start_time) * 1000  # ms
-                
-                # Track performance
-                performance_log = {
-                    'company': company['name'],
-                    'slug': company['slug'],
-                    'index_fetch_time': detail.get('index_fetch_time', 0),
-                    'html_parse_time': detail.get('html_parse_time', 0),
-                    'db_write_time': db_write_time,
-                    'enrichment_time': enrichment['enrichment_time'],
-                    'total_time': company_total_time
-                }
-                self.stats['performance_logs'].append(performance_log)
-                
-                # Track slowest company
-                if company_total_time > self.stats['slowest_company']['time']:
-                    self.stats['slowest_company'] = {
-                        'name': company['name'],
-                        'time': company_total_time
-                    }
-                
-                # Log detailed performance for this company
-                logger.info(f"  Performance: Index={detail.get('index_fetch_time', 0):.0f}ms, "
-                           f"Parse={detail.get('html_parse_time', 0):.0f}ms, "
-                           f"DB={db_write_time:.0f}ms, "
-                           f"Enrich={enrichment['enrichment_time']:.0f}ms, "
-                           f"Total={company_total_time:.0f}ms")
-                
-                print(f"  ✓ Completed in {company_total_time:.0f}ms")
-                
-            except Exception as e:
-                logger.error(f"  ❌ Error processing {company['slug']}: {e}")
-                self.stats['failed_companies'] += 1
-            
-            # Respectful rate limiting
-            time.sleep(0.5)
+        try:
+            asyncio.run(self.run_async(todo))
+        except BaseException:
+            # Crash or Ctrl-C: keep the run open and record where it stopped
+            self.write_checkpoint(self.checkpoint_state())
+            logger.warning(f"Detail run #{self.run_id} interrupted; "
+                           f"rerun with --resume to continue it")
+            raise
+        
+        with self.db.connection() as conn:
+            self.domain_health.flush(conn)
+            refresh_rollup(conn)
+        logger.info(f"Domain health: {self.domain_health.summary()}")
         
         # Log final metrics
         self.log_scrape_run()
+        self.db.log_stats()
+        self.http_cache.close()
         
         # Print top 5 slowest companies
-        if self.stats['performance_logs']:
+        if self.slowest.items():
             print("\n" + "="*70)
             print("TOP 5 SLOWEST COMPANIES")
             print("="*70)
-            sorted_logs = sorted(self.stats['performance_logs'], 
-                               key=lambda x: x['total_time'], reverse=True)[:5]
-            for idx, log in enumerate(sorted_logs, 1):
-                print(f"{idx}. {log['company'][:40]}")
-                print(f"   Total: {log['total_time']:.0f}ms | "
-                      f"Fetch: {log['index_fetch_time']:.0f}ms | "
-                      f"Parse: {log['html_parse_time']:.0f}ms | "
-                      f"DB: {log['db_write_time']:.0f}ms | "
-                      f"Enrich: {log['enrichment_time']:.0f}ms")
+            for idx, (_, log) in enumerate(self.slowest.items(), 1):
+                print(f"{idx}. {log.company[:40]}")
+                print(f"   Total: {log.total_time:.0f}ms | "
+                      f"Fetch: {log.index_fetch_time:.0f}ms | "
+                      f"Parse: {log.html_parse_time:.0f}ms | "
+                      f"DB: {log.db_write_time:.0f}ms | "
+                      f"Enrich: {log.enrichment_time:.0f}ms")
             print("="*70 + "\n")
 
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="YC company detail scraper")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the most recent unfinished detail run")
+    args = parser.parse_args()
+    
     scraper = DetailScraper()
     
     # Run scraper
     # Set limit for testing (e.g., limit=10), remove limit to scrape all
-    scraper.run(limit=10)  # ← Change to scraper.run() for full scrape
+    scraper.run(limit=10, resume=args.resume)  # ← Change to scraper.run() for full scrape
     
     print("\n✓ Scraping complete! Check scraper.log for detailed logs.")
@@ -0,0 +1,164 @@
+"""
+Per-domain health record with exponential backoff
+
+Every enrichment pass records whether a company domain answered. Domains
+that keep timing out, failing DNS or returning non-200 are put on a
+cooldown that doubles with each consecutive failure, and enrichment skips
+them until next_eligible_at instead of spending the run's time budget on
+dead hosts.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import aiohttp
+from psycopg2.extras import execute_values
+
+logger = logging.getLogger(__name__)
+
+DOMAIN_BACKOFF_BASE_HOURS = float(os.getenv("DOMAIN_BACKOFF_BASE_HOURS", "12"))
+DOMAIN_BACKOFF_MAX_DAYS = float(os.getenv("DOMAIN_BACKOFF_MAX_DAYS", "30"))
+
+
+def normalize_domain(domain: str) -> str:
+    domain = domain.strip().lower()
+    for prefix in ("https://", "http://"):
+        if domain.startswith(prefix):
+            domain = domain[len(prefix):]
+    return domain.split("/")[0]
+
+
+# Applied by migrate.py, never at scraper startup
+def ensure_domain_health_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS domain_health (
+            domain TEXT PRIMARY KEY,
+            failure_kind TEXT,
+            consecutive_failures INTEGER NOT NULL DEFAULT 0,
+            last_failure_at TIMESTAMP,
+            last_success_at TIMESTAMP,
+            next_eligible_at TIMESTAMP
+        )
+    """)
+
+
+def classify_failure(exc: BaseException) -> str:
+    """Map a fetch exception to a short failure kind."""
+    if isinstance(exc, asyncio.TimeoutError):
+        return "timeout"
+    if isinstance(exc, (aiohttp.ClientSSLError, aiohttp.ClientConnectorCertificateError)):
+        return "tls"
+    if isinstance(exc, aiohttp.ClientConnectorError):
+        if isinstance(getattr(exc, "os_error", None), socket.gaierror):
+            return "dns"
+        return "connection"
+    return "error"
+
+
+class DomainHealth:
+    def __init__(self, base_hours: float = DOMAIN_BACKOFF_BASE_HOURS,
+                 max_days: float = DOMAIN_BACKOFF_MAX_DAYS):
+        self.base = timedelta(hours=base_hours)
+        self.max_delay = timedelta(days=max_days)
+        self.records: Dict[str, Dict] = {}
+        self.pending: Dict[str, Dict] = {}
+        self.stats = {"skipped": 0, "failures": 0, "recovered": 0}
+
+    def load(self, conn):
+        """Load every domain that is currently failing."""
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT domain, failure_kind, consecutive_failures, next_eligible_at
+            FROM domain_health
+            WHERE consecutive_failures > 0
+        """)
+        self.records = {
+            row[0]: {"failure_kind": row[1], "consecutive_failures": row[2],
+                     "next_eligible_at": row[3]}
+            for row in cur.fetchall()
+        }
+        conn.commit()
+        cur.close()
+        logger.info(f"Loaded health for {len(self.records)} failing domains")
+
+    def is_cooling_down(self, domain: Optional[str]) -> bool:
+        if not domain:
+            return False
+        record = self.records.get(normalize_domain(domain))
+        return bool(
+            record and record["next_eligible_at"]
+            and record["next_eligible_at"] > datetime.now()
+        )
+
+    def skip(self, domain: Optional[str]) -> bool:
+        """True (and counted as skipped) if the domain is cooling down."""
+        if self.is_cooling_down(domain):
+            self.stats["skipped"] += 1
+            return True
+        return False
+
+    def record_failure(self, domain: str, kind: str):
+        domain = normalize_domain(domain)
+        failures = self.records.get(domain, {}).get("consecutive_failures", 0) + 1
+        delay = min(self.base * 2 ** (failures - 1), self.max_delay)
+        now = datetime.now()
+
+        record = {"failure_kind": kind, "consecutive_failures": failures,
+                  "next_eligible_at": now + delay}
+        self.records[domain] = record
+        self.pending[domain] = {**record, "failed_at": now}
+        self.stats["failures"] += 1
+
+    def record_success(self, domain: str):
+        domain = normalize_domain(domain)
+        # Only write back domains that were failing; healthy ones need no row
+        if self.records.pop(domain, None) is None:
+            return
+        self.pending[domain] = {"failure_kind": None, "consecutive_failures": 0,
+                                "next_eligible_at": None, "failed_at": None}
+        self.stats["recovered"] += 1
+
+    def record(self, domain: Optional[str], failure: Optional[str]):
+        if not domain:
+            return
+        if failure:
+            self.record_failure(domain, failure)
+        else:
+            self.record_success(domain)
+
+    def flush(self, conn):
+        """Upsert every health change made during this run."""
+        if not self.pending:
+            return
+        cur = conn.cursor()
+        execute_values(
+            cur,
+            """
+            INSERT INTO domain_health
+            (domain, failure_kind, consecutive_failures, last_failure_at,
+             next_eligible_at, last_success_at)
+            VALUES %s
+            ON CONFLICT (domain) DO UPDATE SET
+                failure_kind = EXCLUDED.failure_kind,
+                consecutive_failures = EXCLUDED.consecutive_failures,
+                last_failure_at = COALESCE(EXCLUDED.last_failure_at, domain_health.last_failure_at),
+                next_eligible_at = EXCLUDED.next_eligible_at,
+                last_success_at = COALESCE(EXCLUDED.last_success_at, domain_health.last_success_at)
+            """,
+            [
+                (domain, r["failure_kind"], r["consecutive_failures"], r["failed_at"],
+                 r["next_eligible_at"], None if r["failed_at"] else datetime.now())
+                for domain, r in self.pending.items()
+            ],
+        )
+        conn.commit()
+        cur.close()
+        self.pending.clear()
+
+    def summary(self) -> str:
+        return (f"{self.stats['skipped']} domains skipped (cooling down), "
+                f"{self.stats['failures']} failed, {self.stats['recovered']} recovered")
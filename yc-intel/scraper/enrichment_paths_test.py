@@ -0,0 +1,105 @@
+"""
+The list scraper, the detail scraper and website_enrichment.py all write
+company_web_enrichment, and must store the same row for the same homepage.
+Each page here is served from a local server and enriched by all three.
+
+Run from scraper/:  python -m pytest enrichment_paths_test.py
+"""
+
+import asyncio
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from detail_scraper import DetailScraper
+from domain_health import DomainHealth
+from main_scraper import YCScraper
+from profiler import SpanProfiler
+from web_fetch import CHUNK_SIZE
+from website_enrichment import check_website
+
+FILLER = b"<p>Ship software faster with fewer meetings.</p>\n" * (4 * CHUNK_SIZE // 48)
+
+# name -> (html, expected (has_careers_page, has_blog, contact_email))
+PAGES = {
+    "anchors": (
+        b'<html><nav><a href="/careers">Careers</a><a href="https://acme.io/blog/">Blog</a>'
+        b'</nav><footer><a href="mailto:hello@acme.io">hello@acme.io</a></footer></html>',
+        (True, True, "hello@acme.io"),
+    ),
+    # Feeds, scripts and stylesheets are not links a visitor can follow
+    "non_anchor_hrefs": (
+        b'<html><head><link rel="alternate" href="/blog/feed.xml">'
+        b'<script src="/jobs/widget.js"></script></head>'
+        b'<body><a data-href="/careers" href="/about">About</a></body></html>',
+        (False, False, None),
+    ),
+    "unquoted_and_attributes_first": (
+        b'<html><A class="nav" target=_blank HREF=/Jobs>Jobs</A>'
+        b"<a title='x' href='/news/blog-post'>Post</a></html>",
+        (True, True, None),
+    ),
+    "non_contact_emails_skipped": (
+        b"<html>noreply@acme.io test@acme.io <a href='/blog'>b</a> team@acme.io</html>",
+        (False, True, "team@acme.io"),
+    ),
+    # Every signal up front: the fetch stops early and the anchors further
+    # down, never downloaded, must not change the answer
+    "decided_early": (
+        b'<html><a href="/careers">c</a><a href="/blog">b</a> hi@acme.io' + FILLER
+        + b'<a href="/hiring">h</a></html>',
+        (True, True, "hi@acme.io"),
+    ),
+    "signals_past_the_first_chunks": (
+        b"<html>" + FILLER + b'<link href="/blog/rss"><a href="/jobs">Jobs</a>'
+        + b"jobs@acme.io</html>",
+        (True, False, "jobs@acme.io"),
+    ),
+}
+
+
+async def enrich_all_paths(base: str, name: str):
+    domain = f"{base}/{name}"
+
+    list_scraper = YCScraper.__new__(YCScraper)
+    list_scraper.profiler = SpanProfiler()
+
+    detail_scraper = DetailScraper.__new__(DetailScraper)
+    detail_scraper.profiler = SpanProfiler()
+    detail_scraper.domain_health = DomainHealth()
+
+    async with aiohttp.ClientSession() as session:
+        return {
+            "main_scraper": await list_scraper.enrich_website(session, domain),
+            "detail_scraper": await detail_scraper.enrich_from_website(session, domain),
+            "website_enrichment": await check_website(session, domain),
+        }
+
+
+async def run_against_pages(name: str):
+    async def page(request):
+        html, _ = PAGES[request.match_info["name"]]
+        return web.Response(body=html, content_type="text/html")
+
+    app = web.Application()
+    app.router.add_get("/{name}", page)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        return await enrich_all_paths(f"http://127.0.0.1:{port}", name)
+    finally:
+        await runner.cleanup()
+
+
+@pytest.mark.parametrize("name", PAGES)
+def test_every_path_stores_the_same_row(name):
+    results = asyncio.run(run_against_pages(name))
+    _, expected = PAGES[name]
+    for path, result in results.items():
+        assert result.failure is None, path
+        row = (result.has_careers_page, result.has_blog, result.contact_email)
+        assert row == expected, path
@@ -0,0 +1,77 @@
+"""
+Incremental enrichment scheduling
+
+Selects only the companies whose website enrichment is missing or older
+than a TTL, so steady-state enrichment cost tracks churn rather than the
+size of the directory. Never-enriched companies come first, then companies
+whose snapshot changed after their last enrichment, then the stalest.
+Domains cooling down in domain_health are left out before the per-run cap
+is applied, so they never take a slot from a company that can be fetched.
+"""
+
+import os
+from typing import List, Optional, Tuple
+
+ENRICH_INCREMENTAL = os.getenv("ENRICH_INCREMENTAL", "1") == "1"
+ENRICH_TTL_HOURS = float(os.getenv("ENRICH_TTL_HOURS", "168"))
+ENRICH_MAX_PER_RUN = int(os.getenv("ENRICH_MAX_PER_RUN", "0")) or None
+
+# domain_health.normalize_domain in SQL: the key domain_health rows use
+DOMAIN_KEY_SQL = "split_part(regexp_replace(lower(btrim(c.domain)), '^https?://', ''), '/', 1)"
+
+# With incremental off every active company is due, but the order, the
+# backoff and the per-run cap still apply. The current snapshot is the
+# newest one, so its scraped_at is when the company last changed
+DUE_COMPANIES_SQL = f"""
+    SELECT c.id, c.domain
+    FROM companies c
+    LEFT JOIN company_web_enrichment e ON e.company_id = c.id
+    LEFT JOIN company_snapshots s ON s.id = c.current_snapshot_id
+    LEFT JOIN domain_health dh ON dh.domain = {DOMAIN_KEY_SQL}
+    WHERE c.domain IS NOT NULL
+      AND c.is_active
+      AND (NOT %s OR e.scraped_at IS NULL OR e.scraped_at < NOW() - %s * INTERVAL '1 hour')
+      AND (dh.next_eligible_at IS NULL OR dh.next_eligible_at <= NOW())
+    ORDER BY
+        (e.scraped_at IS NULL) DESC,
+        (s.scraped_at > e.scraped_at) DESC NULLS LAST,
+        e.scraped_at ASC NULLS FIRST,
+        c.id
+    LIMIT %s
+"""
+
+# The same due test and order, restricted to companies the pipeline just wrote
+DUE_AMONG_SQL = f"""
+    SELECT c.id, c.domain
+    FROM companies c
+    LEFT JOIN company_web_enrichment e ON e.company_id = c.id
+    LEFT JOIN company_snapshots s ON s.id = c.current_snapshot_id
+    LEFT JOIN domain_health dh ON dh.domain = {DOMAIN_KEY_SQL}
+    WHERE c.id = ANY(%s)
+      AND c.domain IS NOT NULL
+      AND c.is_active
+      AND (NOT %s OR e.scraped_at IS NULL OR e.scraped_at < NOW() - %s * INTERVAL '1 hour')
+      AND (dh.next_eligible_at IS NULL OR dh.next_eligible_at <= NOW())
+    ORDER BY
+        (e.scraped_at IS NULL) DESC,
+        (s.scraped_at > e.scraped_at) DESC NULLS LAST,
+        e.scraped_at ASC NULLS FIRST,
+        c.id
+"""
+
+
+def select_companies(cur, incremental: bool = ENRICH_INCREMENTAL,
+                     ttl_hours: float = ENRICH_TTL_HOURS,
+                     max_count: Optional[int] = ENRICH_MAX_PER_RUN) -> List[Tuple[int, str]]:
+    """Return (company_id, domain) pairs to enrich this run."""
+    cur.execute(DUE_COMPANIES_SQL, (incremental, ttl_hours, max_count))
+    return cur.fetchall()
+
+
+def select_due_among(cur, company_ids: List[int], incremental: bool = ENRICH_INCREMENTAL,
+                     ttl_hours: float = ENRICH_TTL_HOURS) -> List[Tuple[int, str]]:
+    """Return (company_id, domain) pairs among company_ids that are due."""
+    if not company_ids:
+        return []
+    cur.execute(DUE_AMONG_SQL, (list(company_ids), incremental, ttl_hours))
+    return cur.fetchall()
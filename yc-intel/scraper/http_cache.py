@@ -0,0 +1,113 @@
+"""
+Persistent conditional-GET cache for detail pages
+
+Keeps ETag, Last-Modified, a body digest and the body size per URL in a
+local SQLite file so the next run can send If-None-Match /
+If-Modified-Since and skip pages that have not changed.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from typing import Dict, Optional
+
+HTTP_CACHE_PATH = os.getenv("HTTP_CACHE_PATH", "http_cache.sqlite3")
+
+
+class HttpCache:
+    def __init__(self, path: str = HTTP_CACHE_PATH):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS http_cache (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                digest TEXT,
+                size INTEGER,
+                fetched_at REAL
+            )
+            """
+        )
+        self.conn.commit()
+        self.pending_writes = 0
+
+        self.stats = {
+            "requests": 0,
+            "not_modified": 0,
+            "identical": 0,
+            "misses": 0,
+            "bytes_downloaded": 0,
+            "bytes_saved": 0,
+        }
+
+    @staticmethod
+    def digest(body: bytes) -> str:
+        return hashlib.sha256(body).hexdigest()
+
+    def get(self, url: str) -> Optional[Dict]:
+        row = self.conn.execute(
+            "SELECT etag, last_modified, digest, size FROM http_cache WHERE url = ?",
+            (url,),
+        ).fetchone()
+        if not row:
+            return None
+        return {"etag": row[0], "last_modified": row[1], "digest": row[2], "size": row[3]}
+
+    def conditional_headers(self, entry: Optional[Dict]) -> Dict:
+        headers = {}
+        if entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    # --------------------------------------------------------------
+    # Outcome accounting
+    # --------------------------------------------------------------
+
+    def record_not_modified(self, entry: Dict):
+        self.stats["requests"] += 1
+        self.stats["not_modified"] += 1
+        self.stats["bytes_saved"] += entry["size"] or 0
+
+    def record_download(self, size: int, identical: bool):
+        self.stats["requests"] += 1
+        self.stats["bytes_downloaded"] += size
+        if identical:
+            self.stats["identical"] += 1
+        else:
+            self.stats["misses"] += 1
+
+    def store(self, url: str, etag: Optional[str], last_modified: Optional[str],
+              digest: str, size: int):
+        """Remember a response once its contents have been persisted."""
+        self.conn.execute(
+            """
+            INSERT INTO http_cache (url, etag, last_modified, digest, size, fetched_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT (url) DO UPDATE SET
+                etag = excluded.etag,
+                last_modified = excluded.last_modified,
+                digest = excluded.digest,
+                size = excluded.size,
+                fetched_at = excluded.fetched_at
+            """,
+            (url, etag, last_modified, digest, size, time.time()),
+        )
+        self.pending_writes += 1
+        if self.pending_writes >= 100:
+            self.conn.commit()
+            self.pending_writes = 0
+
+    def hit_rate(self) -> float:
+        if not self.stats["requests"]:
+            return 0.0
+        hits = self.stats["not_modified"] + self.stats["identical"]
+        return hits / self.stats["requests"]
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
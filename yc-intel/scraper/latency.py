@@ -0,0 +1,123 @@
+"""
+Fixed-memory latency statistics
+
+LatencyHistogram counts samples in log-spaced buckets (about 9% apart),
+so a run of any length costs the same few hundred integers and still
+answers mean, min, max and percentiles. SlowestK keeps the k largest
+samples with a payload in a bounded min-heap, which is all the "top 5
+slowest" reports need.
+"""
+
+import heapq
+import itertools
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+# Bucket i covers (LOWEST * GROWTH ** (i - 1), LOWEST * GROWTH ** i]
+GROWTH = 2 ** (1 / 8)
+LOWEST = 0.001
+BUCKETS = 320  # up to ~1e9 x LOWEST
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    @staticmethod
+    def _bucket(value: float) -> int:
+        if value <= LOWEST:
+            return 0
+        return min(BUCKETS - 1, math.ceil(math.log(value / LOWEST, GROWTH)))
+
+    def record(self, value: float):
+        self.counts[self._bucket(value)] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "LatencyHistogram"):
+        for i, n in enumerate(other.counts):
+            self.counts[i] += n
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, pct: float) -> float:
+        """Upper bound of the bucket holding the pct-th sample, clamped to min/max."""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(self.count * pct / 100))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(max(LOWEST * GROWTH ** i, self.min), self.max)
+        return self.max
+
+    def summary(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min or 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max or 0.0,
+        }
+
+    def state(self) -> Dict:
+        """JSON-safe form for checkpoints; only non-empty buckets are kept."""
+        return {
+            "buckets": {str(i): n for i, n in enumerate(self.counts) if n},
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_state(cls, state: Optional[Dict]) -> "LatencyHistogram":
+        histogram = cls()
+        if not state:
+            return histogram
+        for i, n in state.get("buckets", {}).items():
+            histogram.counts[int(i)] = n
+        histogram.count = state.get("count", 0)
+        histogram.total = state.get("total", 0.0)
+        histogram.min = state.get("min")
+        histogram.max = state.get("max")
+        return histogram
+
+
+class SlowestK:
+    def __init__(self, k: int = 5):
+        self.k = k
+        self.heap: List[Tuple[float, int, Any]] = []
+        # Tie-breaker so payloads never get compared
+        self._seq = itertools.count()
+
+    def add(self, value: float, payload: Any = None):
+        entry = (value, next(self._seq), payload)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, entry)
+        elif value > self.heap[0][0]:
+            heapq.heapreplace(self.heap, entry)
+
+    def items(self) -> List[Tuple[float, Any]]:
+        """(value, payload) pairs, slowest first."""
+        return [(value, payload) for value, _, payload in sorted(self.heap, reverse=True)]
+
+    def top(self) -> Tuple[float, Any]:
+        return max(self.heap)[::2] if self.heap else (0.0, None)
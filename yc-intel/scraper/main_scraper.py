@@ -6,6 +6,8 @@ YC Companies Master Data Ingestion Pipeline
 - Normalizes and stores data in PostgreSQL
 - Tracks historical changes via hashing
 - Enriches company websites asynchronously
+- Runs listing, normalization, DB writes and enrichment as one overlapped
+  pipeline connected by bounded queues
 - Records operational scrape metrics
 """
 
@@ -15,14 +17,32 @@ import logging
 from logging.handlers import RotatingFileHandler
 from dotenv import load_dotenv
 import psycopg2
-import requests
+from psycopg2.extras import execute_values
 import json
 import hashlib
+import io
 import asyncio
 import aiohttp
-from bs4 import BeautifulSoup
-import re
-from typing import Dict, List
+from typing import AsyncIterator, Dict, List, Tuple
+
+from algolia_listing import AlgoliaLister
+from analytics_rollup import refresh_rollup
+from db_pool import get_pool
+from domain_health import DomainHealth, classify_failure
+from enrichment_schedule import (
+    ENRICH_INCREMENTAL,
+    ENRICH_MAX_PER_RUN,
+    ENRICH_TTL_HOURS,
+    select_companies,
+    select_due_among,
+)
+from latency import SlowestK
+from pipeline_stats import PipelineStats, StageStats
+from profiler import SpanProfiler, save_profile
+from records import CompanyDetail, EnrichmentResult, ListingHit
+from run_checkpoint import find_unfinished_run, save_checkpoint
+from snapshot_index import SnapshotHashIndex
+from web_fetch import SignalScanner, enrichment_result, fetch_homepage, homepage_url
 
 # ------------------------------------------------------------------
 # Configuration & Logging
@@ -45,11 +65,27 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
-ALGOLIA_URL = (
-    "https://45bwzj1sgc-dsn.algolia.net/1/indexes/*/queries"
+ALGOLIA_URL = os.getenv(
+    "ALGOLIA_URL", "https://45bwzj1sgc-dsn.algolia.net/1/indexes/*/queries"
 )
 ALGOLIA_KEY = "f54e21fa3d794d0052b22b56683b9b3a"
 ALGOLIA_APP_ID = "45BWZJ1SGC"
+ALGOLIA_SHARD_FACET = os.getenv("ALGOLIA_SHARD_FACET", "batch")
+ALGOLIA_PAGES_PER_REQUEST = int(os.getenv("ALGOLIA_PAGES_PER_REQUEST", "8"))
+ALGOLIA_CONCURRENCY = int(os.getenv("ALGOLIA_CONCURRENCY", "6"))
+
+SAVE_BATCH_SIZE = int(os.getenv("SAVE_BATCH_SIZE", "500"))
+SAVE_FLUSH_INTERVAL = float(os.getenv("SAVE_FLUSH_INTERVAL", "2"))
+
+# Bounded queues between pipeline stages; a full queue pauses the stage
+# feeding it
+PIPELINE_PAGE_QUEUE = int(os.getenv("PIPELINE_PAGE_QUEUE", "8"))  # Algolia pages
+PIPELINE_ROW_QUEUE = int(os.getenv("PIPELINE_ROW_QUEUE", str(SAVE_BATCH_SIZE * 2)))
+
+ENRICH_WORKERS = int(os.getenv("ENRICH_WORKERS", "20"))
+ENRICH_FLUSH_SIZE = int(os.getenv("ENRICH_FLUSH_SIZE", "200"))
+ENRICH_FLUSH_INTERVAL = float(os.getenv("ENRICH_FLUSH_INTERVAL", "5"))
+ENRICH_QUEUE_SIZE = int(os.getenv("ENRICH_QUEUE_SIZE", str(ENRICH_WORKERS * 4)))
 
 
 # ------------------------------------------------------------------
@@ -60,6 +96,9 @@ class YCScraper:
     def __init__(self):
         self.conn = psycopg2.connect(DATABASE_URL)
         self.cur = self.conn.cursor()
+        # Enrichment results are written from their own pooled connections so
+        # they never share a transaction with the company writer
+        self.db = get_pool(DATABASE_URL)
 
         self.metrics = {
             "total": 0,
@@ -67,24 +106,59 @@ class YCScraper:
             "updated": 0,
             "unchanged": 0,
             "failed": 0,
-            "timings": [],
-            "slowest": None,
-            "slowest_time": 0.0,
         }
+        # Span timings per stage (ms); normalization is timed per page to
+        # keep the per-company loop cheap, with the slowest companies kept apart
+        self.profiler = SpanProfiler()
+        self.slowest = SlowestK(5)
+
+        self.snapshots = SnapshotHashIndex()
 
         self.scrape_run_id = None
         self.start_time = None
 
+        # Resume state, persisted on the scrape_runs row
+        self.stage = None
+        self.cursor = None
+        self.stages = {}
+        self.saved_ids = set()
+        self.pages_listed = 0
+
+    def ensure_snapshot_index(self):
+        if not self.snapshots.loaded:
+            self.snapshots.load(self.conn)
+
     # --------------------------------------------------------------
     # Scrape Run Tracking
     # --------------------------------------------------------------
 
-    def start_scrape_run(self):
+    def start_scrape_run(self, resume: bool = False):
         self.start_time = time.time()
+
+        if resume:
+            run = find_unfinished_run(self.cur, "list")
+            if run:
+                checkpoint = run["checkpoint"]
+                self.scrape_run_id = run["id"]
+                self.stage = checkpoint.get("stage")
+                self.cursor = checkpoint.get("cursor")
+                self.stages = checkpoint.get("stages", {})
+                self.metrics.update(checkpoint.get("metrics", {}))
+                self.profiler = SpanProfiler.from_state(checkpoint.get("profile"))
+                for timing, name in checkpoint.get("slowest", []):
+                    self.slowest.add(timing, name)
+                self.conn.commit()
+                logger.info(
+                    f"Resuming scrape run #{self.scrape_run_id} "
+                    f"(started {run['started_at']}) at stage {self.stage or 'listing'}"
+                )
+                return
+            logger.info("No unfinished scrape run to resume, starting a new one")
+
         self.cur.execute(
             """
-            INSERT INTO scrape_runs (started_at)
-            VALUES (NOW())
+            INSERT INTO scrape_runs (started_at, scraper)
+            VALUES (NOW(), 'list')
             RETURNING id
             """
         )
@@ -92,13 +166,49 @@ class YCScraper:
         self.conn.commit()
         logger.info(f"Started scrape run #{self.scrape_run_id}")
 
+    def saved_in_run(self) -> set:
+        """YC ids whose current snapshot was written by this run."""
+        self.cur.execute(
+            """
+            SELECT c.yc_company_id
+            FROM companies c
+            JOIN company_snapshots s ON s.id = c.current_snapshot_id
+            JOIN scrape_runs r ON r.id = %s
+            WHERE s.scraped_at >= r.started_at
+            """,
+            (self.scrape_run_id,),
+        )
+        saved = {str(row[0]) for row in self.cur.fetchall()}
+        self.conn.commit()
+        return saved
+
+    def checkpoint_state(self, stage: str) -> Dict:
+        """
+        Copy of the resume state. Take it on the event loop, where the
+        stages mutate it, and hand the copy to write_checkpoint.
+        """
+        self.stage = stage
+        return {
+            "stage": stage,
+            "cursor": dict(self.cursor) if self.cursor else None,
+            "stages": {name: dict(progress) for name, progress in self.stages.items()},
+            "metrics": dict(self.metrics),
+            "profile": self.profiler.state(),
+            "slowest": self.slowest.items(),
+        }
+
+    def write_checkpoint(self, state: Dict):
+        """Persist how far this run got so --resume can continue from here."""
+        self.conn.rollback()
+        save_checkpoint(self.cur, self.scrape_run_id, state)
+        self.conn.commit()
+
+    def checkpoint(self, stage: str):
+        self.write_checkpoint(self.checkpoint_state(stage))
+
     def end_scrape_run(self):
         runtime = time.time() - self.start_time
-        avg_time = (
-            sum(self.metrics["timings"]) / len(self.metrics["timings"])
-            if self.metrics["timings"]
-            else 0
-        )
+        avg_time = self.avg_company_ms()
 
         self.cur.execute(
             """
@@ -118,10 +228,11 @@ class YCScraper:
                 self.metrics["updated"],
                 self.metrics["unchanged"],
                 self.metrics["failed"],
-                round(avg_time * 1000, 2),
+                round(avg_time, 2),
                 self.scrape_run_id,
             ),
         )
+        save_profile(self.cur, self.scrape_run_id, self.profiler)
         self.conn.commit()
         logger.info(f"Scrape run #{self.scrape_run_id} completed in {runtime:.2f}s")
 
@@ -129,83 +240,70 @@ class YCScraper:
     # Algolia List Fetch
     # --------------------------------------------------------------
 
-    def scrape_list(self) -> List[Dict]:
+    async def scrape_list(self) -> AsyncIterator[List[ListingHit]]:
+        """Yield pages of companies from Algolia as they arrive."""
         logger.info("Fetching company list from Algolia")
-        companies = []
-        page = 0
+        start = time.time()
 
         headers = {
             "X-Algolia-API-Key": ALGOLIA_KEY,
             "X-Algolia-Application-Id": ALGOLIA_APP_ID,
         }
+        lister = AlgoliaLister(
+            ALGOLIA_URL,
+            headers,
+            filters="isAccredited:true",
+            facet=ALGOLIA_SHARD_FACET,
+            pages_per_request=ALGOLIA_PAGES_PER_REQUEST,
+            concurrency=ALGOLIA_CONCURRENCY,
+        )
 
-        while True:
-            payload = {
-                "requests": [
-                    {
-                        "indexName": "YCCompany_production",
-                        "query": "",
-                        "page": page,
-                        "hitsPerPage": 100,
-                        "filters": "isAccredited:true",
-                    }
-                ]
-            }
-
-            try:
-                resp = requests.post(
-                    ALGOLIA_URL, json=payload, headers=headers, timeout=10
-                )
-                resp.raise_for_status()
-                data = resp.json()
-
-                hits = data["results"][0]["hits"]
-                if not hits:
-                    break
-
-                companies.extend(hits)
-                page += 1
-                logger.info(f"Fetched page {page} ({len(hits)} companies)")
-
-            except Exception as e:
-                logger.error(f"Algolia fetch failed: {e}")
-                break
-
-        logger.info(f"Total companies discovered: {len(companies)}")
-        return companies
+        # A listing cut short must fail the run: the pipeline would otherwise
+        # finish on a partial directory and mark the run completed
+        try:
+            async for page in lister.iter_pages():
+                yield [ListingHit.from_hit(hit) for hit in page]
+        except Exception as e:
+            logger.error(f"Algolia fetch failed: {e}")
+            raise
+
+        discovered = lister.stats["hits"] - lister.stats["duplicates"]
+        self.stages["listing"] = {"companies": discovered, **lister.stats}
+        logger.info(
+            f"Total companies discovered: {discovered} "
+            f"({lister.stats['shards']} shards, {lister.stats['requests']} requests, "
+            f"{lister.stats['failed_requests']} failed, "
+            f"{lister.stats['duplicates']} duplicates dropped) "
+            f"in {time.time() - start:.2f}s"
+        )
 
     # --------------------------------------------------------------
     # Company Normalization
     # --------------------------------------------------------------
 
-    def scrape_detail(self, company: Dict) -> Dict | None:
-        start = time.time()
-        name = company.get("name", "Unknown")
+    def scrape_detail(self, company: ListingHit) -> CompanyDetail | None:
+        start = time.perf_counter()
+        name = company.name or "Unknown"
 
         try:
-            website = company.get("website", "") or ""
+            website = company.website or ""
             domain = (
                 website.replace("https://", "")
                 .replace("http://", "")
                 .strip("/")
             )
 
-            timing = time.time() - start
-            self.metrics["timings"].append(timing)
-
-            if timing > self.metrics["slowest_time"]:
-                self.metrics["slowest"] = name
-                self.metrics["slowest_time"] = timing
-
-            return {
-                "batch": company.get("batch"),
-                "stage": company.get("stage", "Active"),
-                "description": company.get("short_description"),
-                "location": company.get("location"),
-                "tags": json.dumps(company.get("tags", [])),
-                "employee_range": company.get("employee_size"),
-                "website": domain,
-            }
+            self.slowest.add((time.perf_counter() - start) * 1000, name)
+
+            return CompanyDetail(
+                batch=company.batch,
+                stage=company.stage,
+                description=company.short_description,
+                location=company.location,
+                tags=company.tags,
+                employee_range=company.employee_size,
+                website=domain,
+            )
 
         except Exception as e:
             logger.error(f"Detail processing failed for {name}: {e}")
@@ -216,72 +314,68 @@ class YCScraper:
     # Database Persistence
     # --------------------------------------------------------------
 
-    def save_company(self, company: Dict, detail: Dict) -> str:
-        try:
-            yc_id = company.get("id")
-            name = company.get("name")
+    @staticmethod
+    def snapshot_hash(detail: CompanyDetail) -> str:
+        snapshot_payload = json.dumps(
+            {
+                "batch": detail.batch,
+                "stage": detail.stage,
+                "description": detail.description,
+                "location": detail.location,
+                "tags": json.dumps(list(detail.tags)),
+                "employee_range": detail.employee_range,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(snapshot_payload.encode()).hexdigest()
 
-            self.cur.execute(
-                "SELECT id FROM companies WHERE yc_company_id = %s",
-                (yc_id,),
-            )
-            row = self.cur.fetchone()
-
-            snapshot_payload = json.dumps(
-                {
-                    "batch": detail["batch"],
-                    "stage": detail["stage"],
-                    "description": detail["description"],
-                    "location": detail["location"],
-                    "tags": detail["tags"],
-                    "employee_range": detail["employee_range"],
-                },
-                sort_keys=True,
-            )
-            data_hash = hashlib.sha256(snapshot_payload.encode()).hexdigest()
+    def save_company(self, company: ListingHit, detail: CompanyDetail) -> str:
+        self.ensure_snapshot_index()
 
-            if row:
-                company_id = row[0]
+        try:
+            yc_id = company.id
+            name = company.name
 
-                self.cur.execute(
-                    """
-                    SELECT data_hash
-                    FROM company_snapshots
-                    WHERE company_id = %s
-                    ORDER BY scraped_at DESC
-                    LIMIT 1
-                    """,
-                    (company_id,),
-                )
-                last = self.cur.fetchone()
+            data_hash = self.snapshot_hash(detail)
+            company_id = self.snapshots.company_id(yc_id)
 
-                if last and last[0] == data_hash:
-                    self.metrics["unchanged"] += 1
-                    return "unchanged"
+            if self.snapshots.is_unchanged(company_id, data_hash):
+                self.metrics["unchanged"] += 1
+                return "unchanged"
 
+            if company_id is not None:
                 self.cur.execute(
                     """
                     INSERT INTO company_snapshots
                     (company_id, batch, stage, description, location,
                      tags, employee_range, data_hash, scraped_at)
                     VALUES (%s,%s,%s,%s,%s,%s,%s,%s,NOW())
+                    RETURNING id
                     """,
                     (
                         company_id,
-                        detail["batch"],
-                        detail["stage"],
-                        detail["description"],
-                        detail["location"],
-                        detail["tags"],
-                        detail["employee_range"],
+                        detail.batch,
+                        detail.stage,
+                        detail.description,
+                        detail.location,
+                        json.dumps(list(detail.tags)),
+                        detail.employee_range,
                         data_hash,
                     ),
                 )
+                snapshot_id = self.cur.fetchone()[0]
 
                 self.cur.execute(
-                    "UPDATE companies SET last_seen_at = NOW() WHERE id = %s",
-                    (company_id,),
+                    """
+                    UPDATE companies
+                    SET last_seen_at = NOW(), current_snapshot_id = %s,
+                        batch = %s, stage = %s, location = %s
+                    WHERE id = %s
+                    """,
+                    (snapshot_id, detail.batch, detail.stage, detail.location, company_id),
                 )
+                self.conn.commit()
+                self.snapshots.record(company_id, data_hash)
 
                 self.metrics["updated"] += 1
                 return "updated"
@@ -293,7 +387,7 @@ class YCScraper:
                 VALUES (%s,%s,%s,NOW(),NOW(),TRUE)
                 RETURNING id
                 """,
-                (yc_id, name, detail["website"]),
+                (yc_id, name, detail.website),
             )
             company_id = self.cur.fetchone()[0]
 
@@ -303,117 +397,507 @@ class YCScraper:
                 (company_id, batch, stage, description, location,
                  tags, employee_range, data_hash, scraped_at)
                 VALUES (%s,%s,%s,%s,%s,%s,%s,%s,NOW())
+                RETURNING id
                 """,
                 (
                     company_id,
-                    detail["batch"],
-                    detail["stage"],
-                    detail["description"],
-                    detail["location"],
-                    detail["tags"],
-                    detail["employee_range"],
+                    detail.batch,
+                    detail.stage,
+                    detail.description,
+                    detail.location,
+                    json.dumps(list(detail.tags)),
+                    detail.employee_range,
                     data_hash,
                 ),
             )
+            self.cur.execute(
+                """
+                UPDATE companies
+                SET current_snapshot_id = %s, batch = %s, stage = %s, location = %s
+                WHERE id = %s
+                """,
+                (self.cur.fetchone()[0], detail.batch, detail.stage, detail.location,
+                 company_id),
+            )
+            self.conn.commit()
+            self.snapshots.record(company_id, data_hash, yc_id)
 
             self.metrics["new"] += 1
             return "new"
 
         except Exception as e:
-            logger.error(f"DB save failed for {company.get('name')}: {e}")
+            logger.error(f"DB save failed for {company.name}: {e}")
             self.metrics["failed"] += 1
             return "failed"
 
         finally:
             self.conn.commit()
 
+    @staticmethod
+    def _copy_row(values) -> str:
+        """Format one COPY CSV line, keeping NULL distinct from ''."""
+        fields = []
+        for value in values:
+            if value is None:
+                fields.append("\\N")
+            else:
+                fields.append('"' + str(value).replace('"', '""') + '"')
+        return ",".join(fields) + "\n"
+
+    def save_companies(self, batch: List[Tuple[ListingHit, CompanyDetail]]) -> Dict[str, int]:
+        """
+        Persist a batch of normalized companies with set-based statements.
+
+        Unchanged rows are filtered out against the snapshot index; the rest
+        are COPYed into a temp staging table, then new companies, snapshots
+        and last_seen_at updates are each written with a single statement.
+        If anything fails the batch is rolled back and replayed through
+        save_company so the metrics stay exact.
+        """
+        if not batch:
+            return {"new": 0, "updated": 0, "unchanged": 0, "failed": 0}
+
+        self.ensure_snapshot_index()
+
+        rows = {}
+        for company, detail in batch:
+            rows[company.id] = (company, detail, self.snapshot_hash(detail))
+        # A repeated hit in the same batch carries the same data, so the
+        # serial path would have reported it as unchanged
+        duplicates = len(batch) - len(rows)
+
+        # Unchanged companies are settled from the index without touching
+        # the database; only new and changed rows get staged
+        staged = {
+            yc_id: row
+            for yc_id, row in rows.items()
+            if not self.snapshots.is_unchanged(self.snapshots.company_id(yc_id), row[2])
+        }
+        unchanged = len(rows) - len(staged) + duplicates
+
+        if not staged:
+            self.metrics["unchanged"] += unchanged
+            return {"new": 0, "updated": 0, "unchanged": unchanged, "failed": 0}
+
+        buf = io.StringIO()
+        for yc_id, (company, detail, data_hash) in staged.items():
+            buf.write(
+                self._copy_row(
+                    (
+                        yc_id,
+                        company.name,
+                        detail.website,
+                        detail.batch,
+                        detail.stage,
+                        detail.description,
+                        detail.location,
+                        json.dumps(list(detail.tags)),
+                        detail.employee_range,
+                        data_hash,
+                    )
+                )
+            )
+        buf.seek(0)
+
+        try:
+            self.cur.execute(
+                """
+                CREATE TEMP TABLE company_staging ON COMMIT DROP AS
+                SELECT c.yc_company_id, c.name, c.domain,
+                       s.batch, s.stage, s.description, s.location,
+                       s.tags, s.employee_range, s.data_hash
+                FROM companies c, company_snapshots s
+                WITH NO DATA
+                """
+            )
+            self.cur.copy_expert(
+                "COPY company_staging FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+                buf,
+            )
+
+            self.cur.execute(
+                """
+                INSERT INTO companies
+                (yc_company_id, name, domain, first_seen_at, last_seen_at, is_active)
+                SELECT st.yc_company_id, st.name, st.domain, NOW(), NOW(), TRUE
+                FROM company_staging st
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM companies c
+                    WHERE c.yc_company_id = st.yc_company_id
+                )
+                RETURNING id, yc_company_id
+                """
+            )
+            new_ids = {row[0]: row[1] for row in self.cur.fetchall()}
+
+            # Snapshots and the companies' current_snapshot_id, current
+            # batch/stage/location and last_seen_at land in one statement
+            self.cur.execute(
+                """
+                WITH inserted AS (
+                    INSERT INTO company_snapshots
+                    (company_id, batch, stage, description, location,
+                     tags, employee_range, data_hash, scraped_at)
+                    SELECT c.id, st.batch, st.stage, st.description, st.location,
+                           st.tags, st.employee_range, st.data_hash, NOW()
+                    FROM company_staging st
+                    JOIN companies c ON c.yc_company_id = st.yc_company_id
+                    RETURNING id, company_id, data_hash, batch, stage, location
+                ), current_state AS (
+                    UPDATE companies c
+                    SET current_snapshot_id = i.id, batch = i.batch, stage = i.stage,
+                        location = i.location, last_seen_at = NOW()
+                    FROM inserted i
+                    WHERE c.id = i.company_id
+                )
+                SELECT company_id, data_hash FROM inserted
+                """
+            )
+            changed = self.cur.fetchall()
+            updated_ids = [company_id for company_id, _ in changed if company_id not in new_ids]
+
+            self.conn.commit()
+
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(
+                f"Bulk save failed for {len(batch)} companies, "
+                f"falling back to row-by-row: {e}"
+            )
+            counts = {"new": 0, "updated": 0, "unchanged": 0, "failed": 0}
+            for company, detail in batch:
+                counts[self.save_company(company, detail)] += 1
+            return counts
+
+        for company_id, data_hash in changed:
+            self.snapshots.record(company_id, data_hash, new_ids.get(company_id))
+
+        counts = {
+            "new": len(new_ids),
+            "updated": len(updated_ids),
+            "unchanged": unchanged,
+            "failed": 0,
+        }
+        for key, value in counts.items():
+            self.metrics[key] += value
+        return counts
+
     # --------------------------------------------------------------
     # Website Enrichment
     # --------------------------------------------------------------
 
-    async def enrich_website(self, session: aiohttp.ClientSession, domain: str) -> Dict:
+    async def enrich_website(self, session: aiohttp.ClientSession,
+                             domain: str) -> EnrichmentResult:
         if not domain:
-            return {"has_careers": False, "has_blog": False, "email": None}
+            return EnrichmentResult()
 
         try:
-            async with session.get(f"https://{domain}", timeout=3) as resp:
-                if resp.status != 200:
-                    return {"has_careers": False, "has_blog": False, "email": None}
+            scanner = SignalScanner()
+            with self.profiler.span("fetch"):
+                fetch = await fetch_homepage(session, homepage_url(domain), scanner=scanner)
+            return enrichment_result(fetch, scanner)
 
-                html = await resp.text()
-                soup = BeautifulSoup(html, "html.parser")
+        except Exception as e:
+            return EnrichmentResult(failure=classify_failure(e))
 
-                has_careers = bool(
-                    soup.find("a", href=re.compile(r"(career|job)", re.I))
-                )
-                has_blog = bool(
-                    soup.find("a", href=re.compile(r"blog", re.I))
+    def flush_enrichment(self, rows: List[Tuple]) -> int:
+        """Upsert a batch of (company_id, has_careers, has_blog, email) rows."""
+        try:
+            with self.db.connection() as conn:
+                cur = conn.cursor()
+                execute_values(
+                    cur,
+                    """
+                    INSERT INTO company_web_enrichment
+                    (company_id, has_careers_page, has_blog, contact_email, scraped_at)
+                    VALUES %s
+                    ON CONFLICT (company_id)
+                    DO UPDATE SET
+                        has_careers_page = EXCLUDED.has_careers_page,
+                        has_blog = EXCLUDED.has_blog,
+                        contact_email = EXCLUDED.contact_email,
+                        scraped_at = NOW()
+                    """,
+                    rows,
+                    template="(%s,%s,%s,%s,NOW())",
+                    page_size=len(rows),
                 )
+                conn.commit()
+                cur.close()
+            return len(rows)
+        except Exception as e:
+            logger.error(f"Enrichment batch of {len(rows)} failed: {e}")
+            return 0
 
-                emails = re.findall(r"[\w\.-]+@[\w\.-]+\.\w+", html)
-                email = emails[0] if emails else None
+    async def enrichment_writer(self, results: asyncio.Queue, stats: StageStats = None) -> int:
+        """Drain results, flushing on ENRICH_FLUSH_SIZE rows or ENRICH_FLUSH_INTERVAL seconds."""
+        batch = []
+        written = 0
+        last_flush = time.monotonic()
+        done = False
 
-                return {
-                    "has_careers": has_careers,
-                    "has_blog": has_blog,
-                    "email": email,
-                }
+        while not done:
+            try:
+                item = await asyncio.wait_for(results.get(), timeout=ENRICH_FLUSH_INTERVAL)
+                if item is None:
+                    done = True
+                else:
+                    company_id, result = item
+                    batch.append(
+                        (company_id, result.has_careers_page, result.has_blog, result.contact_email)
+                    )
+            except asyncio.TimeoutError:
+                pass
+
+            due = time.monotonic() - last_flush >= ENRICH_FLUSH_INTERVAL
+            if batch and (done or due or len(batch) >= ENRICH_FLUSH_SIZE):
+                flush_start = time.perf_counter()
+                with self.profiler.span("enrich_write"):
+                    written += await asyncio.to_thread(self.flush_enrichment, batch)
+                if stats:
+                    stats.add(len(batch), time.perf_counter() - flush_start)
+                batch = []
+                last_flush = time.monotonic()
+
+        if stats:
+            stats.finish()
+        return written
 
-        except Exception:
-            return {"has_careers": False, "has_blog": False, "email": None}
+    # --------------------------------------------------------------
+    # Pipeline
+    # --------------------------------------------------------------
+    #
+    #   Algolia pages -> normalize -> batched DB writer -> enrichment
+    #                                                     workers -> writer
+    #
+    # Every arrow is a bounded asyncio.Queue, so the slowest stage sets the
+    # pace and nothing upstream of it buffers without limit.
+
+    async def list_stage(self, pages: asyncio.Queue, stats: StageStats):
+        listing = self.scrape_list()
+        while True:
+            start = time.perf_counter()
+            try:
+                with self.profiler.span("listing"):
+                    page = await listing.__anext__()
+            except StopAsyncIteration:
+                break
+            stats.add(len(page), time.perf_counter() - start)
+            self.pages_listed += 1
+            await pages.put(page)
+
+        await pages.put(None)
+        stats.finish()
+
+    async def normalize_stage(self, pages: asyncio.Queue, rows: asyncio.Queue,
+                              stats: StageStats):
+        while (page := await pages.get()) is not None:
+            start = time.perf_counter()
+            normalized = []
+            with self.profiler.span("normalize"):
+                for company in page:
+                    detail = self.scrape_detail(company)
+                    if detail:
+                        normalized.append((company, detail))
+            self.metrics["total"] += len(page)
+            stats.add(len(page), time.perf_counter() - start)
+
+            for row in normalized:
+                await rows.put(row)
+
+        await rows.put(None)
+        stats.finish()
+
+    def write_batch(self, batch: List[Tuple[ListingHit, CompanyDetail]],
+                    incremental: bool, select_due: bool = True) -> List[Tuple[int, str]]:
+        """
+        Save a batch and return the (company_id, domain) pairs in it that
+        are due for enrichment, or nothing when select_due is off.
+        Companies saved before a resume are not saved again but still go
+        through the due check.
+        """
+        fresh = [(c, d) for c, d in batch if str(c.id) not in self.saved_ids]
+        with self.profiler.span("db_write"):
+            self.save_companies(fresh)
+        self.saved_ids.update(str(c.id) for c, _ in fresh)
+
+        # The cursor only says how far the run got; the companies to skip on
+        # resume are read back from the snapshots this run wrote
+        if fresh:
+            last = fresh[-1][0]
+            self.cursor = {
+                "shard": last.batch,
+                "pages": self.pages_listed,
+                "last_company_id": self.snapshots.company_id(last.id),
+                "saved": len(self.saved_ids),
+            }
 
-    async def enrich_all_companies(self):
-        logger.info("Starting website enrichment")
+        if not select_due:
+            return []
 
-        self.cur.execute(
-            "SELECT id, domain FROM companies WHERE domain IS NOT NULL AND is_active"
-        )
-        companies = self.cur.fetchall()
+        company_ids = [self.snapshots.company_id(c.id) for c, _ in batch]
+        with self.profiler.span("enrich_select"):
+            due = select_due_among(
+                self.cur, [i for i in company_ids if i is not None], incremental=incremental
+            )
+        self.conn.commit()
+        return due
 
-        connector = aiohttp.TCPConnector(limit=20)
-        async with aiohttp.ClientSession(connector=connector) as session:
-            for company_id, domain in companies:
+    def select_capped(self, incremental: bool) -> List[Tuple[int, str]]:
+        """The ENRICH_MAX_PER_RUN due companies that rank first overall."""
+        with self.profiler.span("enrich_select"):
+            due = select_companies(self.cur, incremental=incremental)
+        self.conn.commit()
+        return due
+
+    async def write_stage(self, rows: asyncio.Queue, jobs: asyncio.Queue,
+                          stats: StageStats, health: DomainHealth, incremental: bool):
+        batch = []
+        last_flush = time.monotonic()
+        queued = 0
+        done = False
+        # Under a per-run cap the slots go to the highest-ranked due
+        # companies of the whole directory, which is only known once every
+        # row is written; uncapped runs enrich each batch as it lands, since
+        # everything due gets fetched either way
+        capped = ENRICH_MAX_PER_RUN is not None
+
+        async def dispatch(to_enrich: List[Tuple[int, str]]):
+            nonlocal queued
+            for company_id, domain in to_enrich:
+                if capped and queued >= ENRICH_MAX_PER_RUN:
+                    break
+                # The due queries leave out stored backoff; this catches
+                # domains that failed earlier in this run
+                if health.skip(domain):
+                    continue
+                await jobs.put((company_id, domain))
+                queued += 1
+
+        while not done:
+            try:
+                row = await asyncio.wait_for(rows.get(), timeout=SAVE_FLUSH_INTERVAL)
+                if row is None:
+                    done = True
+                else:
+                    batch.append(row)
+            except asyncio.TimeoutError:
+                pass
+
+            due = time.monotonic() - last_flush >= SAVE_FLUSH_INTERVAL
+            if batch and (done or due or len(batch) >= SAVE_BATCH_SIZE):
+                start = time.perf_counter()
+                to_enrich = await asyncio.to_thread(
+                    self.write_batch, batch, incremental, not capped
+                )
+                stats.add(len(batch), time.perf_counter() - start)
+                self.stages["saving"] = {"done": len(self.saved_ids)}
+                await asyncio.to_thread(self.write_checkpoint, self.checkpoint_state("pipeline"))
+                batch = []
+                last_flush = time.monotonic()
+                await dispatch(to_enrich)
+
+        if capped:
+            await dispatch(await asyncio.to_thread(self.select_capped, incremental))
+
+        for _ in range(ENRICH_WORKERS):
+            await jobs.put(None)
+        stats.finish()
+
+    async def enrich_stage(self, session: aiohttp.ClientSession, jobs: asyncio.Queue,
+                           results: asyncio.Queue, stats: StageStats, health: DomainHealth):
+        while (job := await jobs.get()) is not None:
+            company_id, domain = job
+            start = time.perf_counter()
+            with self.profiler.span("enrich"):
                 result = await self.enrich_website(session, domain)
+            stats.add(1, time.perf_counter() - start)
+
+            health.record(domain, result.failure)
+            # Leave the last good enrichment alone for failed domains
+            if not result.failure:
+                await results.put((company_id, result))
+        stats.finish()
+
+    async def run_pipeline(self, incremental: bool = ENRICH_INCREMENTAL):
+        logger.info(
+            "Starting pipeline"
+            + (f" (incremental enrichment, TTL {ENRICH_TTL_HOURS:g}h)" if incremental else "")
+        )
+        start = time.time()
+        # The listing is repeated in full on resume, so count it afresh;
+        # companies saved before the interruption keep their new/updated count
+        self.metrics["total"] = 0
+        self.metrics["unchanged"] = 0
+        self.metrics["failed"] = 0
+        self.pages_listed = 0
+
+        health = DomainHealth()
+        health.load(self.conn)
+
+        pages = asyncio.Queue(maxsize=PIPELINE_PAGE_QUEUE)
+        rows = asyncio.Queue(maxsize=PIPELINE_ROW_QUEUE)
+        jobs = asyncio.Queue(maxsize=ENRICH_QUEUE_SIZE)
+        results = asyncio.Queue(maxsize=ENRICH_FLUSH_SIZE * 2)
+
+        pipeline = PipelineStats()
+        listing = pipeline.stage("listing")
+        normalize = pipeline.stage("normalize", pages)
+        write = pipeline.stage("db_write", rows)
+        enrich = pipeline.stage("enrich", jobs, workers=ENRICH_WORKERS)
+        enrich_write = pipeline.stage("enrich_write", results)
+        for stats in pipeline.stages:
+            stats.start()
+
+        connector = aiohttp.TCPConnector(limit=ENRICH_WORKERS)
+        async with aiohttp.ClientSession(
+            connector=connector, trace_configs=[self.profiler.trace_config()]
+        ) as session:
+            sampler = asyncio.create_task(pipeline.sample())
+            stages = [
+                asyncio.create_task(self.list_stage(pages, listing)),
+                asyncio.create_task(self.normalize_stage(pages, rows, normalize)),
+                asyncio.create_task(self.write_stage(rows, jobs, write, health, incremental)),
+                *(
+                    asyncio.create_task(self.enrich_stage(session, jobs, results, enrich, health))
+                    for _ in range(ENRICH_WORKERS)
+                ),
+            ]
+            writer = asyncio.create_task(self.enrichment_writer(results, enrich_write))
 
-                try:
-                    self.cur.execute(
-                        """
-                        INSERT INTO company_web_enrichment
-                        (company_id, has_careers_page, has_blog, contact_email, scraped_at)
-                        VALUES (%s,%s,%s,%s,NOW())
-                        ON CONFLICT (company_id)
-                        DO UPDATE SET
-                            has_careers_page = EXCLUDED.has_careers_page,
-                            has_blog = EXCLUDED.has_blog,
-                            contact_email = EXCLUDED.contact_email,
-                            scraped_at = NOW()
-                        """,
-                        (
-                            company_id,
-                            result["has_careers"],
-                            result["has_blog"],
-                            result["email"],
-                        ),
-                    )
-                    self.conn.commit()
-                except Exception as e:
-                    logger.error(f"Enrichment failed for {company_id}: {e}")
-
-        logger.info(f"Website enrichment complete ({len(companies)} companies)")
+            try:
+                await asyncio.gather(*stages)
+                await results.put(None)
+                written = await writer
+            except BaseException:
+                # One failed stage would leave its neighbours blocked on
+                # their queues forever
+                for task in stages + [writer]:
+                    task.cancel()
+                raise
+            finally:
+                sampler.cancel()
+
+        await asyncio.to_thread(health.flush, self.conn)
+
+        elapsed = time.time() - start
+        logger.info(
+            f"Pipeline complete in {elapsed:.2f}s: {self.metrics['total']} listed, "
+            f"{write.items} written, {enrich.items} domains fetched, "
+            f"{written} enrichments saved ({health.summary()})"
+        )
+        pipeline.report()
 
     # --------------------------------------------------------------
     # Reporting
     # --------------------------------------------------------------
 
+    def avg_company_ms(self) -> float:
+        normalize = self.profiler.histogram("normalize")
+        return normalize.total / self.metrics["total"] if self.metrics["total"] else 0.0
+
     def print_summary(self):
         """Print final metrics"""
-        if not self.metrics["timings"]:
-            avg_time = min_time = max_time = 0
-        else:
-            avg_time = sum(self.metrics["timings"]) / len(self.metrics["timings"])
-            min_time = min(self.metrics["timings"])
-            max_time = max(self.metrics["timings"])
-
         logger.info("=" * 70)
         logger.info("SCRAPE SUMMARY - PRODUCTION METRICS")
         logger.info("=" * 70)
@@ -423,48 +907,54 @@ class YCScraper:
         logger.info(f"Unchanged Companies:       {self.metrics['unchanged']}")
         logger.info(f"Failed Companies:          {self.metrics['failed']}")
         logger.info("-" * 70)
-        logger.info(f"Average Time per Company:  {avg_time:.3f}s")
-        logger.info(f"Min Time per Company:      {min_time:.3f}s")
-        logger.info(f"Max Time per Company:      {max_time:.3f}s")
-
-        if self.metrics["slowest"]:
-            logger.info(
-                f"Slowest Company: {self.metrics['slowest']} "
-                f"({self.metrics['slowest_time']:.3f}s)"
-            )
+        logger.info(f"Average Time per Company:  {self.avg_company_ms():.3f}ms")
+
+        for rank, (ms, name) in enumerate(self.slowest.items(), 1):
+            logger.info(f"Slowest #{rank}: {name} ({ms:.3f}ms)")
+        logger.info("-" * 70)
+        self.profiler.report()
         logger.info("=" * 70)
 
     # --------------------------------------------------------------
     # Orchestrator
     # --------------------------------------------------------------
 
-    def run(self):
-        self.start_scrape_run()
+    def run(self, resume: bool = False):
+        self.start_scrape_run(resume)
+        completed = False
 
         try:
-            companies = self.scrape_list()
-            self.metrics["total"] = len(companies)
+            self.ensure_snapshot_index()
 
-            for idx, company in enumerate(companies, start=1):
-                if idx % 100 == 0:
-                    logger.info(f"Progress: {idx}/{len(companies)}")
+            # Companies committed before an interruption are not saved again
+            if self.stage:
+                self.saved_ids = self.saved_in_run()
+            if self.saved_ids:
+                logger.info(f"Skipping {len(self.saved_ids)} companies saved before the interruption")
 
-                detail = self.scrape_detail(company)
-                if detail:
-                    self.save_company(company, detail)
+            asyncio.run(self.run_pipeline())
 
-                time.sleep(0.1)
-
-            asyncio.run(self.enrich_all_companies())
+            refresh_rollup(self.conn)
+            completed = True
 
         except Exception as e:
             logger.error("Fatal pipeline failure", exc_info=True)
 
         finally:
+            if completed:
+                self.end_scrape_run()
+            else:
+                self.checkpoint(self.stage or "pipeline")
+                logger.warning(
+                    f"Scrape run #{self.scrape_run_id} left unfinished at stage "
+                    f"{self.stage}; rerun with --resume to continue it"
+                )
+            self.print_summary()
+            exported = self.profiler.export("list")
+            if exported:
+                logger.info(f"Span metrics written to {exported}")
             self.cur.close()
             self.conn.close()
-                        self.end_scrape_run()
-                        self.print_summary()
 
 
 # ------------------------------------------------------------------
@@ -472,7 +962,14 @@ class YCScraper:
 # ------------------------------------------------------------------
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="YC companies master scraper")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the most recent unfinished run")
+    args = parser.parse_args()
+
     logger.info("YC Companies Master Scraper Started")
     scraper = YCScraper()
-    scraper.run()
+    scraper.run(resume=args.resume)
     logger.info("YC Companies Master Scraper Finished")
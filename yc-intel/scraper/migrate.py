@@ -0,0 +1,121 @@
+"""
+One-off schema migrations
+
+Creating tables and adding columns or indexes to existing ones takes
+ACCESS EXCLUSIVE or SHARE locks, so none of it runs when a scraper or the
+API starts. Run this
+once after deploying a change that adds a step below; every step is
+idempotent, so re-running it is safe:
+
+    python migrate.py
+"""
+
+import logging
+import os
+
+from analytics_rollup import ensure_rollup_snapshot_column, ensure_rollup_tables
+from current_snapshot import ensure_current_snapshot_column, ensure_current_state_columns
+from domain_health import ensure_domain_health_table
+from profiler import ensure_profile_column
+from run_checkpoint import ensure_checkpoint_columns
+
+logger = logging.getLogger(__name__)
+
+# Give up instead of queueing behind a running scrape; every query on the
+# table would otherwise wait behind the migration's lock request
+MIGRATION_LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "10s")
+
+STEPS = [
+    ("companies.current_snapshot_id", ensure_current_snapshot_column),
+    ("companies batch/stage/location", ensure_current_state_columns),
+    ("scrape_runs checkpoint columns", ensure_checkpoint_columns),
+    ("scrape_runs.span_stats", ensure_profile_column),
+    ("domain_health", ensure_domain_health_table),
+    ("analytics_rollup tables", ensure_rollup_tables),
+    ("analytics_rollup_state.snapshot_id", ensure_rollup_snapshot_column),
+]
+
+# Built CONCURRENTLY so reads and scrapes carry on during the build. The
+# API's keyset walk reads companies in id order and each current snapshot
+# by primary key; a filtered walk seeks on the filter column's copy on
+# companies, then id. Compaction and the current_snapshot backfill look up
+# snapshots per company by time
+INDEXES = {
+    "idx_companies_active_id": "companies (is_active, id)",
+    "idx_companies_batch_id": "companies (batch, id)",
+    "idx_companies_stage_id": "companies (stage, id)",
+    "idx_companies_location_id": "companies (location, id)",
+    "idx_snapshots_company_scraped": "company_snapshots (company_id, scraped_at DESC)",
+}
+# Indexes over every historical snapshot that no query reads any more
+DROPPED_INDEXES = (
+    "idx_snapshots_company_latest",
+    "idx_snapshots_batch_company",
+    "idx_snapshots_stage_company",
+    "idx_snapshots_location_company",
+)
+
+
+def invalid_indexes(cur) -> set:
+    """Indexes left INVALID by a CREATE INDEX CONCURRENTLY that failed."""
+    cur.execute(
+        """
+        SELECT c.relname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE NOT i.indisvalid
+        """
+    )
+    return {row[0] for row in cur.fetchall()}
+
+
+def ensure_indexes(cur):
+    """
+    Build INDEXES and drop DROPPED_INDEXES, one statement at a time outside
+    any transaction. An invalid leftover is dropped and rebuilt, since
+    IF NOT EXISTS alone would skip it forever.
+    """
+    invalid = invalid_indexes(cur)
+    for name, target in INDEXES.items():
+        if name in invalid:
+            logger.warning(f"Rebuilding invalid index {name}")
+            cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+        cur.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {target}")
+        logger.info(f"Index {name} ready")
+    for name in DROPPED_INDEXES:
+        cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def migrate(conn):
+    """Apply every step in order, committing after each one, then the indexes."""
+    cur = conn.cursor()
+    try:
+        cur.execute("SET lock_timeout = %s", (MIGRATION_LOCK_TIMEOUT,))
+        for name, step in STEPS:
+            step(cur)
+            conn.commit()
+            logger.info(f"Applied {name}")
+    except Exception:
+        conn.rollback()
+        cur.close()
+        raise
+
+    # CONCURRENTLY cannot run inside a transaction block
+    conn.autocommit = True
+    try:
+        ensure_indexes(cur)
+    finally:
+        conn.autocommit = False
+        cur.close()
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from db_pool import get_pool
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    load_dotenv()
+
+    dsn = os.getenv("DATABASE_URL") or os.getenv("NEON_DATABASE_URL")
+    with get_pool(dsn).connection() as conn:
+        migrate(conn)
@@ -0,0 +1,114 @@
+"""
+Per-stage throughput and queue depth for the scrape pipeline
+
+Each stage counts the items it handled and the time it spent busy versus
+waiting on its input queue. A sampler records every queue's depth once a
+second. A stage that is busy nearly all the time, while the queue in
+front of it stays full, is the bottleneck.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StageStats:
+    def __init__(self, name: str, queue: Optional[asyncio.Queue] = None, workers: int = 1):
+        self.name = name
+        self.queue = queue
+        self.workers = workers
+        self.items = 0
+        self.busy = 0.0
+        self.started = None
+        self.finished = None
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.depth_max = 0
+
+    def start(self):
+        if self.started is None:
+            self.started = time.monotonic()
+
+    def finish(self):
+        self.finished = time.monotonic()
+
+    def add(self, items: int, busy_seconds: float):
+        self.items += items
+        self.busy += busy_seconds
+
+    def sample_depth(self):
+        if self.queue is None:
+            return
+        depth = self.queue.qsize()
+        self.depth_samples += 1
+        self.depth_total += depth
+        self.depth_max = max(self.depth_max, depth)
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.monotonic()) - self.started
+
+    def summary(self) -> Dict:
+        elapsed = self.elapsed
+        return {
+            "stage": self.name,
+            "items": self.items,
+            "per_second": self.items / elapsed if elapsed else 0.0,
+            "busy_pct": 100 * self.busy / (elapsed * self.workers) if elapsed else 0.0,
+            "queue_avg": self.depth_total / self.depth_samples if self.depth_samples else 0.0,
+            "queue_max": self.depth_max,
+            "queue_size": self.queue.maxsize if self.queue else 0,
+        }
+
+
+class PipelineStats:
+    def __init__(self, sample_interval: float = 1.0, log_interval: float = 15.0):
+        self.stages: List[StageStats] = []
+        self.sample_interval = sample_interval
+        self.log_interval = log_interval
+
+    def stage(self, name: str, queue: Optional[asyncio.Queue] = None,
+              workers: int = 1) -> StageStats:
+        stats = StageStats(name, queue, workers)
+        self.stages.append(stats)
+        return stats
+
+    async def sample(self):
+        """Record queue depths until cancelled, logging a progress line now and then."""
+        last_log = time.monotonic()
+        while True:
+            await asyncio.sleep(self.sample_interval)
+            for stats in self.stages:
+                stats.sample_depth()
+            if time.monotonic() - last_log >= self.log_interval:
+                last_log = time.monotonic()
+                logger.info("Pipeline: " + " | ".join(
+                    f"{s.name} {s.items}"
+                    + (f" (q {s.queue.qsize()}/{s.queue.maxsize})" if s.queue else "")
+                    for s in self.stages
+                ))
+
+    def bottleneck(self) -> Optional[str]:
+        busiest = max(self.stages, key=lambda s: s.summary()["busy_pct"], default=None)
+        return busiest.name if busiest else None
+
+    def report(self):
+        logger.info("-" * 70)
+        logger.info(f"{'Stage':<14}{'Items':>8}{'Items/s':>10}{'Busy':>8}{'Queue avg/max (size)':>30}")
+        for stats in self.stages:
+            row = stats.summary()
+            queue = (
+                f"{row['queue_avg']:.1f}/{row['queue_max']} ({row['queue_size']})"
+                if stats.queue else "-"
+            )
+            logger.info(
+                f"{row['stage']:<14}{row['items']:>8}{row['per_second']:>10.1f}"
+                f"{row['busy_pct']:>7.0f}%{queue:>30}"
+            )
+        logger.info(f"Bottleneck (busiest stage): {self.bottleneck()}")
+        logger.info("-" * 70)
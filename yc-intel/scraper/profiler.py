@@ -0,0 +1,188 @@
+"""
+Span profiler shared by the scrapers
+
+Code under measurement opens named spans; spans opened inside another
+span are recorded under a dotted path ("fetch.ttfb", "enrich.fetch.dns").
+The current path lives in a ContextVar, so nesting follows each asyncio
+task and each asyncio.to_thread call on its own. Every path gets a
+LatencyHistogram in milliseconds.
+
+An aiohttp TraceConfig adds DNS, connect and time-to-first-byte child
+spans under whatever span is open around a request. At the end of a run
+the per-span summaries go into scrape_runs.span_stats and an OpenMetrics
+text file.
+
+A span costs one perf_counter pair, a ContextVar set/reset and a bucket
+increment, a couple of microseconds against requests that take hundreds
+of milliseconds.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Optional
+
+import aiohttp
+
+from latency import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "metrics")
+QUANTILES = (50, 95, 99)
+
+_current_path: ContextVar[str] = ContextVar("span_path", default="")
+
+
+class Span:
+    __slots__ = ("profiler", "name", "path", "start", "elapsed_ms", "_token")
+
+    def __init__(self, profiler: "SpanProfiler", name: str):
+        self.profiler = profiler
+        self.name = name
+        self.elapsed_ms = 0.0
+
+    def __enter__(self) -> "Span":
+        parent = _current_path.get()
+        self.path = f"{parent}.{self.name}" if parent else self.name
+        self._token = _current_path.set(self.path)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        self.elapsed_ms = (time.perf_counter() - self.start) * 1000
+        _current_path.reset(self._token)
+        self.profiler.record(self.path, self.elapsed_ms)
+        return False
+
+
+class SpanProfiler:
+    def __init__(self):
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        # Spans also close on to_thread workers
+        self._lock = threading.Lock()
+
+    def span(self, name: str) -> Span:
+        return Span(self, name)
+
+    def record(self, path: str, elapsed_ms: float):
+        with self._lock:
+            histogram = self.histograms.get(path)
+            if histogram is None:
+                histogram = self.histograms[path] = LatencyHistogram()
+            histogram.record(elapsed_ms)
+
+    def record_child(self, name: str, elapsed_ms: float):
+        """Record a duration measured elsewhere under the currently open span."""
+        parent = _current_path.get()
+        self.record(f"{parent}.{name}" if parent else name, elapsed_ms)
+
+    def histogram(self, path: str) -> LatencyHistogram:
+        with self._lock:
+            return self.histograms.setdefault(path, LatencyHistogram())
+
+    # --------------------------------------------------------------
+    # HTTP phases
+    # --------------------------------------------------------------
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Record dns, connect and ttfb child spans for every request on a session."""
+        trace = aiohttp.TraceConfig()
+
+        async def request_start(session, ctx, params):
+            ctx.request_start = time.perf_counter()
+
+        async def dns_start(session, ctx, params):
+            ctx.dns_start = time.perf_counter()
+
+        async def dns_end(session, ctx, params):
+            self.record_child("dns", (time.perf_counter() - ctx.dns_start) * 1000)
+
+        async def connect_start(session, ctx, params):
+            ctx.connect_start = time.perf_counter()
+
+        async def connect_end(session, ctx, params):
+            self.record_child("connect", (time.perf_counter() - ctx.connect_start) * 1000)
+
+        async def request_end(session, ctx, params):
+            # Fires once the response headers are in
+            self.record_child("ttfb", (time.perf_counter() - ctx.request_start) * 1000)
+
+        trace.on_request_start.append(request_start)
+        trace.on_dns_resolvehost_start.append(dns_start)
+        trace.on_dns_resolvehost_end.append(dns_end)
+        trace.on_connection_create_start.append(connect_start)
+        trace.on_connection_create_end.append(connect_end)
+        trace.on_request_end.append(request_end)
+        return trace
+
+    # --------------------------------------------------------------
+    # Reporting
+    # --------------------------------------------------------------
+
+    def summary(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {path: self.histograms[path].summary() for path in sorted(self.histograms)}
+
+    def report(self, emit: Callable[[str], None] = logger.info):
+        emit(f"{'Span':<28}{'Count':>8}{'Mean':>10}{'p50':>10}{'p95':>10}{'p99':>10}")
+        for path, row in self.summary().items():
+            emit(f"{path:<28}{row['count']:>8}{row['mean']:>8.1f}ms"
+                 f"{row['p50']:>8.1f}ms{row['p95']:>8.1f}ms{row['p99']:>8.1f}ms")
+
+    def state(self) -> Dict:
+        with self._lock:
+            return {path: h.state() for path, h in self.histograms.items()}
+
+    @classmethod
+    def from_state(cls, state: Optional[Dict]) -> "SpanProfiler":
+        profiler = cls()
+        for path, histogram in (state or {}).items():
+            profiler.histograms[path] = LatencyHistogram.from_state(histogram)
+        return profiler
+
+    def openmetrics(self, scraper: str) -> str:
+        """Render span summaries as OpenMetrics text, in seconds."""
+        name = "yc_scraper_span_seconds"
+        lines = [
+            f"# TYPE {name} summary",
+            f"# UNIT {name} seconds",
+            f"# HELP {name} Time spent in each scraper span.",
+        ]
+        for path, row in self.summary().items():
+            labels = f'scraper="{scraper}",span="{path}"'
+            for pct in QUANTILES:
+                lines.append(f'{name}{{{labels},quantile="{pct / 100:g}"}} '
+                             f'{row[f"p{pct}"] / 1000:.6f}')
+            lines.append(f"{name}_sum{{{labels}}} {row['mean'] * row['count'] / 1000:.6f}")
+            lines.append(f"{name}_count{{{labels}}} {row['count']}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def export(self, scraper: str, directory: str = PROFILE_DIR) -> Optional[str]:
+        """Write <directory>/<scraper>_spans.om, replacing the last run's file."""
+        path = os.path.join(directory, f"{scraper}_spans.om")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(self.openmetrics(scraper))
+            os.replace(path + ".tmp", path)
+            return path
+        except OSError as e:
+            logger.error(f"Could not write span metrics to {path}: {e}")
+            return None
+
+
+# Applied by migrate.py, never at scraper startup
+def ensure_profile_column(cur):
+    cur.execute("ALTER TABLE scrape_runs ADD COLUMN IF NOT EXISTS span_stats JSONB")
+
+
+def save_profile(cur, run_id: int, profiler: SpanProfiler):
+    cur.execute(
+        "UPDATE scrape_runs SET span_stats = %s WHERE id = %s",
+        (json.dumps(profiler.summary()), run_id),
+    )
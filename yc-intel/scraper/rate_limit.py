@@ -0,0 +1,46 @@
+"""
+Async token-bucket rate limiting per host
+"""
+
+import asyncio
+import time
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+    """Allow `rate` acquisitions per second with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, 1)
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        async with self.lock:
+            self._refill()
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class HostRateLimiter:
+    """Token bucket per host; hosts without a configured limit pass freely."""
+
+    def __init__(self, limits: Dict[str, Tuple[float, float]]):
+        self.buckets = {
+            host: TokenBucket(rate, burst) for host, (rate, burst) in limits.items()
+        }
+
+    async def acquire(self, url: str):
+        bucket = self.buckets.get(urlsplit(url).hostname or "")
+        if bucket:
+            await bucket.acquire()
@@ -0,0 +1,97 @@
+"""
+Typed records passed between scraper stages
+
+Slotted dataclasses instead of dicts: no per-instance __dict__, fixed
+attribute names, and a shape the stages can rely on. A listing hit is
+built straight from the Algolia JSON, so the raw hit is dropped as soon
+as the page is converted.
+"""
+
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional, Tuple
+
+
+@dataclass(slots=True)
+class ListingHit:
+    id: Any
+    name: Optional[str] = None
+    slug: Optional[str] = None
+    website: Optional[str] = None
+    batch: Optional[str] = None
+    stage: Optional[str] = None
+    short_description: Optional[str] = None
+    location: Optional[str] = None
+    tags: Tuple[str, ...] = ()
+    employee_size: Any = None
+
+    @classmethod
+    def from_hit(cls, hit: Dict) -> "ListingHit":
+        return cls(
+            id=hit.get("id", hit.get("objectID")),
+            name=hit.get("name"),
+            slug=hit.get("slug"),
+            website=hit.get("website"),
+            batch=hit.get("batch"),
+            # Algolia leaves the status off active companies
+            stage=hit.get("stage", "Active"),
+            short_description=hit.get("short_description"),
+            location=hit.get("location"),
+            tags=tuple(hit.get("tags") or ()),
+            employee_size=hit.get("employee_size"),
+        )
+
+
+@dataclass(slots=True)
+class CompanyDetail:
+    """Snapshot fields for one company, plus how they were fetched."""
+    batch: Optional[str] = None
+    stage: Optional[str] = None
+    description: Optional[str] = None
+    location: Optional[str] = None
+    tags: Tuple[str, ...] = ()
+    employee_range: Optional[str] = None
+    website: Optional[str] = None
+    # Detail-page fetches only
+    index_fetch_time: float = 0.0
+    html_parse_time: float = 0.0
+    cache_entry: Optional[Tuple] = None
+    not_modified: bool = False
+
+    @classmethod
+    def from_extract(cls, fields: Dict, **timing) -> "CompanyDetail":
+        """Wrap a detail_extract result."""
+        return cls(
+            batch=fields.get("batch"),
+            stage=fields.get("stage"),
+            description=fields.get("description"),
+            location=fields.get("location"),
+            tags=tuple(fields.get("tags") or ()),
+            employee_range=fields.get("employee_range"),
+            **timing,
+        )
+
+
+@dataclass(slots=True)
+class EnrichmentResult:
+    has_careers_page: bool = False
+    has_blog: bool = False
+    contact_email: Optional[str] = None
+    # None on success, else a domain_health failure kind
+    failure: Optional[str] = None
+    skipped: bool = False
+    elapsed_ms: float = 0.0
+
+
+@dataclass(slots=True)
+class CompanyTiming:
+    """Per-stage milliseconds for one company, kept only for the slowest few."""
+    company: str
+    slug: str
+    total_time: float
+    index_fetch_time: float = 0.0
+    html_parse_time: float = 0.0
+    db_write_time: float = 0.0
+    enrichment_time: float = 0.0
+
+    def to_dict(self) -> Dict:
+        return asdict(self)
@@ -0,0 +1,110 @@
+"""
+Checkpoints for resumable scrape runs
+
+A run's progress is stored on its own scrape_runs row as JSON: the stage
+it reached, a cursor into its ordered work list, per-stage progress and
+the metric counters so far. A run that crashes or is killed keeps
+ended_at NULL, and `--resume` picks up the scraper's most recent
+unfinished row, restores its counters and skips work behind the cursor.
+"""
+
+import json
+import logging
+import os
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_INTERVAL = float(os.getenv("CHECKPOINT_INTERVAL", "10"))  # seconds
+
+
+# Applied by migrate.py, never at scraper startup
+def ensure_checkpoint_columns(cur):
+    cur.execute("""
+        ALTER TABLE scrape_runs
+        ADD COLUMN IF NOT EXISTS scraper TEXT,
+        ADD COLUMN IF NOT EXISTS checkpoint JSONB,
+        ADD COLUMN IF NOT EXISTS checkpoint_at TIMESTAMP
+    """)
+
+
+def find_unfinished_run(cur, scraper: str) -> Optional[Dict]:
+    """The scraper's most recent run that never reached ended_at."""
+    cur.execute(
+        """
+        SELECT id, started_at, checkpoint
+        FROM scrape_runs
+        WHERE scraper = %s AND ended_at IS NULL
+        ORDER BY id DESC
+        LIMIT 1
+        """,
+        (scraper,),
+    )
+    row = cur.fetchone()
+    if row is None:
+        return None
+    checkpoint = row[2]
+    if isinstance(checkpoint, str):
+        checkpoint = json.loads(checkpoint)
+    return {"id": row[0], "started_at": row[1], "checkpoint": checkpoint or {}}
+
+
+def save_checkpoint(cur, run_id: int, state: Dict):
+    cur.execute(
+        "UPDATE scrape_runs SET checkpoint = %s, checkpoint_at = NOW() WHERE id = %s",
+        (json.dumps(state, default=str), run_id),
+    )
+
+
+class ProgressWatermark:
+    """
+    Resume point for an ordered work list that finishes out of order.
+
+    watermark is the last key before which everything is done; keys done
+    past it are kept in done_ahead so a resumed run can skip them too.
+    A resumed run passes only the keys left to do, plus done_before, the
+    number an earlier attempt finished, so done and total still count the
+    whole run.
+    """
+
+    def __init__(self, keys: Iterable, watermark=None, done_ahead: Iterable = (),
+                 done_before: int = 0):
+        self.keys: List = list(keys)
+        self.done_before = done_before
+        self.start = watermark
+        self.pos = 0
+        self.ahead = set()
+        # Done by an earlier attempt; remembered until the watermark passes them
+        self.carried = set(done_ahead)
+
+    def mark_done(self, key):
+        self.ahead.add(key)
+        while self.pos < len(self.keys) and self.keys[self.pos] in self.ahead:
+            self.ahead.discard(self.keys[self.pos])
+            self.pos += 1
+
+    @property
+    def watermark(self):
+        return self.keys[self.pos - 1] if self.pos else self.start
+
+    def state(self) -> Dict:
+        watermark = self.watermark
+        carried = {k for k in self.carried if watermark is None or k > watermark}
+        return {
+            "watermark": watermark,
+            "done_ahead": sorted(self.ahead | carried),
+            "done": self.done_before + self.pos + len(self.ahead),
+            "total": self.done_before + len(self.keys),
+        }
+
+
+def remaining(items: List[Dict], key: str, cursor: Optional[Dict]) -> List[Dict]:
+    """Drop items a checkpoint cursor says are already done."""
+    if not cursor:
+        return items
+    watermark = cursor.get("watermark")
+    done_ahead = set(cursor.get("done_ahead", []))
+    return [
+        item for item in items
+        if (watermark is None or item[key] > watermark) and item[key] not in done_ahead
+    ]
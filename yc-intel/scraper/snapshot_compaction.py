@@ -0,0 +1,348 @@
+"""
+Snapshot history compaction and retention
+
+company_snapshots gains a full row (description and tags included) for
+every detected change, so it grows without bound. This job keeps it as a
+hot table holding only the last SNAPSHOT_HOT_DAYS plus each company's
+current snapshot, and moves older rows into company_snapshot_history:
+
+- history is range partitioned by month on scraped_at, so retention is a
+  DROP of whole partitions rather than a DELETE
+- only the newest snapshot per company per period (month by default) is
+  kept; the rest are dropped
+- descriptions are stored once in snapshot_texts and referenced by md5
+
+Latest-state reads go through companies.current_snapshot_id into the hot
+table and never touch history. The company_snapshot_timeline view stitches
+both back together for anything that needs the full record.
+
+A DELETE only leaves dead tuples behind, so the hot table shrinks on disk
+only after --vacuum-full rewrites it; without that, the report counts the
+rows removed and the dead tuples left for VACUUM instead of bytes.
+
+Usage:
+    python snapshot_compaction.py [--hot-days 90] [--period month]
+                                  [--retention-months 24]
+                                  [--vacuum | --vacuum-full]
+"""
+
+import logging
+import os
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_HOT_DAYS = int(os.getenv("SNAPSHOT_HOT_DAYS", "90"))
+SNAPSHOT_KEEP_PERIOD = os.getenv("SNAPSHOT_KEEP_PERIOD", "month")
+SNAPSHOT_RETENTION_MONTHS = int(os.getenv("SNAPSHOT_RETENTION_MONTHS", "0")) or None
+
+# Compaction runs month by month, so periods are at most a month; a week
+# straddling two months keeps one snapshot on each side
+PERIODS = ("day", "week", "month")
+PARTITION_PREFIX = "company_snapshot_history_"
+
+# One period's worth of hot rows: thin to the newest per company, move the
+# survivors to history with the description by reference, delete the rest.
+# The current snapshot and each company's newest hot row are never touched.
+COMPACT_SQL = """
+    WITH candidates AS (
+        SELECT s.*,
+               ROW_NUMBER() OVER (
+                   PARTITION BY s.company_id, date_trunc(%(period)s, s.scraped_at)
+                   ORDER BY s.scraped_at DESC, s.id DESC
+               ) AS rn
+        FROM company_snapshots s
+        WHERE s.scraped_at >= %(start)s AND s.scraped_at < %(end)s
+          AND NOT EXISTS (SELECT 1 FROM companies c WHERE c.current_snapshot_id = s.id)
+          AND EXISTS (
+              SELECT 1 FROM company_snapshots n
+              WHERE n.company_id = s.company_id AND n.scraped_at > s.scraped_at
+          )
+    ), texts AS (
+        INSERT INTO snapshot_texts (hash, body)
+        SELECT DISTINCT md5(description), description
+        FROM candidates
+        WHERE rn = 1 AND description IS NOT NULL
+        ON CONFLICT (hash) DO NOTHING
+    ), kept AS (
+        INSERT INTO company_snapshot_history
+        (id, company_id, batch, stage, description_hash, location, tags,
+         employee_range, data_hash, scraped_at)
+        SELECT id, company_id, batch, stage, md5(description), location, tags,
+               employee_range, data_hash, scraped_at
+        FROM candidates
+        WHERE rn = 1
+        ON CONFLICT DO NOTHING
+        RETURNING pg_column_size(company_snapshot_history.*) AS bytes
+    ), removed AS (
+        DELETE FROM company_snapshots s
+        USING candidates c
+        WHERE s.id = c.id
+        RETURNING pg_column_size(s.*) AS bytes
+    )
+    SELECT (SELECT COUNT(*) FROM removed),
+           (SELECT COALESCE(SUM(bytes), 0) FROM removed),
+           (SELECT COUNT(*) FROM kept),
+           (SELECT COALESCE(SUM(bytes), 0) FROM kept)
+"""
+
+# What the API list endpoint and SnapshotHashIndex do for current state
+LATEST_STATE_PROBE_SQL = """
+    SELECT COUNT(*), COUNT(s.data_hash)
+    FROM companies c
+    LEFT JOIN company_snapshots s ON s.id = c.current_snapshot_id
+"""
+
+
+def ensure_history_tables(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS snapshot_texts (
+            hash TEXT PRIMARY KEY,
+            body TEXT NOT NULL
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS company_snapshot_history (
+            id INTEGER NOT NULL,
+            company_id INTEGER NOT NULL,
+            batch TEXT,
+            stage TEXT,
+            description_hash TEXT,
+            location TEXT,
+            tags JSONB,
+            employee_range TEXT,
+            data_hash TEXT,
+            scraped_at TIMESTAMP NOT NULL,
+            PRIMARY KEY (id, scraped_at)
+        ) PARTITION BY RANGE (scraped_at)
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_snapshot_history_company
+        ON company_snapshot_history (company_id, scraped_at DESC)
+    """)
+    cur.execute("""
+        CREATE OR REPLACE VIEW company_snapshot_timeline AS
+        SELECT id, company_id, batch, stage, description, location, tags,
+               employee_range, data_hash, scraped_at
+        FROM company_snapshots
+        UNION ALL
+        SELECT h.id, h.company_id, h.batch, h.stage, t.body, h.location, h.tags,
+               h.employee_range, h.data_hash, h.scraped_at
+        FROM company_snapshot_history h
+        LEFT JOIN snapshot_texts t ON t.hash = h.description_hash
+    """)
+
+
+def month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def next_month(d: date) -> date:
+    return date(d.year + d.month // 12, d.month % 12 + 1, 1)
+
+
+def ensure_partition(cur, month: date):
+    name = f"{PARTITION_PREFIX}{month:%Y_%m}"
+    cur.execute(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF company_snapshot_history "
+        f"FOR VALUES FROM ('{month}') TO ('{next_month(month)}')"
+    )
+
+
+def relation_sizes(cur) -> Dict[str, int]:
+    sizes = {}
+    for table in ("company_snapshots", "company_snapshot_history", "snapshot_texts"):
+        cur.execute(
+            """
+            SELECT COALESCE(SUM(pg_total_relation_size(c.oid)), 0)
+            FROM pg_class c
+            WHERE c.oid = %s::regclass
+               OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass)
+            """,
+            (table, table),
+        )
+        sizes[table] = int(cur.fetchone()[0])
+    return sizes
+
+
+def dead_tuples(cur, table: str = "company_snapshots") -> int:
+    """Dead tuples the statistics collector currently reports for table."""
+    cur.execute(
+        "SELECT COALESCE(n_dead_tup, 0) FROM pg_stat_user_tables WHERE relid = %s::regclass",
+        (table,),
+    )
+    row = cur.fetchone()
+    return int(row[0]) if row else 0
+
+
+def time_latest_state(cur, runs: int = 5) -> float:
+    """Median ms for the current-state join over every company."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        cur.execute(LATEST_STATE_PROBE_SQL)
+        cur.fetchone()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def history_partitions(cur) -> List[Tuple[str, date]]:
+    cur.execute(
+        """
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'company_snapshot_history'::regclass
+        ORDER BY c.relname
+        """
+    )
+    partitions = []
+    for (name,) in cur.fetchall():
+        month = datetime.strptime(name[len(PARTITION_PREFIX):], "%Y_%m").date()
+        partitions.append((name, month))
+    return partitions
+
+
+def compact_snapshots(conn, hot_days: int = SNAPSHOT_HOT_DAYS,
+                      period: str = SNAPSHOT_KEEP_PERIOD,
+                      retention_months: int = SNAPSHOT_RETENTION_MONTHS,
+                      vacuum: bool = False, vacuum_full: bool = False) -> Dict:
+    """
+    Move, thin and expire snapshot history. Returns the run's report;
+    bytes_reclaimed is only set when vacuum_full rewrote the hot table.
+    """
+    if period not in PERIODS:
+        raise ValueError(f"period must be one of {', '.join(PERIODS)}")
+
+    cur = conn.cursor()
+    ensure_history_tables(cur)
+    conn.commit()
+
+    report = {"moved": 0, "dropped": 0, "partitions_dropped": 0,
+              "row_bytes_removed": 0, "row_bytes_kept": 0}
+    sizes_before = relation_sizes(cur)
+    latest_before = time_latest_state(cur)
+    conn.commit()
+
+    # Cut on a period boundary so a period is never split across runs
+    cur.execute("SELECT date_trunc(%s, LOCALTIMESTAMP - %s * INTERVAL '1 day')",
+                (period, hot_days))
+    cutoff = cur.fetchone()[0]
+    cur.execute("SELECT MIN(scraped_at) FROM company_snapshots WHERE scraped_at < %s", (cutoff,))
+    oldest = cur.fetchone()[0]
+    conn.commit()
+
+    # One transaction per month keeps locks and WAL bursts small
+    month = month_start(oldest.date()) if oldest else None
+    while month and datetime.combine(month, datetime.min.time()) < cutoff:
+        end = min(datetime.combine(next_month(month), datetime.min.time()), cutoff)
+        try:
+            ensure_partition(cur, month)
+            cur.execute(COMPACT_SQL, {"period": period, "start": month, "end": end})
+            removed, removed_bytes, kept, kept_bytes = cur.fetchone()
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        report["moved"] += kept
+        report["dropped"] += removed - kept
+        report["row_bytes_removed"] += removed_bytes
+        report["row_bytes_kept"] += kept_bytes
+        if removed:
+            logger.info(f"{month:%Y-%m}: {removed} snapshots compacted, {kept} kept in history")
+        month = next_month(month)
+
+    if retention_months:
+        expire_before = month_start(date.today())
+        for _ in range(retention_months):
+            expire_before = month_start(expire_before - timedelta(days=1))
+        for name, partition_month in history_partitions(cur):
+            if next_month(partition_month) <= expire_before:
+                cur.execute(f"DROP TABLE {name}")
+                report["partitions_dropped"] += 1
+                logger.info(f"Dropped expired history partition {name}")
+        conn.commit()
+
+    # Counted before any VACUUM clears them
+    report["dead_tuples"] = dead_tuples(cur)
+    conn.commit()
+
+    if vacuum or vacuum_full:
+        conn.autocommit = True
+        try:
+            # FULL rewrites the table under an ACCESS EXCLUSIVE lock; plain
+            # VACUUM only makes the space reusable
+            cur.execute(f"VACUUM ({'FULL, ' if vacuum_full else ''}ANALYZE) company_snapshots")
+        finally:
+            conn.autocommit = False
+
+    sizes_after = relation_sizes(cur)
+    latest_after = time_latest_state(cur)
+    conn.commit()
+    cur.close()
+
+    report.update({
+        "sizes_before": sizes_before,
+        "sizes_after": sizes_after,
+        "bytes_reclaimed": (
+            sum(sizes_before.values()) - sum(sizes_after.values()) if vacuum_full else None
+        ),
+        "latest_state_ms_before": latest_before,
+        "latest_state_ms_after": latest_after,
+    })
+    return report
+
+
+def print_report(report: Dict):
+    print("\n" + "=" * 70)
+    print("SNAPSHOT COMPACTION SUMMARY")
+    print("=" * 70)
+    print(f"Moved to history:             {report['moved']}")
+    print(f"Thinned out:                  {report['dropped']}")
+    print(f"History partitions dropped:   {report['partitions_dropped']}")
+    print(f"Row bytes removed from hot:   {report['row_bytes_removed'] / 1024:.0f} KB "
+          f"({report['row_bytes_kept'] / 1024:.0f} KB re-stored in history)")
+    for table, before in report["sizes_before"].items():
+        after = report["sizes_after"][table]
+        print(f"{table + ':':<30}{before / 1024:.0f} KB -> {after / 1024:.0f} KB")
+    print(f"Dead tuples left by DELETE:   {report['dead_tuples']}")
+    if report["bytes_reclaimed"] is None:
+        print("Bytes reclaimed on disk:      not measured (run with --vacuum-full)")
+    else:
+        print(f"Bytes reclaimed on disk:      {report['bytes_reclaimed'] / 1024:.0f} KB")
+    print(f"Latest-state query:           {report['latest_state_ms_before']:.1f}ms -> "
+          f"{report['latest_state_ms_after']:.1f}ms")
+    print("=" * 70 + "\n")
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+    from db_pool import get_pool
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Compact company_snapshots history")
+    parser.add_argument("--hot-days", type=int, default=SNAPSHOT_HOT_DAYS,
+                        help="keep every snapshot newer than this many days")
+    parser.add_argument("--period", choices=PERIODS, default=SNAPSHOT_KEEP_PERIOD,
+                        help="keep one snapshot per company per period in history")
+    parser.add_argument("--retention-months", type=int, default=SNAPSHOT_RETENTION_MONTHS,
+                        help="drop history older than this many months (default: keep)")
+    vacuum = parser.add_mutually_exclusive_group()
+    vacuum.add_argument("--vacuum", action="store_true",
+                        help="VACUUM the hot table afterwards so freed space is reusable")
+    vacuum.add_argument("--vacuum-full", action="store_true",
+                        help="rewrite the hot table afterwards to return freed space "
+                             "(takes an ACCESS EXCLUSIVE lock)")
+    args = parser.parse_args()
+
+    dsn = os.getenv("DATABASE_URL") or os.getenv("NEON_DATABASE_URL")
+    with get_pool(dsn).connection() as conn:
+        print_report(compact_snapshots(conn, args.hot_days, args.period,
+                                       args.retention_months, args.vacuum, args.vacuum_full))
@@ -0,0 +1,78 @@
+"""
+In-memory index of the latest company_snapshots hash per company
+
+Loaded once per run by following companies.current_snapshot_id, streamed
+through a server-side cursor, then kept current as the run writes snapshots, so
+change detection for an unchanged company needs no database round trip.
+"""
+
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotHashIndex:
+    def __init__(self):
+        self.hashes: Dict[int, str] = {}
+        self.company_ids: Dict[str, int] = {}
+        self.loaded = False
+
+    def load(self, conn, chunk_size: int = 5000):
+        """Stream company ids, YC ids and latest hashes in chunks."""
+        self.hashes.clear()
+        self.company_ids.clear()
+
+        cur = conn.cursor(name="snapshot_hash_index")
+        cur.itersize = chunk_size
+        try:
+            cur.execute(
+                """
+                SELECT c.id, c.yc_company_id, COALESCE(cur.data_hash, l.data_hash)
+                FROM companies c
+                LEFT JOIN company_snapshots cur ON cur.id = c.current_snapshot_id
+                -- Companies not yet backfilled fall back to the newest row
+                LEFT JOIN LATERAL (
+                    SELECT data_hash
+                    FROM company_snapshots
+                    WHERE company_id = c.id
+                    ORDER BY scraped_at DESC
+                    LIMIT 1
+                ) l ON c.current_snapshot_id IS NULL
+                """
+            )
+            for company_id, yc_company_id, data_hash in cur:
+                if yc_company_id is not None:
+                    self.company_ids[str(yc_company_id)] = company_id
+                if data_hash is not None:
+                    self.hashes[company_id] = data_hash
+        finally:
+            cur.close()
+            conn.commit()
+
+        self.loaded = True
+        logger.info(
+            f"Loaded snapshot index: {len(self.company_ids)} companies, "
+            f"{len(self.hashes)} with snapshots"
+        )
+
+    def company_id(self, yc_company_id) -> Optional[int]:
+        return self.company_ids.get(str(yc_company_id))
+
+    def latest(self, company_id: int) -> Optional[str]:
+        return self.hashes.get(company_id)
+
+    def has_snapshot(self, company_id: int) -> bool:
+        return company_id in self.hashes
+
+    def is_unchanged(self, company_id: Optional[int], data_hash: str) -> bool:
+        return company_id is not None and self.hashes.get(company_id) == data_hash
+
+    def record(self, company_id: int, data_hash: str, yc_company_id=None):
+        """Remember a snapshot this run has just committed."""
+        self.hashes[company_id] = data_hash
+        if yc_company_id is not None:
+            self.company_ids[str(yc_company_id)] = company_id
+
+    def __len__(self):
+        return len(self.hashes)
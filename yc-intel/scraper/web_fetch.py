@@ -0,0 +1,161 @@
+"""
+Bounded homepage fetches for website enrichment
+
+aiohttp timeouts apply per socket read, so a slow-drip server can hold a
+fetch open for minutes. fetch_homepage streams the body under one wall-clock
+deadline and a byte cap, and stops early once a SignalScanner has seen
+every signal the enricher is looking for.
+
+SignalScanner holds the only homepage rules the enrichers apply, and
+enrichment_result turns a fetch into the record all three of them store,
+so one site gets the same company_web_enrichment row whichever scraper
+enriched it.
+"""
+
+import asyncio
+import os
+import re
+import time
+from typing import Dict, Optional
+
+import aiohttp
+
+from records import EnrichmentResult
+
+ENRICH_DEADLINE = float(os.getenv("ENRICH_DEADLINE", "5"))  # seconds per fetch
+ENRICH_MAX_BYTES = int(os.getenv("ENRICH_MAX_BYTES", str(256 * 1024)))
+
+CHUNK_SIZE = 16 * 1024
+# Bytes carried over between chunks so matches spanning a boundary are seen
+SCAN_OVERLAP = 256
+
+# Careers and blog only count as the target of an <a> link; <link>,
+# <script> and other href/src attributes are ignored
+CAREERS_HREF = rb'careers?|jobs?|hiring'
+BLOG_HREF = rb'blog'
+
+
+def anchor_href_re(target: bytes) -> re.Pattern:
+    return re.compile(
+        rb'<a\s(?:[^>]*?\s)?href\s*=\s*["\']?[^"\'\s>]*(?:' + target + rb')', re.I
+    )
+
+
+CAREERS_LINK_RE = anchor_href_re(CAREERS_HREF)
+BLOG_LINK_RE = anchor_href_re(BLOG_HREF)
+
+# The first address that is not a no-reply/example one is the contact email
+EMAIL_RE = re.compile(rb'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}')
+NON_CONTACT_EMAILS = ('noreply', 'no-reply', 'example', 'test')
+
+
+def contact_email_ok(email: str) -> bool:
+    email = email.lower()
+    return not any(word in email for word in NON_CONTACT_EMAILS)
+
+
+class SignalScanner:
+    """Incrementally look for careers, blog and email signals in raw bytes."""
+
+    def __init__(self):
+        self.has_careers = False
+        self.has_blog = False
+        self.email = None
+        self.tail = b''
+
+    @property
+    def decided(self) -> bool:
+        return self.has_careers and self.has_blog and self.email is not None
+
+    def feed(self, chunk: bytes):
+        window = self.tail + chunk
+        if not self.has_careers:
+            self.has_careers = bool(CAREERS_LINK_RE.search(window))
+        if not self.has_blog:
+            self.has_blog = bool(BLOG_LINK_RE.search(window))
+        if self.email is None:
+            for match in EMAIL_RE.finditer(window):
+                email = match.group().decode('ascii', errors='ignore')
+                if contact_email_ok(email):
+                    self.email = email
+                    break
+        self.tail = window[-SCAN_OVERLAP:]
+
+
+def enrichment_result(fetch: Dict, scanner: SignalScanner) -> EnrichmentResult:
+    """
+    The enrichment record for a fetch_homepage result. Only a deadline hit
+    before the headers is a timeout; a 200 that ran out of time keeps
+    whatever the scanner saw in the partial body.
+    """
+    if fetch["status"] is None:
+        return EnrichmentResult(failure="timeout", elapsed_ms=fetch["elapsed_ms"])
+    if fetch["status"] != 200:
+        return EnrichmentResult(failure=f"http_{fetch['status']}", elapsed_ms=fetch["elapsed_ms"])
+    return EnrichmentResult(
+        has_careers_page=scanner.has_careers,
+        has_blog=scanner.has_blog,
+        contact_email=scanner.email,
+        elapsed_ms=fetch["elapsed_ms"],
+    )
+
+
+def homepage_url(domain: str) -> str:
+    """URL for a stored company domain; domains that kept a scheme are used as is."""
+    if domain.startswith(('http://', 'https://')):
+        return domain
+    return f"https://{domain}"
+
+
+async def fetch_homepage(session: aiohttp.ClientSession, url: str,
+                         deadline: float = ENRICH_DEADLINE,
+                         max_bytes: int = ENRICH_MAX_BYTES,
+                         scanner: Optional[SignalScanner] = None) -> Dict:
+    """
+    GET url, reading at most max_bytes within deadline seconds.
+
+    Returns {"status", "body", "charset", "elapsed_ms", "truncated",
+    "timed_out", "stopped_early"}. On timeout whatever arrived so far is
+    returned; status is None if the headers never did.
+    """
+    result = {
+        "status": None,
+        "body": b'',
+        "charset": None,
+        "elapsed_ms": 0,
+        "truncated": False,
+        "timed_out": False,
+        "stopped_early": False,
+    }
+    chunks = []
+    size = 0
+    start = time.monotonic()
+
+    async def read():
+        nonlocal size
+        async with session.get(url, allow_redirects=True) as resp:
+            result["status"] = resp.status
+            result["charset"] = resp.charset
+            if resp.status != 200:
+                return
+            async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                chunk = chunk[:max_bytes - size]
+                chunks.append(chunk)
+                size += len(chunk)
+                if scanner:
+                    scanner.feed(chunk)
+                    if scanner.decided:
+                        result["stopped_early"] = True
+                        return
+                if size >= max_bytes:
+                    result["truncated"] = True
+                    return
+
+    try:
+        await asyncio.wait_for(read(), timeout=deadline)
+    except asyncio.TimeoutError:
+        result["timed_out"] = True
+
+    result["body"] = b''.join(chunks)
+    result["elapsed_ms"] = (time.monotonic() - start) * 1000
+    return result
@@ -1,94 +1,127 @@
 import os
-import requests
-from bs4 import BeautifulSoup
+import argparse
 from dotenv import load_dotenv
-import psycopg2
-import re
 import asyncio
 import aiohttp
 from typing import Optional
 
+from db_pool import get_pool
+from domain_health import DomainHealth, classify_failure
+from enrichment_schedule import (
+    ENRICH_INCREMENTAL,
+    ENRICH_MAX_PER_RUN,
+    ENRICH_TTL_HOURS,
+    select_companies,
+)
+from profiler import SpanProfiler
+from records import EnrichmentResult
+from web_fetch import SignalScanner, enrichment_result, fetch_homepage, homepage_url
+
 load_dotenv()
 DATABASE_URL = os.getenv("DATABASE_URL")
+WEBSITE_CONCURRENCY = int(os.getenv("WEBSITE_CONCURRENCY", "20"))
 
-async def check_website(session: aiohttp.ClientSession, domain: str) -> dict:
+async def check_website(session: aiohttp.ClientSession, domain: str,
+                        profiler: Optional[SpanProfiler] = None) -> EnrichmentResult:
     """Check company website for careers, blog, email."""
     if not domain:
-        return {"has_careers_page": False, "has_blog": False, "contact_email": None}
+        return EnrichmentResult()
     
-    # Clean domain
-    if domain.startswith(('http://', 'https://')):
-        url = domain
-    else:
-        url = f"https://{domain}"
+    profiler = profiler or SpanProfiler()
+    url = homepage_url(domain)
     
     try:
-        async with session.get(url, timeout=aiohttp.ClientTimeout(total=3)) as resp:
-            if resp.status != 200:
-                return {"has_careers_page": False, "has_blog": False, "contact_email": None}
-            
-            html = await resp.text()
-            soup = BeautifulSoup(html, "html.parser")
-            
-            # Check careers/jobs
-            careers_links = soup.find_all("a", href=re.compile(r'(careers?|jobs)', re.I))
-            has_careers = len(careers_links) > 0
-            
-            # Check blog
-            blog_links = soup.find_all("a", href=re.compile(r'blog', re.I))
-            has_blog = len(blog_links) > 0
-            
-            # Extract email
-            emails = re.findall(r'[\w\.-]+@[\w\.-]+\.\w+', html)
-            contact_email = emails[0] if emails else None
-            
-            return {
-                "has_careers_page": has_careers,
-                "has_blog": has_blog,
-                "contact_email": contact_email
-            }
-    except:
-        return {"has_careers_page": False, "has_blog": False, "contact_email": None}
+        # Stream at most ENRICH_MAX_BYTES within ENRICH_DEADLINE seconds.
+        # The fetch stops once the scanner has seen every signal, so its
+        # verdict is what gets stored: the body may end before the rest
+        scanner = SignalScanner()
+        with profiler.span("fetch"):
+            fetch = await fetch_homepage(session, url, scanner=scanner)
+        return enrichment_result(fetch, scanner)
+    except Exception as e:
+        return EnrichmentResult(failure=classify_failure(e))
 
-async def enrich_all_websites():
-    """Enrich all companies."""
-    conn = psycopg2.connect(DATABASE_URL)
-    cur = conn.cursor()
+async def enrich_all_websites(incremental: bool = ENRICH_INCREMENTAL,
+                              ttl_hours: float = ENRICH_TTL_HOURS,
+                              max_count: Optional[int] = ENRICH_MAX_PER_RUN) -> SpanProfiler:
+    """
+    Enrich companies whose enrichment is missing or older than ttl_hours.
     
-    # Get companies with domains
-    cur.execute("SELECT id, domain FROM companies WHERE domain IS NOT NULL AND is_active = TRUE")
-    companies = [{"db_id": row[0], "domain": row[1]} for row in cur.fetchall()]
+    Returns the run's span profiler; one "company" span per domain checked.
+    """
+    db = get_pool(DATABASE_URL)
+    profiler = SpanProfiler()
     
-    connector = aiohttp.TCPConnector(limit=20)
+    # Get companies with domains that are due
+    with db.connection() as conn:
+        cur = conn.cursor()
+        rows = select_companies(cur, incremental, ttl_hours, max_count)
+        companies = [{"db_id": row[0], "domain": row[1]} for row in rows]
+        cur.close()
+        print(f"{len(companies)} companies due for enrichment")
+        
+        # Domains cooling down were already left out by select_companies;
+        # the rest get their outcome recorded
+        health = DomainHealth()
+        health.load(conn)
+    
+    connector = aiohttp.TCPConnector(limit=WEBSITE_CONCURRENCY)
     timeout = aiohttp.ClientTimeout(total=5)
-    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+    
+    # Checks wait here rather than on the connector, so a fetch's deadline
+    # only starts once it has a connection slot
+    slots = asyncio.Semaphore(WEBSITE_CONCURRENCY)
+    
+    async def check(domain):
+        async with slots:
+            with profiler.span("company"):
+                return await check_website(session, domain, profiler)
+    
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                     trace_configs=[profiler.trace_config()]) as session:
         tasks = []
         for company in companies:  # All companies
-            tasks.append(check_website(session, company["domain"]))
+            tasks.append(check(company["domain"]))
         
         results = await asyncio.gather(*tasks)
     
     # Save results
     updated = 0
-    for i, company in enumerate(companies):
-        enrichment = results[i]
-        cur.execute("""
-            INSERT INTO company_web_enrichment (company_id, has_careers_page, has_blog, contact_email, scraped_at)
-            VALUES (%s, %s, %s, %s, NOW())
-            ON CONFLICT (company_id) DO UPDATE SET
-                has_careers_page = EXCLUDED.has_careers_page,
-                has_blog = EXCLUDED.has_blog,
-                contact_email = EXCLUDED.contact_email,
-                scraped_at = NOW()
-        """, (company["db_id"], enrichment["has_careers_page"], enrichment["has_blog"], enrichment["contact_email"]))
+    with db.connection() as conn:
+        cur = conn.cursor()
+        for i, company in enumerate(companies):
+            enrichment = results[i]
+            health.record(company["domain"], enrichment.failure)
+            if enrichment.failure:
+                continue
+            cur.execute("""
+                INSERT INTO company_web_enrichment (company_id, has_careers_page, has_blog, contact_email, scraped_at)
+                VALUES (%s, %s, %s, %s, NOW())
+                ON CONFLICT (company_id) DO UPDATE SET
+                    has_careers_page = EXCLUDED.has_careers_page,
+                    has_blog = EXCLUDED.has_blog,
+                    contact_email = EXCLUDED.contact_email,
+                    scraped_at = NOW()
+            """, (company["db_id"], enrichment.has_careers_page, enrichment.has_blog, enrichment.contact_email))
+            
+            if cur.rowcount == 1:
+                updated += 1
         
-        if cur.rowcount == 1:
-            updated += 1
-    
-    conn.commit()
-    print(f"Updated {updated} companies with website data")
-    cur.close()
-    conn.close()
+        conn.commit()
+        cur.close()
+        health.flush(conn)
+    print(f"Updated {updated} companies with website data ({health.summary()})")
+    profiler.report(print)
+    profiler.export("enrichment")
+    db.log_stats()
+    return profiler
 
 if __name__ == "__main__":
-    asyncio.run(enrich_all_websites())
+    parser = argparse.ArgumentParser(description="Enrich company websites")
+    parser.add_argument("--full", action="store_true",
+                        help="re-enrich every active company, ignoring the TTL")
+    parser.add_argument("--ttl-hours", type=float, default=ENRICH_TTL_HOURS)
+    parser.add_argument("--max", type=int, default=ENRICH_MAX_PER_RUN,
+                        help="maximum companies to enrich this run")
+    args = parser.parse_args()
+    asyncio.run(enrich_all_websites(not args.full, args.ttl_hours, args.max))
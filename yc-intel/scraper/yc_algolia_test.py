@@ -1,14 +1,22 @@
 import requests
 import json
-from typing import List, Dict
+from urllib.parse import urlencode
+from typing import Iterator, List, Dict, Optional, Sequence
+
+from algolia_listing import LISTING_FIELDS, trim_hit
 
 ALGOLIA_URL = "https://45bwzj1sgc-dsn.algolia.net/1/indexes/*/queries?x-algolia-agent=Algolia%20for%20JavaScript%20(3.35.1)%3B%20Browser%3B%20JS%20Helper%20(3.16.1)&x-algolia-application-id=45BWZJ1SGC&x-algolia-api-key=MjBjYjRiMzY0NzdhZWY0NjExY2NhZjYxMGIxYjc2MTAwNWFkNTkwNTc4NjgxYjU0YzFhYTY2ZGQ5OGY5NDMxZnJlc3RyaWN0SW5kaWNlcz0lNUIlMjJZQ0NvbXBhbnlfcHJvZHVjdGlvbiUyMiUyQyUyMllDQ29tcGFueV9CeV9MYXVuY2hfRGF0ZV9wcm9kdWN0aW9uJTIyJTVEJnRhZ0ZpbHRlcnM9JTVCJTIyeWNkY19wdWJsaWMlMjIlNUQmYW5hbHl0aWNzVGFncz0lNUIlMjJ5Y2RjJTIyJTVE"
 
-def scrape_all_companies() -> List[Dict]:
-    """Fetch all YC companies via pagination."""
-    all_companies = []
+def iter_company_pages(fields: Optional[Sequence[str]] = LISTING_FIELDS) -> Iterator[List[Dict]]:
+    """Yield YC companies one page at a time; fields=None keeps whole hits."""
     page = 0
+    total = 0
     hits_per_page = 100  # Max Algolia usually allows
+    params = {"query": "", "hitsPerPage": hits_per_page}
+    if fields is not None:
+        params["attributesToRetrieve"] = json.dumps(list(fields))
+        params["attributesToHighlight"] = "[]"
+        params["attributesToSnippet"] = "[]"
     
     while True:
         print(f"Fetching page {page}...")
@@ -16,34 +24,42 @@ def scrape_all_companies() -> List[Dict]:
             "requests": [
                 {
                     "indexName": "YCCompany_production",
-                    "params": f"query=&hitsPerPage={hits_per_page}&page={page}"
+                    "params": urlencode({**params, "page": page})
                 }
             ]
         }
         
         resp = requests.post(ALGOLIA_URL, json=body, timeout=15)
-        data = resp.json()
-        hits = data["results"][0]["hits"]
+        hits = resp.json()["results"][0]["hits"]
         
         if not hits:
             break
+        if fields is not None:
+            hits = [trim_hit(hit, fields) for hit in hits]
             
-        all_companies.extend(hits)
-        print(f"Got {len(hits)} companies (total so far: {len(all_companies)})")
+        total += len(hits)
+        print(f"Got {len(hits)} companies (total so far: {total})")
+        yield hits
         
         page += 1
         
         if len(hits) < hits_per_page:
             break
-    
-    return all_companies
+
+def scrape_all_companies() -> List[Dict]:
+    """Fetch all YC companies via pagination."""
+    return [company for page in iter_company_pages() for company in page]
 
 def main():
-    companies = scrape_all_companies()
-    print(f"\nTotal companies scraped: {len(companies)}")
+    total = 0
+    samples = []
+    for page in iter_company_pages():
+        total += len(page)
+        samples.extend(page[:3 - len(samples)])
+    print(f"\nTotal companies scraped: {total}")
     
-    # Print first 3 with all fields
-    for i, company in enumerate(companies[:3]):
+    # Print the first 3 as the pipeline sees them
+    for i, company in enumerate(samples):
         print(f"\nCompany {i+1}:")
         print(json.dumps(company, indent=2)[:500] + "...")
 